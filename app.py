@@ -3,6 +3,7 @@ import json
 import os
 from utils.auth import check_authentication, initialize_session
 from utils.db import initialize_database, get_database_stats
+from utils.drafts import start_draft_sweeper
 from utils.sample_data import initialize_sample_data
 
 # Page configuration
@@ -17,6 +18,7 @@ def main():
     # Initialize database and session
     initialize_database()
     initialize_session()
+    start_draft_sweeper()
     
     # Custom CSS for Indian cultural theme
     st.markdown("""
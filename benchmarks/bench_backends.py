@@ -0,0 +1,151 @@
+"""
+Compare latency and throughput of the AI backends on the sample stories.
+
+For every backend it times, through the app's own functions:
+
+    clean       each sample section on its own with clean_and_correct_text
+    clean x N   all sections at once with clean_texts_concurrently
+    organize    each whole sample story with organize_story_sections
+    transcribe  each audio file with transcribe_audio_file
+
+"openai" runs against the local mock OpenAI server unless --live is given,
+in which case the configured API keys are used. "local" needs
+llama-cpp-python and faster-whisper and downloads its models on first use;
+backends whose dependencies are missing are reported and skipped. Without
+--audio, a synthetic recording is transcribed, which measures speed only.
+
+    python benchmarks/bench_backends.py [--backends openai local] [--live] [--audio story.m4a ...]
+"""
+import argparse
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_openai_server import MockOpenAIServer, configure_app
+from utils import providers, speech_to_text, text_cleaner
+from utils.response_cache import ResponseCache
+from utils.sample_data import get_sample_stories
+
+def synthetic_recording(seconds=60, sample_rate=16000):
+    """WAV of tone bursts separated by pauses, so VAD and chunking have work to do"""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    samples = 0.3 * np.sin(2 * np.pi * 220 * t) * (np.sin(2 * np.pi * 0.2 * t) > -0.5)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes((samples * 32767).astype("<i2").tobytes())
+    return "synthetic.wav", buffer.getvalue(), seconds
+
+def load_recordings(paths):
+    recordings = []
+    for path in paths:
+        with open(path, "rb") as audio_file:
+            data = audio_file.read()
+        duration = len(speech_to_text.decode_audio(data)) / speech_to_text.TRANSCRIBE_SAMPLE_RATE
+        recordings.append((os.path.basename(path), data, duration))
+    return recordings
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+def report(backend, task, latencies, total, throughput):
+    print(f"{backend:<8}{task:<12}{len(latencies):>6}{statistics.median(latencies):>9.2f}"
+          f"{max(latencies):>9.2f}{total:>9.2f}  {throughput}")
+
+def run_backend(backend, stories, recordings, data_dir):
+    text_cleaner.response_cache = ResponseCache(os.path.join(data_dir, f"{backend}.sqlite3"))
+    sections = [(section["content"], "festival story", story["language"])
+                for story in stories for section in story["sections"]]
+
+    latencies = []
+    for text, context, language in sections:
+        (success, result), elapsed = timed(text_cleaner.clean_and_correct_text, text, language, context)
+        if not success:
+            raise Exception(result.get("error"))
+        latencies.append(elapsed)
+    report(backend, "clean", latencies, sum(latencies), f"{len(latencies) / sum(latencies):.2f} sections/s")
+
+    # A fresh cache, so the concurrent run does not replay the answers above
+    text_cleaner.response_cache = ResponseCache(os.path.join(data_dir, f"{backend}-concurrent.sqlite3"))
+    results, elapsed = timed(text_cleaner.clean_texts_concurrently, [(text, context) for text, context, _ in sections])
+    if not all(success for success, _ in results):
+        raise Exception("concurrent cleaning failed")
+    report(backend, f"clean x {len(sections)}", [elapsed], elapsed, f"{len(sections) / elapsed:.2f} sections/s")
+
+    latencies = []
+    for story in stories:
+        text = "\n\n".join(section["content"] for section in story["sections"])
+        (success, result), elapsed = timed(text_cleaner.organize_story_sections, text, story["num_sections"], story["language"])
+        if not success:
+            raise Exception(result.get("error"))
+        latencies.append(elapsed)
+    report(backend, "organize", latencies, sum(latencies), f"{len(latencies) / sum(latencies):.2f} stories/s")
+
+    latencies = []
+    audio_seconds = 0.0
+    for name, data, duration in recordings:
+        upload = io.BytesIO(data)
+        upload.name = name
+        _, elapsed = timed(speech_to_text.transcribe_audio_file, upload, None)
+        latencies.append(elapsed)
+        audio_seconds += duration
+    report(backend, "transcribe", latencies, sum(latencies), f"{audio_seconds / sum(latencies):.1f}x real time")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", choices=sorted(providers.TEXT_PROVIDERS), default=["openai", "local"])
+    parser.add_argument("--live", action="store_true", help="use the real OpenAI API instead of the mock server")
+    parser.add_argument("--stories", type=int, default=None, help="number of sample stories, all by default")
+    parser.add_argument("--audio", nargs="*", default=[], help="recordings to transcribe")
+    parser.add_argument("--latency", type=float, default=0.8, help="mock seconds before an answer starts")
+    parser.add_argument("--token-latency", type=float, default=0.015, help="mock seconds per output token")
+    args = parser.parse_args()
+
+    data_dir = tempfile.TemporaryDirectory()
+    server = None
+    if args.live:
+        text_cleaner.api_manager.show_usage_status = lambda: None
+    else:
+        server = MockOpenAIServer(latency=args.latency, latency_distribution="lognormal", latency_spread=0.3,
+                                  token_latency=args.token_latency, audio_latency=0.05)
+        configure_app(server.start(), data_dir.name)
+
+    stories = get_sample_stories()[:args.stories]
+    recordings = load_recordings(args.audio) if args.audio else [synthetic_recording()]
+
+    print(f"{len(stories)} sample stories, {len(recordings)} recordings, "
+          f"OpenAI {'live' if args.live else 'mock server'}")
+    print(f"{'backend':<8}{'task':<12}{'items':>6}{'p50 s':>9}{'max s':>9}{'total s':>9}  throughput")
+    for backend in args.backends:
+        try:
+            text_provider = providers.TEXT_PROVIDERS[backend]()
+            speech_provider = providers.SPEECH_PROVIDERS[backend]()
+        except Exception as e:
+            print(f"{backend:<8}skipped: {str(e)}")
+            continue
+
+        text_cleaner.get_text_provider = lambda: text_provider
+        speech_to_text.get_speech_provider = lambda: speech_provider
+        try:
+            run_backend(backend, stories, recordings, data_dir.name)
+        except Exception as e:
+            print(f"{backend:<8}failed: {str(e)}")
+
+    if server:
+        server.stop()
+    data_dir.cleanup()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Compare per-section and batched AI enhancement of a story.
+
+Runs both modes through the app's pooled clients against the local mock
+OpenAI server and reports requests, estimated tokens and wall-clock time
+per story.
+
+    python benchmarks/bench_batch_enhancement.py [--sections 5] [--latency 0.4]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_openai_server import MockOpenAIServer, configure_app
+from utils import text_cleaner
+from utils.response_cache import ResponseCache
+
+SAMPLE_SECTION = (
+    "diwali ki raat hamare ghar mein sab log ek saath baithe the dadi ne diye jalaye "
+    "aur hum bachchon ko lakshmi puja ki kahani sunayi "
+)
+
+def run(mode, items, server, data_dir):
+    server.reset()
+    text_cleaner.response_cache = ResponseCache(os.path.join(data_dir, f"{mode}.sqlite3"))
+    started = time.perf_counter()
+    if mode == "batched":
+        results = text_cleaner.clean_texts_batched(items, "Hindi")
+    else:
+        results = text_cleaner.clean_texts_concurrently(items, "Hindi")
+    elapsed = time.perf_counter() - started
+
+    assert all(success for success, _ in results)
+    stats = server.stats()
+    return stats["requests"], stats["prompt_tokens"], stats["completion_tokens"], elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sections", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=2, help="sample sentences per section")
+    parser.add_argument("--latency", type=float, default=0.4, help="seconds per mock request")
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(latency=args.latency)
+    data_dir = tempfile.TemporaryDirectory()
+    configure_app(server.start(), data_dir.name)
+
+    items = [(SAMPLE_SECTION * args.repeat + f"(part {i + 1})", f"festival story section {i + 1}")
+             for i in range(args.sections)]
+
+    print(f"{args.sections} sections, ~{text_cleaner.estimate_tokens(items[0][0])} tokens each, "
+          f"{args.latency:.2f}s mock latency")
+    print(f"{'mode':<12}{'requests':>10}{'prompt tok':>12}{'output tok':>12}{'seconds':>10}")
+    for mode in ("per-section", "batched"):
+        calls, prompt_tokens, completion_tokens, elapsed = run(mode, items, server, data_dir.name)
+        print(f"{mode:<12}{calls:>10}{prompt_tokens:>12}{completion_tokens:>12}{elapsed:>10.2f}")
+
+    server.stop()
+    data_dir.cleanup()
+
+if __name__ == "__main__":
+    main()
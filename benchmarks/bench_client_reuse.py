@@ -0,0 +1,84 @@
+"""
+Compare per-call latency of a fresh OpenAI client per request against the
+pooled client from utils.openai_clients.
+
+Runs against the local mock OpenAI server with a fixed latency, so the
+difference is client construction plus the connection setup that pooling
+saves. The pooled client's per-request usage
+accounting is included, with the rate limit lifted. Against the real API
+each fresh connection also pays a TLS handshake, so the gap only grows.
+
+    python benchmarks/bench_client_reuse.py [--calls 200] [--workers 4] [--latency 0.02]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openai import OpenAI
+from benchmarks.mock_openai_server import MockOpenAIServer
+from utils import openai_clients
+from utils.openai_clients import get_pooled_client
+from utils.usage_store import UsageStore
+
+def call(client):
+    started = time.perf_counter()
+    client.chat.completions.create(model="gpt-4o", messages=[{"role": "user", "content": "hi"}])
+    return time.perf_counter() - started
+
+def run(make_client, calls, workers):
+    """Time each call, including client construction, from a thread pool"""
+    def one(_):
+        started = time.perf_counter()
+        call(make_client())
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        latencies = sorted(pool.map(one, range(calls)))
+    return latencies, time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds the server waits per request")
+    args = parser.parse_args()
+
+    # Keep the shared accounting in the measurement, but without the rate limit
+    usage_dir = tempfile.TemporaryDirectory()
+    openai_clients.usage_store = UsageStore(os.path.join(usage_dir.name, "usage.sqlite3"),
+                                            requests_per_minute=10 ** 9, burst=10 ** 9)
+
+    server = MockOpenAIServer(latency=args.latency)
+    base_url = server.start()
+
+    modes = {
+        "fresh client": lambda: OpenAI(api_key="bench", base_url=base_url, max_retries=0),
+        "pooled client": lambda: get_pooled_client("bench", base_url)
+    }
+
+    # Warm up imports and the pooled client's connections
+    for make_client in modes.values():
+        call(make_client())
+
+    print(f"{args.calls} calls, {args.workers} workers, {args.latency * 1000:.0f} ms server latency")
+    print(f"{'mode':<15}{'p50 ms':>9}{'p95 ms':>9}{'total s':>9}{'connections':>13}")
+    for mode, make_client in modes.items():
+        connections = server.stats()["connections"]
+        latencies, elapsed = run(make_client, args.calls, args.workers)
+        connections = server.stats()["connections"] - connections
+        p50 = statistics.median(latencies) * 1000
+        p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000
+        print(f"{mode:<15}{p50:>9.1f}{p95:>9.1f}{elapsed:>9.2f}{connections:>13}")
+
+    server.stop()
+    usage_dir.cleanup()
+
+if __name__ == "__main__":
+    main()
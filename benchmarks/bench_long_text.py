@@ -0,0 +1,78 @@
+"""
+Compare cleaning a long story in one request against chunked map-reduce.
+
+Runs through the app's pooled clients against the local mock OpenAI
+server, whose latency grows with the number of output tokens like the
+real API's, and which cuts the answer off at max_tokens. "one request,
+2000 max" is the old fixed output cap, which fails on long stories. The
+chunked runs split, clean and merge the story like clean_and_correct_text
+does, with different numbers of parallel requests.
+
+    python benchmarks/bench_long_text.py [--tokens 6000] [--token-latency 0.002]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_openai_server import MockOpenAIServer, configure_app
+from utils import text_cleaner
+from utils.response_cache import ResponseCache
+
+SAMPLE_PARAGRAPH = (
+    "diwali ki raat hamare ghar mein sab log ek saath baithe the. dadi ne diye jalaye. "
+    "hum bachchon ko lakshmi puja ki kahani sunayi gayi. baahar patakhon ki awaaz aa rahi thi. "
+)
+
+def run(mode, text, server, data_dir, workers=None):
+    server.reset()
+    text_cleaner.response_cache = ResponseCache(os.path.join(data_dir, f"{mode}.sqlite3"))
+    started = time.perf_counter()
+    if mode == "one request, 2000 max":
+        response = text_cleaner.get_openai_client().chat.completions.create(
+            model=text_cleaner.CHAT_MODEL, messages=text_cleaner._cleaning_messages(text, "Hindi", "festival story"),
+            response_format={"type": "json_object"}, max_tokens=2000
+        )
+        success = response.choices[0].finish_reason == "stop"
+    elif mode == "one request, sized":
+        success = text_cleaner._request_cleaned_text(text, "Hindi", "festival story") is not None
+    else:
+        chunks = text_cleaner.split_text_into_chunks(text)
+        results = list(text_cleaner._clean_chunks(chunks, "Hindi", "festival story", max_workers=workers))
+        success = bool(text_cleaner.merge_cleaned_chunks(chunks, results)["cleaned_text"])
+    return success, server.stats()["requests"], time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=6000, help="approximate length of the story")
+    parser.add_argument("--base-latency", type=float, default=0.3, help="seconds per mock request")
+    parser.add_argument("--token-latency", type=float, default=0.002, help="seconds per mock output token")
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(latency=args.base_latency, token_latency=args.token_latency)
+    data_dir = tempfile.TemporaryDirectory()
+    configure_app(server.start(), data_dir.name)
+
+    paragraphs = []
+    while text_cleaner.estimate_tokens("\n\n".join(paragraphs)) < args.tokens:
+        paragraphs.append(SAMPLE_PARAGRAPH * 3 + f"(bhaag {len(paragraphs) + 1})")
+    text = "\n\n".join(paragraphs)
+    chunks = text_cleaner.split_text_into_chunks(text)
+
+    print(f"~{text_cleaner.estimate_tokens(text)} token story, {len(chunks)} chunks, "
+          f"{args.base_latency:.2f}s + {args.token_latency * 1000:.1f} ms/token mock latency")
+    print(f"{'mode':<24}{'requests':>10}{'result':>9}{'seconds':>10}")
+    modes = [("one request, 2000 max", None), ("one request, sized", None)]
+    modes += [(f"chunked, {workers} parallel", workers) for workers in (1, 2, 4)]
+    for mode, workers in modes:
+        success, requests, elapsed = run(mode, text, server, data_dir.name, workers)
+        print(f"{mode:<24}{requests:>10}{'ok' if success else 'failed':>9}{elapsed:>10.2f}")
+
+    server.stop()
+    data_dir.cleanup()
+
+if __name__ == "__main__":
+    main()
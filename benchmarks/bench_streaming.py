@@ -0,0 +1,59 @@
+"""
+Compare time to first visible text of blocking and streamed text cleaning.
+
+Runs clean_and_correct_text and CleanedTextStream through the app's pooled
+clients against the local mock OpenAI server, whose answers take a base
+latency plus a time per output token like the real API's.
+
+    python benchmarks/bench_streaming.py [--repeat 20] [--token-latency 0.01]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_openai_server import MockOpenAIServer, configure_app
+from utils import text_cleaner
+from utils.response_cache import ResponseCache
+
+SAMPLE_SENTENCE = "diwali ki raat hamare ghar mein sab log ek saath baithe the. "
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20, help="sample sentences in the text")
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds before the mock answer starts")
+    parser.add_argument("--token-latency", type=float, default=0.01, help="seconds per mock output token")
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(latency=args.latency, token_latency=args.token_latency)
+    data_dir = tempfile.TemporaryDirectory()
+    configure_app(server.start(), data_dir.name)
+    text = SAMPLE_SENTENCE * args.repeat
+
+    print(f"~{text_cleaner.estimate_tokens(text)} token text, {args.latency:.2f}s + "
+          f"{args.token_latency * 1000:.0f} ms/token mock latency")
+    print(f"{'mode':<12}{'first text s':>14}{'complete s':>12}")
+    for mode in ("blocking", "streamed"):
+        text_cleaner.response_cache = ResponseCache(os.path.join(data_dir.name, f"{mode}.sqlite3"))
+        started = time.perf_counter()
+        if mode == "blocking":
+            success, _ = text_cleaner.clean_and_correct_text(text)
+            first = time.perf_counter() - started
+        else:
+            stream = text_cleaner.CleanedTextStream(text)
+            first = None
+            for _ in stream:
+                if first is None:
+                    first = time.perf_counter() - started
+            success = stream.success
+        assert success
+        print(f"{mode:<12}{first:>14.2f}{time.perf_counter() - started:>12.2f}")
+
+    server.stop()
+    data_dir.cleanup()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Check that stored narration never outgrows the upload.
+
+Encodes a synthetic spoken-length recording as MP3, M4A and WAV at the
+bitrates phones and recorders commonly produce, runs each through
+process_uploaded_audio from utils.audio, and checks that the stored
+rendition plus its fallback are smaller than the upload. The script exits
+non-zero on a mismatch.
+
+    python benchmarks/check_audio_storage.py [--seconds 60]
+"""
+import argparse
+import io
+import os
+import sys
+import wave
+
+import av
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.audio import process_uploaded_audio
+
+SAMPLE_RATE = 44100
+
+# name, container, codec, bit rate (None for PCM)
+UPLOADS = [
+    ("MP3 128 kbps", "mp3", "libmp3lame", 128000),
+    ("MP3 64 kbps", "mp3", "libmp3lame", 64000),
+    ("MP3 32 kbps", "mp3", "libmp3lame", 32000),
+    ("M4A 96 kbps", "mp4", "aac", 96000),
+    ("WAV 16-bit", "wav", None, None),
+]
+
+def synthetic_speech(seconds):
+    """Mono float32 tones with a syllable-like envelope and pauses"""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    pitch = 180 + 40 * np.sin(2 * np.pi * 0.7 * t)
+    voice = np.sin(2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE) + 0.3 * np.sin(4 * np.pi * np.cumsum(pitch) / SAMPLE_RATE)
+    syllables = np.clip(np.sin(2 * np.pi * 4 * t), 0, None) * (np.sin(2 * np.pi * 0.25 * t) > -0.6)
+    return (0.3 * voice * syllables).astype(np.float32)
+
+def encode(samples, container_format, codec, bit_rate):
+    if codec is None:
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(SAMPLE_RATE)
+            wav_file.writeframes((samples * 32767).astype("<i2").tobytes())
+        return buffer.getvalue()
+
+    buffer = io.BytesIO()
+    with av.open(buffer, mode="w", format=container_format) as container:
+        stream = container.add_stream(codec, rate=SAMPLE_RATE)
+        stream.bit_rate = bit_rate
+        stream.layout = "mono"
+        frame = av.AudioFrame.from_ndarray(samples.reshape(1, -1), format="flt", layout="mono")
+        frame.sample_rate = SAMPLE_RATE
+        resampler = av.AudioResampler(format=stream.format.name, layout="mono", rate=SAMPLE_RATE)
+        for resampled in resampler.resample(frame) + resampler.resample(None):
+            for packet in stream.encode(resampled):
+                container.mux(packet)
+        for packet in stream.encode(None):
+            container.mux(packet)
+    return buffer.getvalue()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=60.0, help="length of the synthetic recording")
+    args = parser.parse_args()
+
+    samples = synthetic_speech(args.seconds)
+    failures = 0
+    print(f"{'upload':<16}{'upload KB':>10}{'stored':>12}{'KB':>8}{'fallback':>12}{'KB':>8}{'total %':>9}")
+    for name, container_format, codec, bit_rate in UPLOADS:
+        upload = encode(samples, container_format, codec, bit_rate)
+        result = process_uploaded_audio(upload)
+        fallback_size = len(result['fallback_data']) if result['fallback_data'] else 0
+        total = result['size'] + fallback_size
+        passed = total < len(upload)
+        failures += not passed
+        print(f"{name:<16}{len(upload) / 1024:>10.0f}{result['mime_type']:>12}{result['size'] / 1024:>8.0f}"
+              f"{result['fallback_mime'] or '-':>12}{fallback_size / 1024:>8.0f}"
+              f"{100 * total / len(upload):>8.0f}%  {'pass' if passed else 'FAIL'}")
+
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Check how the AI backends are selected and how the local one sizes its work.
+
+Resolves TEXT_BACKEND, SPEECH_BACKEND and AI_BACKEND combinations through
+utils.providers and checks which backend each task gets. The local text
+backend is then loaded when llama-cpp-python is installed and --local is
+given, and its tokenizer and max_tokens clamp are checked against its
+context window. Without llama-cpp-python, the check is that asking for it
+fails with the install hint. The script exits non-zero on a mismatch.
+
+    python benchmarks/check_backends.py [--local]
+"""
+import argparse
+import importlib.util
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import providers
+
+BACKEND_VARIABLES = ("AI_BACKEND", "TEXT_BACKEND", "SPEECH_BACKEND")
+
+# name, environment, expected text backend, expected speech backend ("error" when rejected)
+SELECTION_SCENARIOS = [
+    ("default", {}, "openai", "openai"),
+    ("AI_BACKEND for both", {"AI_BACKEND": "local"}, "local", "local"),
+    ("per-task overrides", {"AI_BACKEND": "local", "TEXT_BACKEND": "openai"}, "openai", "local"),
+    ("speech only", {"SPEECH_BACKEND": "local"}, "openai", "local"),
+    ("unknown backend", {"AI_BACKEND": "gpu"}, "error", "error"),
+]
+
+def resolve(variable, registry):
+    try:
+        return providers._backend_name(variable, registry)
+    except Exception:
+        return "error"
+
+def check(name, passed, detail=""):
+    print(f"{name:<40}{detail:<30}{'pass' if passed else 'FAIL'}")
+    return not passed
+
+def check_selection():
+    failures = 0
+    saved = {variable: os.environ.pop(variable, None) for variable in BACKEND_VARIABLES}
+    try:
+        for name, environment, expected_text, expected_speech in SELECTION_SCENARIOS:
+            os.environ.update(environment)
+            text = resolve("TEXT_BACKEND", providers.TEXT_PROVIDERS)
+            speech = resolve("SPEECH_BACKEND", providers.SPEECH_PROVIDERS)
+            failures += check(name, (text, speech) == (expected_text, expected_speech), f"text={text} speech={speech}")
+            for variable in environment:
+                os.environ.pop(variable)
+
+        provider = providers.TEXT_PROVIDERS["openai"]()
+        failures += check("openai counts tokens", provider.count_tokens("दीपावली की कहानी") > 0)
+    finally:
+        for variable, value in saved.items():
+            if value is not None:
+                os.environ[variable] = value
+    return failures
+
+def check_local_text(load):
+    if importlib.util.find_spec("llama_cpp") is None:
+        try:
+            providers.TEXT_PROVIDERS["local"]()
+            message = ""
+        except Exception as e:
+            message = str(e)
+        return check("local without llama-cpp-python", ".[local]" in message, "install hint")
+    if not load:
+        print(f"{'local text backend':<40}{'skipped, pass --local':<30}")
+        return 0
+
+    failures = 0
+    provider = providers.TEXT_PROVIDERS["local"]()
+    context_tokens = provider.llm.n_ctx()
+    failures += check("local context window", context_tokens == providers.LOCAL_LLM_CONTEXT_TOKENS, f"{context_tokens} tokens")
+
+    text = "दीपावली की रात गाँव में दीये जले। " * 200
+    tokens = provider.count_tokens(text)
+    failures += check("local tokenizer", tokens > 0, f"{tokens} tokens")
+
+    messages = [{"role": "system", "content": "Clean the text."}, {"role": "user", "content": text}]
+    max_tokens = provider.fit_max_tokens(messages, 10 ** 6)
+    failures += check("max_tokens fits the context", 0 < max_tokens < context_tokens - tokens, f"{max_tokens} tokens")
+
+    content, finish_reason = provider.chat(messages[:1] + [{"role": "user", "content": "नमस्ते"}], max_tokens=16)
+    failures += check("local chat answers", bool(content), f"finish_reason={finish_reason}")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--local", action="store_true", help="load the local text model, downloading it on first use")
+    args = parser.parse_args()
+
+    print(f"{'check':<40}{'detail':<30}")
+    failures = check_selection() + check_local_text(args.local)
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Exercise call_openai from utils.text_cleaner against the mock OpenAI server.
+
+Each scenario scripts failures per API key on the local mock server: rate
+limits with Retry-After, server errors, a revoked key and a malformed
+request. It then checks how many attempts were made, on which keys, and
+how long the call took, and the script exits non-zero on a mismatch.
+
+    python benchmarks/check_retry_policy.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_openai_server import MockOpenAIServer, configure_app
+from utils import text_cleaner
+from utils.api_manager import api_manager
+from utils.usage_store import key_fingerprint
+
+RATE_LIMITED = (429, {"Retry-After": "1"})
+
+# name, keys, scripted faults per key, expected outcome, expected attempts,
+# (min, max) seconds
+SCENARIOS = [
+    ("429 honors Retry-After", ["key-a"], {"key-a": [RATE_LIMITED]}, "ok", 2, (1.0, 2.0)),
+    ("500s back off, then succeed", ["key-a"], {"key-a": [500] * 2}, "ok", 3, (0.0, 4.0)),
+    ("401 fails over at once", ["key-a", "key-b"], {"key-a": [401] * 9}, "ok", None, (0.0, 0.5)),
+    ("429 fails over at once", ["key-a", "key-b"], {"key-a": [RATE_LIMITED] * 9}, "ok", None, (0.0, 0.5)),
+    ("401 on the only key is final", ["key-a"], {"key-a": [401] * 9}, "AuthenticationError", 1, (0.0, 0.5)),
+    ("400 is never retried", ["key-a"], {"key-a": [400] * 9}, "BadRequestError", 1, (0.0, 0.5)),
+    ("503s stop at the attempt limit", ["key-a"], {"key-a": [503] * 9}, "InternalServerError",
+     text_cleaner.MAX_REQUEST_ATTEMPTS, (0.0, 4 * text_cleaner.RETRY_MAX_DELAY_SECONDS)),
+    ("deadline cuts retries short", ["key-a"], {"key-a": [RATE_LIMITED] * 9}, "RateLimitError", None, (0.0, 2.0)),
+]
+
+# Seconds the deadline scenario allows
+SHORT_DEADLINE = 1.5
+
+def call(deadline):
+    return text_cleaner.call_openai(lambda client: client.chat.completions.create(
+        model="gpt-4o", messages=[{"role": "user", "content": "hi"}]
+    ), deadline=deadline)
+
+def main():
+    server = MockOpenAIServer()
+    data_dir = tempfile.TemporaryDirectory()
+    configure_app(server.start(), data_dir.name)
+    # Keep the backoff short enough for a quick run
+    text_cleaner.RETRY_MAX_DELAY_SECONDS = 2.0
+
+    failures = 0
+    print(f"{'scenario':<34}{'outcome':<22}{'attempts':>9}{'seconds':>9}")
+    for name, keys, faults, expected, expected_attempts, (low, high) in SCENARIOS:
+        api_manager.api_keys = [{"key": key, "name": key, "id": key_fingerprint(key)} for key in keys]
+        server.reset()
+        for api_key, key_faults in faults.items():
+            server.inject_faults(api_key, key_faults)
+
+        deadline = SHORT_DEADLINE if name.startswith("deadline") else text_cleaner.REQUEST_DEADLINE_SECONDS
+        started = time.monotonic()
+        try:
+            call(deadline)
+            outcome = "ok"
+        except Exception as error:
+            outcome = type(error).__name__
+        elapsed = time.monotonic() - started
+
+        by_key = server.stats()["requests_by_key"]
+        attempts = sum(by_key.values())
+        passed = outcome == expected and low <= elapsed <= high
+        if expected_attempts is not None:
+            passed = passed and attempts == expected_attempts
+        elif outcome == "ok":
+            # Failover: the bad key was tried at most once before the healthy key answered
+            passed = passed and by_key.get("key-a", 0) <= 1 and by_key.get("key-b", 0) == 1
+        failures += not passed
+        print(f"{name:<34}{outcome:<22}{attempts:>9}{elapsed:>9.2f}  {'pass' if passed else 'FAIL'}")
+
+    server.stop()
+    data_dir.cleanup()
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,471 @@
+"""
+Local stand-in for the OpenAI API, for benchmarks and offline development.
+
+Implements the endpoints the app calls, with answers that are a pure
+function of the request:
+
+    POST /v1/chat/completions       plain text or JSON mode, streaming,
+                                    cut off at max_tokens like the real API
+    POST /v1/audio/transcriptions   json, text or verbose_json with segments
+    GET  /stats                     request, error and token counters
+
+Prompts are recognised by the JSON schema they ask for, so cleaning (single
+and batched), story organisation and image descriptions all get answers
+the app can parse. Latency follows a configurable distribution plus a time
+per output token, and 429s and 500s can be injected at random, through a
+per-key request budget or scripted per key from a benchmark.
+
+Run it, then point the app at it through OPENAI_BASE_URL; any key works:
+
+    python benchmarks/mock_openai_server.py --port 8001 --latency 0.8 --rate-limit-rate 0.05
+    OPENAI_BASE_URL=http://127.0.0.1:8001/v1 OPENAI_API_KEY=mock streamlit run app.py
+"""
+import argparse
+import hashlib
+import importlib
+import io
+import json
+import os
+import random
+import re
+import threading
+import time
+import wave
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "lognormal")
+
+# Assumed bitrate of compressed uploads, to estimate their duration
+COMPRESSED_AUDIO_BYTES_PER_SECOND = 16000
+
+# Length of each transcript segment
+SEGMENT_SECONDS = 5.0
+
+ERROR_CODES = {400: "invalid_request_error", 401: "invalid_api_key", 403: "permission_denied",
+               429: "rate_limit_exceeded", 500: "server_error", 503: "server_error"}
+
+TRANSCRIPT_WORDS = (
+    "diwali ki raat ghar mein diye jalaye gaye dadi ne kahani sunayi bachche mithai "
+    "baant rahe the rangoli bani thi aangan mein lakshmi puja hui sab log saath baithe "
+    "patakhe chale aur gaon mein roshni phail gayi"
+).split()
+
+def count_tokens(text):
+    """Same rough estimate text_cleaner falls back to without tiktoken"""
+    return len(text) // 3 + 1
+
+def _sentences(text):
+    return [sentence for sentence in re.split(r"(?<=[.!?।॥])\s+", " ".join(text.split())) if sentence]
+
+def clean_text(text):
+    """Deterministic stand-in for a cleaned text: tidy whitespace, capitalised sentences, closing punctuation"""
+    paragraphs = []
+    for paragraph in re.split(r"\n\s*\n", text.strip()):
+        sentences = [sentence[:1].upper() + sentence[1:] for sentence in _sentences(paragraph)]
+        if sentences and sentences[-1][-1] not in ".!?।॥":
+            sentences[-1] += "."
+        if sentences:
+            paragraphs.append(" ".join(sentences))
+    return "\n\n".join(paragraphs)
+
+def _cleaning_result(text):
+    return {
+        "cleaned_text": clean_text(text),
+        "improvements_made": ["Normalized spacing", "Capitalized sentences"],
+        "confidence_score": 0.9,
+        "cultural_notes": ""
+    }
+
+def _after(prompt, *markers):
+    """The part of a prompt after the first marker present in it"""
+    for marker in markers:
+        if marker in prompt:
+            return prompt.split(marker, 1)[1]
+    return prompt
+
+def chat_answer(messages, json_mode):
+    """Answer the app's prompts, recognised by the output format they ask for"""
+    system = next((message["content"] for message in messages if message["role"] == "system"), "")
+    prompt = messages[-1]["content"] if messages else ""
+
+    if "story_title" in system:
+        match = re.search(r"into (\d+) sections", prompt)
+        count = int(match.group(1)) if match else 3
+        story = _after(prompt, ":\n\n")
+        sentences = _sentences(story)
+        size = max(1, -(-len(sentences) // count))
+        parts = [sentences[start:start + size] for start in range(0, len(sentences), size)] or [[]]
+        answer = {
+            "sections": [
+                {"title": f"Part {number}", "content": " ".join(part),
+                 "image_description": f"An illustration of: {' '.join(part)[:120]}", "page_number": number}
+                for number, part in enumerate(parts, 1)
+            ],
+            "story_title": " ".join(story.split()[:6]),
+            "story_summary": sentences[0] if sentences else ""
+        }
+    elif '"sections"' in system and "cleaned_text" in system:
+        try:
+            sections = json.loads(_after(prompt, ":\n\n"))["sections"]
+        except (ValueError, KeyError, TypeError):
+            sections = []
+        answer = {"sections": [dict(_cleaning_result(section["text"]), id=section["id"]) for section in sections]}
+    elif "cleaned_text" in system:
+        answer = _cleaning_result(_after(prompt, "Text to clean:\n\n", ":\n\n"))
+    else:
+        words = _after(prompt, ":\n\n").split()
+        answer = "A warm, colourful festival illustration showing " + " ".join(words[:40])
+
+    if isinstance(answer, str):
+        return json.dumps({"text": answer}, ensure_ascii=False) if json_mode else answer
+    return json.dumps(answer, ensure_ascii=False)
+
+def audio_duration(data):
+    """Duration of a WAV upload, or an estimate for compressed formats"""
+    try:
+        with wave.open(io.BytesIO(data)) as wav_file:
+            return wav_file.getnframes() / float(wav_file.getframerate())
+    except (wave.Error, EOFError):
+        return len(data) / COMPRESSED_AUDIO_BYTES_PER_SECOND
+
+def transcribe(data):
+    """Deterministic transcript: segments of words picked by a hash of the audio"""
+    duration = audio_duration(data)
+    digest = hashlib.sha256(data).digest()
+    segments = []
+    start = 0.0
+    while start < duration:
+        end = min(duration, start + SEGMENT_SECONDS)
+        index = len(segments)
+        words = [TRANSCRIPT_WORDS[(digest[(index + offset) % len(digest)] + offset) % len(TRANSCRIPT_WORDS)]
+                 for offset in range(max(1, int((end - start) * 2)))]
+        segments.append({"id": index, "start": round(start, 2), "end": round(end, 2), "text": " " + " ".join(words)})
+        start = end
+    return duration, segments
+
+def parse_multipart(content_type, body):
+    """Form fields of a multipart/form-data body; files come back as bytes"""
+    message = BytesParser(policy=HTTP).parsebytes(
+        b"Content-Type: " + content_type.encode("latin-1") + b"\r\n\r\n" + body
+    )
+    fields = {}
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        payload = part.get_payload(decode=True) or b""
+        fields[name] = payload if part.get_filename() else payload.decode("utf-8")
+    return fields
+
+class MockOpenAIServer:
+    """
+    Threaded HTTP server answering like the OpenAI API
+
+    Args:
+        port: Port to listen on, 0 for any free port
+        latency: Typical seconds before the first byte of an answer
+        latency_distribution: 'fixed', 'uniform' (latency +/- spread) or
+                              'lognormal' (median latency, sigma spread)
+        latency_spread: Width of the distribution
+        token_latency: Seconds per output token, also the pace of streams
+        audio_latency: Seconds per second of transcribed audio
+        rate_limit_rate: Probability of answering 429
+        server_error_rate: Probability of answering 500
+        requests_per_minute: Per-key budget beyond which requests get 429, 0 for none
+        retry_after: Retry-After seconds sent with injected 429s
+        seed: Seed of the random latencies and injected errors
+    """
+
+    def __init__(self, port=0, latency=0.0, latency_distribution="fixed", latency_spread=0.0,
+                 token_latency=0.0, audio_latency=0.0, rate_limit_rate=0.0, server_error_rate=0.0,
+                 requests_per_minute=0, retry_after=1.0, seed=0):
+        if latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"latency_distribution must be one of {LATENCY_DISTRIBUTIONS}")
+        self.latency = latency
+        self.latency_distribution = latency_distribution
+        self.latency_spread = latency_spread
+        self.token_latency = token_latency
+        self.audio_latency = audio_latency
+        self.rate_limit_rate = rate_limit_rate
+        self.server_error_rate = server_error_rate
+        self.requests_per_minute = requests_per_minute
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._faults = {}
+        self._windows = {}
+        self.reset()
+
+        self.http = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.http.daemon_threads = True
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.http.server_port}/v1"
+
+    def start(self):
+        """Serve from a background thread and return the base URL"""
+        threading.Thread(target=self.http.serve_forever, daemon=True).start()
+        return self.base_url
+
+    def stop(self):
+        self.http.shutdown()
+        self.http.server_close()
+
+    def reset(self):
+        """Clear counters, scripted faults and request budgets"""
+        with self._lock:
+            self._stats = {"requests": 0, "connections": 0, "rate_limited": 0, "server_errors": 0,
+                           "prompt_tokens": 0, "completion_tokens": 0, "audio_seconds": 0.0,
+                           "requests_by_key": {}}
+            self._faults = {}
+            self._windows = {}
+
+    def stats(self):
+        with self._lock:
+            return json.loads(json.dumps(self._stats))
+
+    def inject_faults(self, api_key, faults):
+        """
+        Script the next answers for one key
+
+        Args:
+            api_key: Key whose requests fail
+            faults: Status codes, or (status, headers) tuples, used in order
+                    before the key is answered normally again
+        """
+        with self._lock:
+            self._faults.setdefault(api_key, []).extend(faults)
+
+    def _draw_latency(self):
+        with self._lock:
+            if self.latency_distribution == "uniform":
+                latency = self._random.uniform(self.latency - self.latency_spread, self.latency + self.latency_spread)
+            elif self.latency_distribution == "lognormal" and self.latency > 0:
+                latency = self.latency * self._random.lognormvariate(0.0, self.latency_spread)
+            else:
+                latency = self.latency
+        return max(0.0, latency)
+
+    def _admit(self, api_key):
+        """
+        Decide whether a request fails before it is answered
+
+        Returns:
+            tuple: (status, headers) of the failure, or None to answer
+        """
+        with self._lock:
+            self._stats["requests"] += 1
+            by_key = self._stats["requests_by_key"]
+            by_key[api_key] = by_key.get(api_key, 0) + 1
+
+            scripted = self._faults.get(api_key)
+            if scripted:
+                fault = scripted.pop(0)
+                status, headers = fault if isinstance(fault, tuple) else (fault, {})
+            elif self._random.random() < self.rate_limit_rate:
+                status, headers = 429, {"Retry-After": f"{self.retry_after:g}"}
+            elif self._random.random() < self.server_error_rate:
+                status, headers = 500, {}
+            else:
+                status, headers = None, {}
+                if self.requests_per_minute:
+                    now = time.monotonic()
+                    window = [started for started in self._windows.get(api_key, []) if now - started < 60]
+                    if len(window) >= self.requests_per_minute:
+                        status = 429
+                        headers = {"Retry-After": f"{60 - (now - window[0]):.2f}"}
+                    else:
+                        window.append(now)
+                    self._windows[api_key] = window
+
+            if status == 429:
+                self._stats["rate_limited"] += 1
+            elif status and status >= 500:
+                self._stats["server_errors"] += 1
+        return (status, headers) if status else None
+
+    def _count(self, **amounts):
+        with self._lock:
+            for name, amount in amounts.items():
+                self._stats[name] += amount
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                server._count(connections=1)
+
+            def log_message(self, *args):
+                pass
+
+            def send_json(self, status, payload, headers=None):
+                body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_body(status, body, "application/json", headers)
+
+            def send_body(self, status, body, content_type, headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def send_error_json(self, status, headers):
+                self.send_json(status, {"error": {
+                    "message": f"Mock server answered {status}", "type": "mock_error",
+                    "code": ERROR_CODES.get(status), "param": None
+                }}, headers)
+
+            def do_GET(self):
+                if self.path.rstrip("/") == "/stats":
+                    self.send_json(200, server.stats())
+                else:
+                    self.send_error_json(404, {})
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                api_key = self.headers.get("Authorization", "").replace("Bearer ", "", 1)
+                path = self.path.split("?")[0].rstrip("/")
+
+                fault = server._admit(api_key)
+                if fault:
+                    time.sleep(server._draw_latency() / 10)
+                    self.send_error_json(*fault)
+                elif path.endswith("/chat/completions"):
+                    self.chat_completion(json.loads(body))
+                elif path.endswith("/audio/transcriptions"):
+                    self.transcription(parse_multipart(self.headers["Content-Type"], body))
+                else:
+                    self.send_error_json(404, {})
+
+            def chat_completion(self, request):
+                json_mode = (request.get("response_format") or {}).get("type") == "json_object"
+                content = chat_answer(request.get("messages", []), json_mode)
+                prompt_tokens = sum(count_tokens(message.get("content") or "") for message in request.get("messages", []))
+
+                finish_reason = "stop"
+                completion_tokens = count_tokens(content)
+                max_tokens = request.get("max_tokens") or request.get("max_completion_tokens")
+                if max_tokens and completion_tokens > max_tokens:
+                    content = content[:max_tokens * 3]
+                    completion_tokens, finish_reason = max_tokens, "length"
+                server._count(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+                usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                         "total_tokens": prompt_tokens + completion_tokens}
+                completion_id = "chatcmpl-mock-" + hashlib.sha256(content.encode("utf-8")).hexdigest()[:12]
+                model = request.get("model", "gpt-4o")
+
+                time.sleep(server._draw_latency())
+                if not request.get("stream"):
+                    time.sleep(completion_tokens * server.token_latency)
+                    self.send_json(200, {
+                        "id": completion_id, "object": "chat.completion", "created": int(time.time()), "model": model,
+                        "choices": [{"index": 0, "finish_reason": finish_reason,
+                                     "message": {"role": "assistant", "content": content}}],
+                        "usage": usage
+                    })
+                    return
+
+                # Server-sent events over chunked encoding, about one token per event
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                def event(delta, finish=None):
+                    chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                             "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]}
+                    self.write_chunk(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n")
+
+                event({"role": "assistant", "content": ""})
+                for start in range(0, len(content), 3):
+                    time.sleep(server.token_latency)
+                    event({"content": content[start:start + 3]})
+                event({}, finish_reason)
+                self.write_chunk("data: [DONE]\n\n")
+                self.write_chunk("")
+
+            def write_chunk(self, text):
+                data = text.encode("utf-8")
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+            def transcription(self, fields):
+                duration, segments = transcribe(fields.get("file") or b"")
+                server._count(audio_seconds=duration)
+                time.sleep(server._draw_latency() + duration * server.audio_latency)
+
+                text = "".join(segment["text"] for segment in segments).strip()
+                response_format = fields.get("response_format", "json")
+                if response_format == "text":
+                    self.send_body(200, text.encode("utf-8"), "text/plain; charset=utf-8")
+                elif response_format == "verbose_json":
+                    self.send_json(200, {"task": "transcribe", "language": fields.get("language", "hindi"),
+                                         "duration": round(duration, 2), "text": text, "segments": segments})
+                else:
+                    self.send_json(200, {"text": text})
+
+        return Handler
+
+def configure_app(base_url, data_dir, keys=("mock",)):
+    """
+    Point the app's OpenAI calls at a mock server from within a benchmark
+
+    Sets OPENAI_BASE_URL before any pooled client is created, replaces the
+    configured API keys and moves the usage store, with its rate limit
+    lifted, and the response cache into data_dir, so a run neither touches
+    nor is throttled by the app's own data.
+    """
+    os.environ["OPENAI_BASE_URL"] = base_url
+    from utils import openai_clients, text_cleaner
+    from utils.response_cache import ResponseCache
+    from utils.usage_store import UsageStore, key_fingerprint
+
+    api_manager_module = importlib.import_module("utils.api_manager")
+    api_manager = api_manager_module.api_manager
+    api_manager.api_keys = [{"key": key, "name": key, "id": key_fingerprint(key)} for key in keys]
+    # The usage status panel renders Streamlit widgets; it is not part of what is measured
+    api_manager.show_usage_status = lambda: None
+
+    usage_store = UsageStore(os.path.join(data_dir, "api_usage.sqlite3"), requests_per_minute=10 ** 9, burst=10 ** 9)
+    openai_clients.usage_store = usage_store
+    api_manager_module.usage_store = usage_store
+    text_cleaner.response_cache = ResponseCache(os.path.join(data_dir, "response_cache.sqlite3"))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.5, help="typical seconds before an answer starts")
+    parser.add_argument("--latency-distribution", choices=LATENCY_DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--latency-spread", type=float, default=0.3, help="uniform: +/- seconds, lognormal: sigma")
+    parser.add_argument("--token-latency", type=float, default=0.01, help="seconds per output token")
+    parser.add_argument("--audio-latency", type=float, default=0.05, help="seconds per second of audio")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="probability of a 429")
+    parser.add_argument("--server-error-rate", type=float, default=0.0, help="probability of a 500")
+    parser.add_argument("--requests-per-minute", type=int, default=0, help="per-key budget, 0 for none")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds of injected 429s")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(
+        port=args.port, latency=args.latency, latency_distribution=args.latency_distribution,
+        latency_spread=args.latency_spread, token_latency=args.token_latency, audio_latency=args.audio_latency,
+        rate_limit_rate=args.rate_limit_rate, server_error_rate=args.server_error_rate,
+        requests_per_minute=args.requests_per_minute, retry_after=args.retry_after, seed=args.seed
+    )
+    print(f"Mock OpenAI API on {server.base_url}; set OPENAI_BASE_URL={server.base_url}")
+    try:
+        server.http.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.http.server_close()
+
+if __name__ == "__main__":
+    main()
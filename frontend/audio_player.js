@@ -0,0 +1,262 @@
+// Client-side narration player: play, pause and seek happen in the browser,
+// the audio element fetches the narration from the media endpoint with HTTP
+// range requests.
+(function () {
+  const SKIP_SECONDS = 10;
+
+  const STYLE = `
+    .player {
+      display: flex; flex-direction: column; align-items: center;
+      background: linear-gradient(135deg, #FFE5E5 0%, #E5F5FF 100%);
+      border-radius: 20px; padding: 1.5rem; margin: 0.5rem;
+      box-shadow: 0 8px 20px rgba(0,0,0,0.1);
+    }
+    .narrator-name { font-size: 1.5rem; font-weight: bold; margin-bottom: 0.25rem; }
+    .narrator-status { font-size: 1rem; color: #7F8C8D; margin-bottom: 0.75rem; }
+    .avatar { margin-bottom: 1rem; transition: all 0.3s ease; }
+    .controls { display: flex; gap: 0.5rem; justify-content: center; }
+    .controls button {
+      padding: 0.5rem 1rem; border-radius: 20px; border: none; cursor: pointer;
+      font-size: 1rem; font-weight: bold; background: #FFFFFF;
+      box-shadow: 0 2px 6px rgba(0,0,0,0.15);
+    }
+    .controls button.primary {
+      background: linear-gradient(135deg, #2ECC71 0%, #27AE60 100%); color: white;
+    }
+    .controls button:disabled { opacity: 0.5; cursor: default; }
+    .timeline { display: flex; align-items: center; gap: 0.5rem; width: 100%; margin-top: 0.75rem; }
+    .timeline input[type=range] { flex-grow: 1; }
+    .time { font-variant-numeric: tabular-nums; font-size: 0.9rem; min-width: 6rem; text-align: right; }
+    .volume { display: flex; align-items: center; gap: 0.5rem; margin-top: 0.5rem; font-size: 0.9rem; }
+  `;
+
+  // Envelopes are stored as base64 little-endian float16 values
+  function decodeFloat16(encoded) {
+    const bytes = atob(encoded);
+    const values = new Float32Array(bytes.length / 2);
+    for (let i = 0; i < values.length; i++) {
+      const half = bytes.charCodeAt(2 * i) | (bytes.charCodeAt(2 * i + 1) << 8);
+      const exponent = (half >> 10) & 0x1f;
+      const fraction = half & 0x3ff;
+      const sign = half & 0x8000 ? -1 : 1;
+      if (exponent === 0) {
+        values[i] = sign * Math.pow(2, -14) * (fraction / 1024);
+      } else if (exponent === 31) {
+        values[i] = 0;
+      } else {
+        values[i] = sign * Math.pow(2, exponent - 15) * (1 + fraction / 1024);
+      }
+    }
+    return values;
+  }
+
+  // Avatar sprites are immutable static assets; fetch each one once and
+  // inline it so the lip-sync can reach the mouth elements inside the SVG.
+  // Streamlit serves .svg statics as text/plain with nosniff, so the URLs
+  // only work fetched like this, never as <img src>.
+  const sprites = new Map();
+
+  function loadSprite(src) {
+    const url = Streamlit.resolveUrl(src);
+    if (!url) {
+      return Promise.resolve("");
+    }
+    if (!sprites.has(url)) {
+      sprites.set(url, fetch(url).then(function (response) {
+        return response.ok ? response.text() : "";
+      }).catch(function () {
+        return "";
+      }));
+    }
+    return sprites.get(url);
+  }
+
+  // Point an audio element at its sources in order of preference, so a
+  // browser that cannot play the first one falls back to the next
+  function setSources(audio, sources) {
+    audio.removeAttribute("src");
+    audio.innerHTML = "";
+    (sources || []).forEach(function (source) {
+      const node = document.createElement("source");
+      node.src = Streamlit.resolveUrl(source.src);
+      if (source.type) {
+        node.type = source.type;
+      }
+      audio.appendChild(node);
+    });
+  }
+
+  function formatTime(seconds) {
+    if (!isFinite(seconds)) {
+      return "0:00";
+    }
+    const minutes = Math.floor(seconds / 60);
+    const rest = Math.floor(seconds % 60);
+    return minutes + ":" + String(rest).padStart(2, "0");
+  }
+
+  function mount(root) {
+    const style = document.createElement("style");
+    style.textContent = STYLE;
+    root.appendChild(style);
+
+    const container = document.createElement("div");
+    container.className = "player";
+    container.innerHTML = `
+      <div class="narrator-name"></div>
+      <div class="narrator-status"></div>
+      <div class="avatar"></div>
+      <audio preload="metadata"></audio>
+      <div class="controls">
+        <button class="back" title="Skip backward 10 seconds">⏪ -10s</button>
+        <button class="toggle primary">▶️ Play</button>
+        <button class="forward" title="Skip forward 10 seconds">⏩ +10s</button>
+      </div>
+      <div class="timeline">
+        <input class="seek" type="range" min="0" max="0" step="0.1" value="0">
+        <span class="time">0:00 / 0:00</span>
+      </div>
+      <label class="volume">🔊 <input class="volume-input" type="range" min="0" max="1" step="0.05" value="0.7"></label>
+    `;
+    root.appendChild(container);
+
+    const audio = container.querySelector("audio");
+    const toggle = container.querySelector(".toggle");
+    const seek = container.querySelector(".seek");
+    const time = container.querySelector(".time");
+    const status = container.querySelector(".narrator-status");
+    const avatar = container.querySelector(".avatar");
+    let state = {};
+    let seeking = false;
+    let envelope = null;
+    let envelopeSource = null;
+    let lipSyncFrame = null;
+    let avatars = { idle: "", speaking: "" };
+    let shownAvatar = null;
+
+    function knownDuration() {
+      return isFinite(audio.duration) ? audio.duration : state.duration || 0;
+    }
+
+    // Open the mouth in proportion to the narration's loudness right now
+    function lipSync() {
+      const mouths = avatar.querySelectorAll(".mouth-speaking");
+      const index = Math.floor(audio.currentTime * state.envelope_rate);
+      const level = index < envelope.length ? envelope[index] : 0;
+      mouths.forEach(function (mouth) {
+        mouth.style.transform = "scaleY(" + (0.15 + 0.85 * level).toFixed(3) + ")";
+      });
+      lipSyncFrame = requestAnimationFrame(lipSync);
+    }
+
+    function startLipSync() {
+      if (!envelope || lipSyncFrame !== null) {
+        return;
+      }
+      avatar.querySelectorAll(".mouth-speaking").forEach(function (mouth) {
+        mouth.style.animation = "none";
+        mouth.style.transformBox = "fill-box";
+        mouth.style.transformOrigin = "center top";
+      });
+      lipSyncFrame = requestAnimationFrame(lipSync);
+    }
+
+    function stopLipSync() {
+      if (lipSyncFrame !== null) {
+        cancelAnimationFrame(lipSyncFrame);
+        lipSyncFrame = null;
+      }
+    }
+
+    function renderState() {
+      const speaking = !audio.paused && !audio.ended;
+      toggle.textContent = speaking ? "⏸️ Pause" : "▶️ Play";
+      status.textContent = speaking ? "🎙️ Currently Speaking..." : "⏸️ Ready to Narrate";
+      const markup = speaking ? avatars.speaking : avatars.idle;
+      if (markup !== shownAvatar) {
+        stopLipSync();
+        avatar.innerHTML = markup;
+        shownAvatar = markup;
+      }
+      if (speaking) {
+        startLipSync();
+      } else {
+        stopLipSync();
+      }
+    }
+
+    function renderTime() {
+      const duration = knownDuration();
+      seek.max = duration;
+      if (!seeking) {
+        seek.value = audio.currentTime;
+      }
+      time.textContent = formatTime(audio.currentTime) + " / " + formatTime(duration);
+    }
+
+    function skip(delta) {
+      const duration = knownDuration();
+      const target = Math.max(0, audio.currentTime + delta);
+      audio.currentTime = duration ? Math.min(target, duration) : target;
+    }
+
+    toggle.addEventListener("click", function () {
+      if (audio.paused) {
+        audio.play();
+      } else {
+        audio.pause();
+      }
+    });
+    container.querySelector(".back").addEventListener("click", function () { skip(-SKIP_SECONDS); });
+    container.querySelector(".forward").addEventListener("click", function () { skip(SKIP_SECONDS); });
+    container.querySelector(".volume-input").addEventListener("input", function (event) {
+      audio.volume = Number(event.target.value);
+    });
+    seek.addEventListener("input", function () { seeking = true; });
+    seek.addEventListener("change", function () {
+      audio.currentTime = Number(seek.value);
+      seeking = false;
+    });
+
+    ["play", "pause", "ended"].forEach(function (name) {
+      audio.addEventListener(name, renderState);
+    });
+    ["timeupdate", "durationchange", "loadedmetadata"].forEach(function (name) {
+      audio.addEventListener(name, renderTime);
+    });
+    audio.volume = 0.7;
+
+    return {
+      update: function (args) {
+        const sources = JSON.stringify(args.audio_sources || []);
+        if (sources !== state.sources) {
+          audio.pause();
+          setSources(audio, args.audio_sources);
+          audio.load();
+        }
+        if (args.envelope !== envelopeSource) {
+          envelopeSource = args.envelope;
+          envelope = args.envelope && args.envelope_rate ? decodeFloat16(args.envelope) : null;
+        }
+        if (args.avatar_idle_url !== state.avatar_idle_url || args.avatar_speaking_url !== state.avatar_speaking_url) {
+          Promise.all([loadSprite(args.avatar_idle_url), loadSprite(args.avatar_speaking_url)]).then(function (markup) {
+            // Ignore sprites of a narrator that has been replaced meanwhile
+            if (state.avatar_idle_url === args.avatar_idle_url) {
+              avatars = { idle: markup[0], speaking: markup[1] };
+              renderState();
+            }
+          });
+        }
+        state = Object.assign({}, args, { sources: sources });
+        container.querySelector(".narrator-name").textContent = args.narrator_name || "";
+        container.querySelectorAll("button").forEach(function (button) {
+          button.disabled = !(args.audio_sources || []).length;
+        });
+        renderState();
+        renderTime();
+      },
+    };
+  }
+
+  window.UtsavViews.audio_player = { mount: mount };
+})();
@@ -0,0 +1,245 @@
+// Virtual book reader: the whole story arrives once, pages turn in the
+// browser and the neighbouring pages' illustrations are prefetched.
+(function () {
+  const STYLE = `
+    .reader { padding: 0.5rem; }
+    .book-cover {
+      background: linear-gradient(135deg, #4A90E2 0%, #7B68EE 50%, #FF6B6B 100%);
+      color: white; padding: 4rem 2rem; border-radius: 15px; text-align: center;
+      box-shadow: 0 10px 30px rgba(0,0,0,0.3); margin: 1rem 0 2rem 0;
+    }
+    .cover-title { font-size: 2.5rem; font-weight: bold; margin-bottom: 1rem; text-shadow: 2px 2px 4px rgba(0,0,0,0.3); }
+    .cover-subtitle { font-size: 1.2rem; opacity: 0.9; margin-bottom: 2rem; }
+    .cover-details { font-size: 1rem; opacity: 0.8; }
+    .cover-details p { margin: 0.25rem 0; }
+    .book-page {
+      background: linear-gradient(135deg, #FFFEF7 0%, #FFF8DC 100%);
+      padding: 3rem; border-radius: 15px; min-height: 800px; box-sizing: border-box;
+      position: relative; border: 1px solid #DEB887; margin: 1rem 0;
+      display: grid; grid-template-columns: 1fr 2fr 1fr; grid-template-rows: auto auto 1fr auto;
+      gap: 1rem; transform-style: preserve-3d; backface-visibility: hidden;
+      box-shadow: inset 0 0 50px rgba(139,69,19,0.1), 0 20px 40px rgba(0,0,0,0.15),
+                  inset -10px 0 20px rgba(0,0,0,0.05);
+    }
+    .page-header {
+      grid-column: 1 / -1; text-align: center; font-size: 1.5rem; color: #8B4513;
+      font-weight: bold; border-bottom: 2px solid #D4AF37; padding-bottom: 1rem;
+    }
+    .page-image-top {
+      grid-column: 1; max-width: 200px; width: 100%; border-radius: 10px;
+      box-shadow: 0 4px 8px rgba(0,0,0,0.2);
+    }
+    .page-image-bottom {
+      grid-column: 3; max-width: 200px; width: 100%; border-radius: 10px;
+      box-shadow: 0 4px 8px rgba(0,0,0,0.2); justify-self: end;
+    }
+    .page-content-center {
+      grid-column: 1 / -1; font-size: 1.1rem; line-height: 1.8; color: #2F4F4F;
+      text-align: justify; padding: 1rem; white-space: pre-line;
+    }
+    .page-number { grid-column: -1; text-align: right; color: #8B4513; font-style: italic; }
+    .narration { grid-column: 1 / -1; }
+    .page-turning { animation: pageTurn 0.8s ease-in-out; }
+    @keyframes pageTurn {
+      0% { transform: perspective(1200px) rotateY(0deg); }
+      50% { transform: perspective(1200px) rotateY(-90deg); }
+      100% { transform: perspective(1200px) rotateY(0deg); }
+    }
+    .navigation {
+      display: flex; align-items: center; gap: 1rem; margin-top: 1rem;
+    }
+    .navigation button {
+      padding: 0.5rem 1rem; border-radius: 8px; border: 1px solid #D4AF37; cursor: pointer;
+      font-size: 1rem; background: #FFFFFF;
+    }
+    .navigation button:disabled { opacity: 0.4; cursor: default; }
+    .page-indicator {
+      flex-grow: 1; text-align: center; font-size: 1.1rem; color: #8B4513; font-weight: bold;
+      background: linear-gradient(135deg, #FFF8DC 0%, #F0E68C 100%);
+      padding: 0.5rem; border-radius: 10px; border: 2px solid #D4AF37;
+    }
+    .progress { height: 8px; background: #EEE; border-radius: 4px; margin-top: 0.75rem; overflow: hidden; }
+    .progress div { height: 100%; background: #FF6B35; transition: width 0.3s ease; }
+  `;
+
+  function element(tag, className, text) {
+    const node = document.createElement(tag);
+    if (className) {
+      node.className = className;
+    }
+    if (text !== undefined && text !== null) {
+      node.textContent = text;
+    }
+    return node;
+  }
+
+  function renderCover(page) {
+    const fragment = document.createDocumentFragment();
+    const cover = element("div", "book-cover");
+    cover.appendChild(element("div", "cover-title", "📖 " + page.title));
+    cover.appendChild(element("div", "cover-subtitle", page.subtitle));
+    const details = element("div", "cover-details");
+    (page.details || []).forEach(function (line) {
+      details.appendChild(element("p", null, line));
+    });
+    cover.appendChild(details);
+    fragment.appendChild(cover);
+
+    const about = element("div", "book-page");
+    about.appendChild(element("div", "page-header", "📖 About This Story"));
+    about.appendChild(element("div", "page-content-center", page.content));
+    about.appendChild(element("div", "page-number", "Cover Page"));
+    fragment.appendChild(about);
+    return fragment;
+  }
+
+  function renderPage(page) {
+    const sheet = element("div", "book-page");
+    sheet.appendChild(element("div", "page-header", page.title));
+
+    if (page.narrator) {
+      // The same animated narrator and controls as the audio books
+      const narration = element("div", "narration");
+      sheet.appendChild(narration);
+      const player = window.UtsavViews.audio_player.mount(narration);
+      player.update({
+        audio_sources: page.narrator.audio_sources,
+        narrator_name: "🎭 " + page.narrator.name,
+        avatar_idle_url: page.narrator.avatar_idle_url,
+        avatar_speaking_url: page.narrator.avatar_speaking_url,
+        duration: page.narrator.duration,
+        envelope: page.narrator.envelope,
+        envelope_rate: page.narrator.envelope_rate,
+      });
+    }
+
+    const images = page.images || [];
+    if (images[0]) {
+      const image = element("img", "page-image-top");
+      image.src = Streamlit.resolveUrl(images[0]);
+      image.alt = "Section illustration 1";
+      sheet.appendChild(image);
+    }
+    sheet.appendChild(element("div", "page-content-center", page.content));
+    if (images[1]) {
+      const image = element("img", "page-image-bottom");
+      image.src = Streamlit.resolveUrl(images[1]);
+      image.alt = "Section illustration 2";
+      sheet.appendChild(image);
+    }
+    sheet.appendChild(element("div", "page-number", "Page " + page.number));
+    return sheet;
+  }
+
+  function mount(root) {
+    const style = document.createElement("style");
+    style.textContent = STYLE;
+    root.appendChild(style);
+
+    const container = element("div", "reader");
+    container.innerHTML = `
+      <div class="sheet"></div>
+      <div class="navigation">
+        <button class="prev">⬅️ Previous</button>
+        <div class="page-indicator"></div>
+        <button class="next">Next ➡️</button>
+        <select class="jump" title="Jump to page"></select>
+      </div>
+      <div class="progress"><div></div></div>
+    `;
+    root.appendChild(container);
+
+    const sheet = container.querySelector(".sheet");
+    const prev = container.querySelector(".prev");
+    const next = container.querySelector(".next");
+    const jump = container.querySelector(".jump");
+    const indicator = container.querySelector(".page-indicator");
+    const progress = container.querySelector(".progress div");
+    const prefetched = new Set();
+    let pages = [];
+    let pagesPayload = null;
+    let storyId = null;
+    let current = 0;
+
+    // Warm the browser cache so the next turn paints from memory
+    function prefetch(index) {
+      const page = pages[index];
+      if (!page) {
+        return;
+      }
+      (page.images || []).forEach(function (src) {
+        const url = Streamlit.resolveUrl(src);
+        if (url && !prefetched.has(url)) {
+          prefetched.add(url);
+          new Image().src = url;
+        }
+      });
+    }
+
+    function show(index, animate) {
+      current = Math.max(0, Math.min(index, pages.length - 1));
+      const page = pages[current];
+      // A detached audio element keeps playing, so stop the old page's narration
+      sheet.querySelectorAll("audio").forEach(function (audio) {
+        audio.pause();
+      });
+      sheet.innerHTML = "";
+      if (!page) {
+        return;
+      }
+      sheet.appendChild(page.kind === "cover" ? renderCover(page) : renderPage(page));
+      if (animate) {
+        const turned = sheet.querySelectorAll(".book-page");
+        turned.forEach(function (node) {
+          node.classList.add("page-turning");
+          node.addEventListener("animationend", function () {
+            node.classList.remove("page-turning");
+          }, { once: true });
+        });
+      }
+
+      prev.disabled = current === 0;
+      next.disabled = current === pages.length - 1;
+      jump.value = String(current);
+      indicator.textContent = current === 0 ? "📖 Cover Page" : "📄 Page " + current + " of " + (pages.length - 1);
+      progress.style.width = Math.round((current + 1) / pages.length * 100) + "%";
+      sessionStorage.setItem("utsav-reader-page:" + storyId, String(current));
+
+      prefetch(current + 1);
+      prefetch(current - 1);
+    }
+
+    prev.addEventListener("click", function () { show(current - 1, true); });
+    next.addEventListener("click", function () { show(current + 1, true); });
+    jump.addEventListener("change", function () { show(Number(jump.value), true); });
+    document.addEventListener("keydown", function (event) {
+      if (event.key === "ArrowLeft" && current > 0) {
+        show(current - 1, true);
+      } else if (event.key === "ArrowRight" && current < pages.length - 1) {
+        show(current + 1, true);
+      }
+    });
+
+    return {
+      update: function (args) {
+        // Reruns send the same payload; only a new story or edited content re-renders
+        const payload = JSON.stringify(args.pages || []);
+        if (args.story_id === storyId && payload === pagesPayload) {
+          return;
+        }
+        const sameStory = args.story_id === storyId;
+        storyId = args.story_id;
+        pages = args.pages || [];
+        pagesPayload = payload;
+        jump.innerHTML = "";
+        pages.forEach(function (page, index) {
+          jump.appendChild(element("option", null, index === 0 ? "Cover" : "Page " + index)).value = String(index);
+        });
+        const saved = Number(sessionStorage.getItem("utsav-reader-page:" + storyId));
+        show(sameStory ? current : Number.isInteger(saved) ? saved : 0, false);
+      },
+    };
+  }
+
+  window.UtsavViews.book_reader = { mount: mount };
+})();
@@ -0,0 +1,159 @@
+// Virtualized library grid: every card record arrives in one payload and
+// only the rows scrolled into view are turned into DOM nodes.
+(function () {
+  const ROW_HEIGHT = 330;
+  const MIN_CARD_WIDTH = 340;
+  const OVERSCAN_ROWS = 2;
+  const MAX_VIEWPORT_HEIGHT = 900;
+
+  const THEMES = {
+    book: { background: "linear-gradient(135deg, #FFF8DC 0%, #F0E68C 100%)", accent: "#FF6B35" },
+    audio: { background: "linear-gradient(135deg, #E6F3FF 0%, #CCE7FF 100%)", accent: "#4ECDC4" },
+  };
+
+  const STYLE = `
+    .viewport { overflow-y: auto; position: relative; }
+    .canvas { position: relative; }
+    .row { position: absolute; left: 0; right: 0; display: grid; gap: 1rem; padding: 0 0.25rem; box-sizing: border-box; }
+    .card {
+      height: ${ROW_HEIGHT - 20}px; box-sizing: border-box; padding: 1.25rem 1.5rem;
+      border-radius: 15px; box-shadow: 0 4px 6px rgba(0,0,0,0.1);
+      display: flex; flex-direction: column; overflow: hidden;
+      transition: transform 0.3s ease, box-shadow 0.3s ease;
+    }
+    .card:hover { transform: translateY(-3px); box-shadow: 0 8px 15px rgba(0,0,0,0.2); }
+    .card h3 { margin: 0 0 0.25rem 0; font-size: 1.2rem; white-space: nowrap; overflow: hidden; text-overflow: ellipsis; }
+    .card p { margin: 0.15rem 0; font-size: 0.95rem; }
+    .card .preview {
+      margin-top: 0.5rem; font-style: italic; font-size: 0.85rem; flex-grow: 1; overflow: hidden;
+      display: -webkit-box; -webkit-line-clamp: 3; -webkit-box-orient: vertical;
+    }
+    .card .actions { display: flex; gap: 0.5rem; margin-top: 0.5rem; }
+    .card button {
+      flex-grow: 1; padding: 0.45rem 0.75rem; border-radius: 8px; cursor: pointer;
+      font-size: 0.95rem; border: 1px solid rgba(0,0,0,0.15); background: #FFFFFF;
+    }
+    .card button.primary { color: white; border: none; font-weight: bold; }
+  `;
+
+  function element(tag, className, text) {
+    const node = document.createElement(tag);
+    if (className) {
+      node.className = className;
+    }
+    if (text !== undefined && text !== null) {
+      node.textContent = text;
+    }
+    return node;
+  }
+
+  function labelled(label, value) {
+    const line = element("p");
+    line.appendChild(element("strong", null, label + " "));
+    line.appendChild(document.createTextNode(value));
+    return line;
+  }
+
+  function mount(root) {
+    const style = document.createElement("style");
+    style.textContent = STYLE;
+    root.appendChild(style);
+
+    const viewport = element("div", "viewport");
+    const canvas = element("div", "canvas");
+    viewport.appendChild(canvas);
+    root.appendChild(viewport);
+
+    let state = { cards: [] };
+    let signature = null;
+    let columns = 1;
+    let renderedRange = null;
+
+    function select(card, action) {
+      Streamlit.setComponentValue({ story_id: card.story_id, action: action, clicked_at: Date.now() });
+    }
+
+    function renderCard(card) {
+      const theme = THEMES[state.theme] || THEMES.book;
+      const node = element("div", "card");
+      node.style.background = theme.background;
+      node.style.borderLeft = "5px solid " + theme.accent;
+
+      node.appendChild(element("h3", null, state.icon + " " + card.title)).title = card.title;
+      node.appendChild(element("p", null, card.author)).style.fontStyle = "italic";
+      node.appendChild(labelled("🎊 Festival:", card.festival));
+      node.appendChild(labelled("🗣️ Language:", card.language));
+      node.appendChild(labelled(state.sections_label, String(card.sections)));
+      node.appendChild(labelled("📅 Created:", card.created));
+      node.appendChild(element("div", "preview", card.preview));
+
+      const actions = element("div", "actions");
+      const primary = element("button", "primary", state.action_label);
+      primary.style.background = theme.accent;
+      primary.addEventListener("click", function () { select(card, "open"); });
+      actions.appendChild(primary);
+      if (state.secondary_label) {
+        const secondary = element("button", null, state.secondary_label);
+        secondary.addEventListener("click", function () { select(card, "details"); });
+        actions.appendChild(secondary);
+      }
+      node.appendChild(actions);
+      return node;
+    }
+
+    function renderRows(force) {
+      const rowCount = Math.ceil(state.cards.length / columns);
+      const first = Math.max(0, Math.floor(viewport.scrollTop / ROW_HEIGHT) - OVERSCAN_ROWS);
+      const last = Math.min(rowCount, Math.ceil((viewport.scrollTop + viewport.clientHeight) / ROW_HEIGHT) + OVERSCAN_ROWS);
+      if (!force && renderedRange && renderedRange[0] === first && renderedRange[1] === last) {
+        return;
+      }
+      renderedRange = [first, last];
+
+      canvas.innerHTML = "";
+      for (let rowIndex = first; rowIndex < last; rowIndex++) {
+        const row = element("div", "row");
+        row.style.top = rowIndex * ROW_HEIGHT + "px";
+        row.style.gridTemplateColumns = "repeat(" + columns + ", 1fr)";
+        state.cards.slice(rowIndex * columns, (rowIndex + 1) * columns).forEach(function (card) {
+          row.appendChild(renderCard(card));
+        });
+        canvas.appendChild(row);
+      }
+    }
+
+    function layout() {
+      columns = Math.max(1, Math.min(state.max_columns || 1, Math.floor(root.clientWidth / MIN_CARD_WIDTH)));
+      const height = Math.ceil(state.cards.length / columns) * ROW_HEIGHT;
+      canvas.style.height = height + "px";
+      viewport.style.height = Math.min(height, MAX_VIEWPORT_HEIGHT) + "px";
+      renderRows(true);
+    }
+
+    viewport.addEventListener("scroll", function () {
+      requestAnimationFrame(function () { renderRows(false); });
+    });
+    new ResizeObserver(function () {
+      const previous = columns;
+      columns = Math.max(1, Math.min(state.max_columns || 1, Math.floor(root.clientWidth / MIN_CARD_WIDTH)));
+      if (columns !== previous) {
+        layout();
+      }
+    }).observe(root);
+
+    return {
+      update: function (args) {
+        state = Object.assign({}, args, { cards: args.cards || [] });
+        // Keep the scroll position unless the result set itself changed
+        const next = state.cards.map(function (card) { return card.story_id; }).join(",");
+        if (next !== signature) {
+          signature = next;
+          viewport.scrollTop = 0;
+        }
+        layout();
+      },
+    };
+  }
+
+  window.UtsavViews.story_grid = { mount: mount };
+})();
@@ -0,0 +1,54 @@
+// Minimal implementation of the Streamlit custom component protocol,
+// so the components in this folder need no npm build step.
+(function () {
+  function send(type, data) {
+    window.parent.postMessage(
+      Object.assign({ isStreamlitMessage: true, type: type }, data),
+      "*"
+    );
+  }
+
+  let lastHeight;
+  const renderListeners = [];
+
+  const Streamlit = {
+    setComponentReady: function () {
+      send("streamlit:componentReady", { apiVersion: 1 });
+    },
+    setFrameHeight: function (height) {
+      if (height === undefined) {
+        height = document.body.scrollHeight;
+      }
+      if (height !== lastHeight) {
+        lastHeight = height;
+        send("streamlit:setFrameHeight", { height: height });
+      }
+    },
+    setComponentValue: function (value) {
+      send("streamlit:setComponentValue", { value: value, dataType: "json" });
+    },
+    onRender: function (listener) {
+      renderListeners.push(listener);
+    },
+    // Media URLs are relative to the app, not to the component iframe
+    resolveUrl: function (src) {
+      if (!src || /^(data:|blob:|https?:|\/)/.test(src)) {
+        return src;
+      }
+      const params = new URLSearchParams(window.location.search);
+      const base = params.get("streamlitUrl") || document.referrer || window.location.href;
+      return new URL(src, base).href;
+    },
+  };
+
+  window.addEventListener("message", function (event) {
+    if (event.data && event.data.type === "streamlit:render") {
+      renderListeners.forEach(function (listener) {
+        listener(event.data.args || {});
+      });
+    }
+  });
+
+  window.Streamlit = Streamlit;
+  window.UtsavViews = window.UtsavViews || {};
+})();
@@ -1,7 +1,13 @@
 import streamlit as st
 from utils.auth import check_authentication, get_current_user
+from utils.api_manager import api_manager
 from utils.db import save_story
-import base64
+from utils.audio import process_uploaded_audio, TRANSCODED_AUDIO_EXTENSIONS
+from utils.drafts import start_draft, start_draft_sweeper, get_session_draft_id, put_draft_media, read_draft_media, resolve_draft_story, discard_draft
+from utils.image_index import find_duplicate_image, store_image
+from utils.media import is_stored_image_ref
+from utils.jobs import submit_job, get_job, run_job_inline, workers_available
+from utils.speech_to_text import get_language_code
 from PIL import Image
 import io
 import uuid
@@ -60,6 +66,9 @@ def main():
     user_data = get_current_user()
     st.markdown(f"**Storyteller:** {user_data.get('name', 'Friend')} | **Language:** {user_data.get('preferred_language', 'Hindi')}")
     
+    # Expire abandoned drafts even if nobody starts a new one
+    start_draft_sweeper()
+    
     # Initialize session state
     if 'upload_step' not in st.session_state:
         st.session_state.upload_step = 1
@@ -114,7 +123,10 @@ def show_story_setup():
         
         if st.form_submit_button("Next: Choose Input Method ➡️", type="primary"):
             if title and festival and description:
-                # Store story details in session
+                # Store story details in session, uploads go to a fresh draft
+                start_draft()
+                for key in ['processed_audio', 'transcription_jobs', 'transcripts', 'enhancement_job_id', 'enhancement_error']:
+                    st.session_state.pop(key, None)
                 st.session_state.story_data = {
                     'title': title,
                     'festival': festival,
@@ -188,6 +200,12 @@ def show_multi_section_input():
     else:
         st.info(f"Please record your {num_sections} story sections below. Speak naturally and we'll transcribe it for you.")
     
+    # Enhancement runs in the background; show its progress instead of the inputs
+    if st.session_state.get('enhancement_job_id'):
+        show_enhancement_job()
+        st.markdown('</div>', unsafe_allow_html=True)
+        return
+    
     if input_method == 'text':
         show_text_input_sections()
     else:
@@ -258,14 +276,11 @@ def show_text_input_sections():
                 if len(valid_sections) == num_sections:
                     # Apply AI enhancement if requested
                     if use_ai_enhancement:
-                        enhanced_sections = apply_ai_enhancement(valid_sections)
-                        st.session_state.story_data['sections'] = enhanced_sections
-                        st.session_state.story_data['ai_enhanced'] = True
+                        start_ai_enhancement(valid_sections, story_data['language'])
                     else:
                         st.session_state.story_data['sections'] = valid_sections
                         st.session_state.story_data['ai_enhanced'] = False
-                    
-                    st.session_state.upload_step = 4
+                        st.session_state.upload_step = 4
                     st.rerun()
 
 def show_voice_input_sections():
@@ -303,9 +318,23 @@ def show_voice_input_sections():
             help="Choose the gender of the animated narrator for this section"
         )
         
+        processed_audio = None
         if audio_file:
-            st.success(f"✅ Audio uploaded for Section {i+1}!")
+            processed_audio = get_processed_audio(audio_file)
+        if processed_audio:
+            duration = processed_audio['duration']
+            duration_info = f"{duration:.1f}s, " if duration else ""
+            st.success(
+                f"✅ Audio uploaded for Section {i+1}! "
+                f"({duration_info}{processed_audio['original_size'] // 1024} KB → {processed_audio['size'] // 1024} KB)"
+            )
             st.audio(audio_file, format=f"audio/{audio_file.type.split('/')[-1]}")
+            show_transcription(i, processed_audio['ref'])
+        
+        # A finished transcription fills the text box before it is drawn
+        transcripts = st.session_state.setdefault('transcripts', {})
+        if i in transcripts:
+            st.session_state[f"section_content_voice_{i}"] = transcripts.pop(i)
         
         section_content = st.text_area(
             f"Story Text for Section {i+1}",
@@ -321,17 +350,27 @@ def show_voice_input_sections():
             key=f"voice_image_desc_{i}"
         )
         
-        audio_data = None
-        if audio_file:
-            audio_data = base64.b64encode(audio_file.getvalue()).decode()
-        
-        sections.append({
+        section = {
             'title': section_title,
             'content': section_content,
             'image_description': image_description,
-            'audio_data': audio_data,
+            'audio_data': None,
             'narrator_gender': narrator_gender
-        })
+        }
+        if processed_audio:
+            # Only the draft reference is kept; the bytes stay on disk until save
+            section.update({
+                'audio_ref': processed_audio['ref'],
+                'audio_mime': processed_audio['mime_type'],
+                'audio_duration': processed_audio['duration'],
+                'audio_sample_rate': processed_audio['sample_rate'],
+                'audio_envelope': processed_audio['envelope'],
+                'audio_envelope_rate': processed_audio['envelope_rate'],
+                'audio_fallback_ref': processed_audio.get('fallback_ref'),
+                'audio_fallback_mime': processed_audio['fallback_mime']
+            })
+        
+        sections.append(section)
         
         st.markdown('</div>', unsafe_allow_html=True)
     
@@ -352,7 +391,7 @@ def show_voice_input_sections():
             # Validate sections
             valid_sections = []
             for i, section in enumerate(sections):
-                if section['title'] and (section['content'] or section['audio_data']):
+                if section['title'] and (section['content'] or section.get('audio_ref')):
                     valid_sections.append(section)
                 else:
                     st.error(f"Please provide title and either audio or text content for Section {i+1}")
@@ -361,69 +400,163 @@ def show_voice_input_sections():
             if len(valid_sections) == num_sections:
                 # Apply AI enhancement if requested
                 if use_ai_enhancement:
-                    enhanced_sections = apply_ai_enhancement(valid_sections)
-                    st.session_state.story_data['sections'] = enhanced_sections
-                    st.session_state.story_data['ai_enhanced'] = True
+                    start_ai_enhancement(valid_sections, story_data['language'])
                 else:
                     st.session_state.story_data['sections'] = valid_sections
                     st.session_state.story_data['ai_enhanced'] = False
-                
-                st.session_state.upload_step = 4
+                    st.session_state.upload_step = 4
                 st.rerun()
 
-def apply_ai_enhancement(sections):
-    """Apply AI enhancement to story sections"""
-    enhanced_sections = []
+def get_processed_audio(audio_file):
+    """Run the audio pipeline once per uploaded file and park the result in the draft"""
+    processed = st.session_state.setdefault('processed_audio', {})
+    if audio_file.file_id not in processed:
+        with st.spinner(f"Optimizing audio: {audio_file.name}..."):
+            result = process_uploaded_audio(audio_file.getvalue())
+
+        original_extension = audio_file.name.rsplit('.', 1)[-1].lower()
+        extension = TRANSCODED_AUDIO_EXTENSIONS.get(result['mime_type'], original_extension)
+        success, ref = put_draft_media(get_session_draft_id(), result.pop('data'), extension)
+        if not success:
+            st.error(f"❌ {audio_file.name}: {ref}")
+            return None
+        result['ref'] = ref
+
+        # Browsers without Ogg Opus support play this copy instead
+        fallback_data = result.pop('fallback_data')
+        if fallback_data:
+            success, fallback_ref = put_draft_media(get_session_draft_id(), fallback_data,
+                                                    TRANSCODED_AUDIO_EXTENSIONS[result['fallback_mime']])
+            if not success:
+                st.error(f"❌ {audio_file.name}: {fallback_ref}")
+                return None
+            result['fallback_ref'] = fallback_ref
+
+        processed[audio_file.file_id] = result
+    return processed[audio_file.file_id]
+
+def show_transcription(index, ref):
+    """Offer transcription of a section's audio; only a pending job polls for its text"""
+    entry = st.session_state.setdefault('transcription_jobs', {}).get(index)
+    if entry is None or entry['ref'] != ref or entry.get('error'):
+        show_transcription_controls(index, ref)
+    else:
+        poll_transcription(index)
+
+@st.fragment
+def show_transcription_controls(index, ref):
+    """Transcribe button, or the last attempt's error with a retry"""
+    jobs = st.session_state.transcription_jobs
+    entry = jobs.get(index)
+    if entry is not None and entry['ref'] == ref and entry.get('error'):
+        st.error(f"❌ Transcription failed: {entry['error']}")
+        label, button_key = "🔄 Try again", f"retry_transcribe_voice_{index}"
+    else:
+        label, button_key = "📝 Transcribe audio", f"transcribe_voice_{index}"
     
-    try:
-        from utils.text_cleaner import clean_and_correct_text
-        
-        for section in sections:
-            with st.spinner(f"Enhancing: {section['title']}..."):
-                enhanced_content = clean_and_correct_text(
-                    section['content'],
-                    f"This is a section titled '{section['title']}' from a festival story."
-                )
-                
+    if st.button(label, key=button_key):
+        # Hint Whisper with the story's language, then the storyteller's own
+        language = get_language_code(
+            st.session_state.story_data['language'],
+            get_current_user().get('preferred_language')
+        )
+        jobs[index] = {'ref': ref, 'job_id': submit_job('transcribe', {
+            'draft_id': get_session_draft_id(),
+            'ref': ref,
+            'language': language
+        })}
+        # A full rerun swaps these controls for the polling fragment
+        st.rerun()
+
+@st.fragment(run_every=2)
+def poll_transcription(index):
+    """Poll a pending transcription job until the text is ready"""
+    jobs = st.session_state.transcription_jobs
+    entry = jobs[index]
+    job = get_job(entry['job_id'])
+    if job and job['status'] == 'queued' and not workers_available():
+        with st.spinner("🎧 Transcribing audio..."):
+            job = run_job_inline(entry['job_id'])
+    
+    if job is None or job['status'] == 'failed':
+        entry['error'] = job['error'] if job else 'job not found'
+        st.rerun()
+    elif job['status'] == 'done':
+        jobs.pop(index)
+        st.session_state.transcripts[index] = job['result']['text']
+        st.rerun()
+    else:
+        st.caption("🎧 Transcribing audio... you can keep editing, the text appears here when ready.")
+
+def start_ai_enhancement(sections, language):
+    """Queue AI enhancement of all story sections as a background job"""
+    st.session_state.story_data['sections'] = sections
+    st.session_state.pop('enhancement_error', None)
+    st.session_state.enhancement_job_id = submit_job('enhance_sections', {
+        'items': [[section['content'], f"festival story section titled '{section['title']}'"] for section in sections],
+        'language': language
+    })
+
+def finish_ai_enhancement(sections, ai_enhanced):
+    """Store the final sections and move on to the image step"""
+    st.session_state.story_data['sections'] = sections
+    st.session_state.story_data['ai_enhanced'] = ai_enhanced
+    st.session_state.pop('enhancement_job_id', None)
+    st.session_state.pop('enhancement_error', None)
+    st.session_state.upload_step = 4
+    st.rerun()
+
+def show_enhancement_job():
+    """Show the enhancement job: polled while it runs, a static notice once it failed"""
+    error = st.session_state.get('enhancement_error')
+    if error is None:
+        poll_enhancement_job()
+        return
+    
+    st.error(f"AI enhancement failed: {error}.")
+    if st.button("Continue with original content ➡️", type="primary"):
+        finish_ai_enhancement(st.session_state.story_data['sections'], ai_enhanced=False)
+
+@st.fragment(run_every=2)
+def poll_enhancement_job():
+    """Poll the enhancement job with per-section progress and apply its results once done"""
+    job_id = st.session_state.enhancement_job_id
+    sections = st.session_state.story_data['sections']
+    
+    job = get_job(job_id)
+    if job and job['status'] in ('queued', 'running'):
+        api_manager.show_usage_status()
+    if job and job['status'] == 'queued' and not workers_available():
+        with st.spinner("🤖 Enhancing your story sections..."):
+            job = run_job_inline(job_id)
+    
+    if job is None or job['status'] == 'failed':
+        # Stop polling; the full rerun shows the failure without a fragment
+        st.session_state.enhancement_error = job['error'] if job else 'job not found'
+        st.rerun()
+    
+    if job['status'] == 'done':
+        results = job['result']['results']
+        enhanced_sections = []
+        for section, (success, enhanced_content) in zip(sections, results):
+            if success and isinstance(enhanced_content, dict):
+                # Keep every other field (audio and its metadata) untouched
                 enhanced_sections.append({
-                    'title': section['title'],
-                    'content': enhanced_content.get('cleaned_text', section['content']) if isinstance(enhanced_content, dict) else section['content'],
-                    'image_description': section['image_description'],
-                    'audio_data': section.get('audio_data'),
-                    'narrator_gender': section.get('narrator_gender'),
-                    'ai_improvements': enhanced_content.get('improvements_made', []) if isinstance(enhanced_content, dict) else []
+                    **section,
+                    'content': enhanced_content.get('cleaned_text', section['content']),
+                    'ai_improvements': enhanced_content.get('improvements_made', [])
                 })
-        
-        st.success("✅ AI enhancement completed!")
-        return enhanced_sections
-        
-    except Exception as e:
-        st.error(f"AI enhancement failed: {str(e)}. Using original content.")
-        return sections
-        
-        col1, col2 = st.columns(2)
-        with col1:
-            if st.form_submit_button("⬅️ Back to Input Method"):
-                st.session_state.upload_step = 2
-                st.rerun()
-        
-        with col2:
-            if st.form_submit_button("Next: Upload Images ➡️", type="primary"):
-                # Validate sections
-                valid_sections = []
-                for i, section in enumerate(sections):
-                    if section['title'] and section['content']:
-                        valid_sections.append(section)
-                    else:
-                        st.error(f"Please fill in title and content for Section {i+1}")
-                        return
-                
-                if len(valid_sections) == num_sections:
-                    st.session_state.story_data['sections'] = valid_sections
-                    st.session_state.upload_step = 3
-                    st.rerun()
+            else:
+                enhanced_sections.append(section)
+        finish_ai_enhancement(enhanced_sections, ai_enhanced=any(success for success, _ in results))
     
-    st.markdown('</div>', unsafe_allow_html=True)
+    # Per-section progress as reported by the worker
+    finished = (job['progress'] or {}).get('finished', {})
+    st.progress(len(finished) / len(sections), text=f"🤖 Enhanced {len(finished)} of {len(sections)} sections")
+    for i, section in enumerate(sections):
+        icon = {True: "✅", False: "⚠️"}.get(finished.get(str(i)), "⏳")
+        st.write(f"{icon} Section {i+1}: {section['title']}")
+    st.caption("Enhancement keeps running in the background if your connection drops.")
 
 def show_image_upload_for_sections():
     """Step 4: Upload images for each section"""
@@ -435,7 +568,11 @@ def show_image_upload_for_sections():
     
     st.info("Upload at least 2 images for each section. Images help bring your story to life!")
     
+    # Image key -> draft reference; the JPEG bytes stay on disk until save.
+    # Near-duplicates of already stored illustrations reference the stored copy.
     images = {}
+    bytes_saved = 0
+    draft_id = get_session_draft_id()
     
     for i, section in enumerate(sections):
         st.markdown(f'<div class="section-box">', unsafe_allow_html=True)
@@ -462,15 +599,27 @@ def show_image_upload_for_sections():
                     
                     buffer = io.BytesIO()
                     image.save(buffer, format="JPEG", quality=85)
-                    image_base64 = base64.b64encode(buffer.getvalue()).decode()
                     
-                    images[f"section_{i+1}_image_{j+1}"] = image_base64
+                    duplicate = find_duplicate_image(image)
+                    if duplicate:
+                        ref = duplicate[0]
+                        bytes_saved += buffer.tell()
+                    else:
+                        success, ref = put_draft_media(draft_id, buffer.getvalue(), "jpg")
+                        if not success:
+                            st.error(f"❌ {uploaded_file.name}: {ref}")
+                            continue
+                    
+                    images[f"section_{i+1}_image_{j+1}"] = ref
                     st.image(image, caption=f"Section {i+1} - Image {j+1}", width=200)
             else:
                 st.warning(f"Please upload at least 2 images for Section {i+1}")
         
         st.markdown('</div>', unsafe_allow_html=True)
     
+    if bytes_saved:
+        st.info(f"♻️ Some of these images were uploaded before, so the stored copies are reused ({bytes_saved // 1024} KB saved)")
+    
     # Navigation buttons
     col1, col2 = st.columns(2)
     with col1:
@@ -537,6 +686,19 @@ def show_final_review_and_save():
             user_data = get_current_user()
             story_id = str(uuid.uuid4())
             
+            # Load the parked uploads from the draft only now
+            draft_id = get_session_draft_id()
+            try:
+                # New illustrations join the shared image store so later uploads can reuse them
+                stored_images = {
+                    key: ref if is_stored_image_ref(ref) else store_image(read_draft_media(draft_id, ref))
+                    for key, ref in story_data['images'].items()
+                }
+                sections, images = resolve_draft_story(draft_id, story_data['sections'], stored_images)
+            except OSError:
+                st.error("❌ Your uploaded files have expired. Please upload the audio and images again.")
+                return
+            
             # Prepare story data for saving
             final_story = {
                 'story_id': story_id,
@@ -547,8 +709,8 @@ def show_final_review_and_save():
                 'language': story_data['language'],
                 'story_type': story_data['story_type'],
                 'description': story_data['description'],
-                'sections': story_data['sections'],
-                'images': story_data['images'],
+                'sections': sections,
+                'images': images,
                 'input_method': story_data.get('input_method', 'text'),
                 'created_at': datetime.now().isoformat(),
                 'updated_at': datetime.now().isoformat()
@@ -561,8 +723,9 @@ def show_final_review_and_save():
                 st.success("🎉 Story saved successfully!")
                 st.balloons()
                 
-                # Clear session data
-                for key in ['story_data', 'upload_step']:
+                # Clear session data and the parked uploads
+                discard_draft(draft_id)
+                for key in ['story_data', 'upload_step', 'processed_audio', 'transcription_jobs', 'transcripts', 'draft_id']:
                     if key in st.session_state:
                         del st.session_state[key]
                 
@@ -1,7 +1,6 @@
 import streamlit as st
 from utils.db import get_all_stories, load_story
-import base64
-import html
+from utils.components import book_reader, story_grid
 
 def main():
     """Public Virtual Book Library - Login required"""
@@ -216,12 +215,11 @@ def show_public_story_library():
     st.markdown(f"### 📖 {len(filtered_stories)} Virtual Books Found")
     
     if filtered_stories:
-        # Display stories in grid
-        cols = st.columns(2)
-        for i, story in enumerate(filtered_stories):
-            col = cols[i % 2]
-            with col:
-                display_public_story_card(story)
+        # One virtualized grid instead of a widget pair per story
+        selection = story_grid(filtered_stories, "📖", "📖 Read Story", key="public_story_grid")
+        if selection:
+            st.session_state.public_selected_story = selection['story_id']
+            st.rerun()
     else:
         st.warning("No virtual books match your search criteria.")
         
@@ -229,33 +227,6 @@ def show_public_story_library():
         if st.button("🎧 Try Audio Books Instead"):
             st.switch_page("pages/7_AudioBooks.py")
 
-def display_public_story_card(story):
-    """Display a story card for public viewing"""
-    author_info = f"by {story.get('user_name', 'Anonymous')}"
-    if story.get('user_state', 'Unknown') != 'Unknown':
-        author_info += f" from {story.get('user_state')}"
-    
-    created_date = story.get('created_at', '').split('T')[0] if story.get('created_at') else 'Unknown'
-    description = story.get('description', 'No description available')
-    preview_text = description[:120] + '...' if len(description) > 120 else description
-    
-    st.markdown(f"""
-    <div class="public-story-card">
-        <h3>📖 {story.get('title', 'Untitled Story')}</h3>
-        <p><em>{author_info}</em></p>
-        <p><strong>🎊 Festival:</strong> {story.get('festival', 'Unknown')}</p>
-        <p><strong>🗣️ Language:</strong> {story.get('language', 'Unknown')}</p>
-        <p><strong>📚 Sections:</strong> {len(story.get('sections', []))}</p>
-        <p><strong>📅 Created:</strong> {created_date}</p>
-        <p style="margin-top: 1rem; font-style: italic;">{preview_text}</p>
-    </div>
-    """, unsafe_allow_html=True)
-    
-    if st.button(f"📖 Read Story", key=f"public_read_{story.get('story_id')}", use_container_width=True):
-        st.session_state.public_selected_story = story.get('story_id')
-        st.session_state.public_current_page = 0
-        st.rerun()
-
 def show_public_story_viewer():
     """Display story reader for public viewing"""
     story_id = st.session_state.public_selected_story
@@ -268,160 +239,18 @@ def show_public_story_viewer():
             st.rerun()
         return
     
-    # Initialize page
-    if 'public_current_page' not in st.session_state:
-        st.session_state.public_current_page = 0
-    
-    sections = story.get('sections', [])
-    total_pages = len(sections) + 1  # +1 for cover
-    current_page = st.session_state.public_current_page
-    
-    # Display current page
-    if current_page == 0:
-        show_public_book_cover(story)
-    else:
-        show_public_book_page(story, sections[current_page - 1], current_page)
-    
-    # Navigation
-    show_public_navigation(total_pages)
-
-def show_public_book_cover(story):
-    """Display book cover for public viewing"""
-    author_info = f"by {story.get('user_name', 'Anonymous')}"
-    if story.get('user_state', 'Unknown') != 'Unknown':
-        author_info += f" from {story.get('user_state')}"
-    
-    st.markdown(f"""
-    <div style="background: linear-gradient(135deg, #4A90E2 0%, #7B68EE 50%, #FF6B6B 100%); 
-                color: white; padding: 4rem 2rem; border-radius: 15px; text-align: center; 
-                box-shadow: 0 10px 30px rgba(0,0,0,0.3); margin: 2rem 0;">
-        <div style="font-size: 2.5rem; font-weight: bold; margin-bottom: 1rem; text-shadow: 2px 2px 4px rgba(0,0,0,0.3);">
-            📖 {story.get('title', 'Untitled Story')}
-        </div>
-        <div style="font-size: 1.2rem; opacity: 0.9; margin-bottom: 2rem;">
-            🎊 {story.get('festival', 'Festival')} Story
-        </div>
-        <div style="font-size: 1rem; opacity: 0.8;">
-            {author_info}<br>
-            Language: {story.get('language', 'Unknown')} | 
-            {len(story.get('sections', []))} Sections
-        </div>
-    </div>
-    """, unsafe_allow_html=True)
-    
-    # Story description
-    description = story.get('description', 'No description available')
-    clean_description = html.escape(description).replace('\n', '<br>')
-    
-    st.markdown(f"""
-    <div class="book-page">
-        <div style="grid-column: 1 / -1; text-align: center; margin-bottom: 1rem; 
-                   font-size: 1.5rem; color: #8B4513; font-weight: bold;">
-            📖 About This Story
-        </div>
-        <div class="page-content-center">
-            {clean_description}
-        </div>
-        <div style="grid-column: -1; text-align: right; margin-top: 1rem; color: #8B4513; font-style: italic;">
-            Cover Page
-        </div>
-    </div>
-    """, unsafe_allow_html=True)
-
-def show_public_book_page(story, section, page_number):
-    """Display a book page for public viewing"""
-    images = story.get('images', {})
-    image1_key = f"section_{page_number}_image_1"
-    image2_key = f"section_{page_number}_image_2"
-    
-    # Prepare images
-    image1_data = None
-    image2_data = None
-    
-    if image1_key in images:
-        try:
-            image1_data = base64.b64decode(images[image1_key])
-        except Exception:
-            pass
-    
-    if image2_key in images:
-        try:
-            image2_data = base64.b64decode(images[image2_key])
-        except Exception:
-            pass
-    
-    # Clean content
-    content = section.get('content', 'No content available')
-    clean_content = html.escape(content).replace('\n', '<br>')
-    
-    # Create page HTML
-    page_html = f"""
-    <div class="book-page">
-        <div style="grid-column: 1 / -1; text-align: center; margin-bottom: 1rem; 
-                   font-size: 1.5rem; color: #8B4513; font-weight: bold;">
-            {html.escape(section.get('title', f'Chapter {page_number}'))}
-        </div>
-    """
-    
-    # Add top-left image
-    if image1_data:
-        image1_b64 = base64.b64encode(image1_data).decode()
-        page_html += f'<img src="data:image/jpeg;base64,{image1_b64}" class="page-image-top" alt="Illustration 1">'
-    
-    # Add content
-    page_html += f'<div class="page-content-center">{clean_content}</div>'
-    
-    # Add bottom-right image
-    if image2_data:
-        image2_b64 = base64.b64encode(image2_data).decode()
-        page_html += f'<img src="data:image/jpeg;base64,{image2_b64}" class="page-image-bottom" alt="Illustration 2">'
-    
-    page_html += f"""
-        <div style="grid-column: -1; text-align: right; margin-top: 1rem; color: #8B4513; font-style: italic;">
-            Page {page_number}
-        </div>
-    </div>
-    """
-    
-    st.markdown(page_html, unsafe_allow_html=True)
-
-def show_public_navigation(total_pages):
-    """Show navigation controls for public viewing"""
-    current_page = st.session_state.public_current_page
-    
-    st.markdown('<div class="navigation-controls">', unsafe_allow_html=True)
-    
-    col1, col2, col3, col4, col5 = st.columns([1, 1, 2, 1, 1])
+    # The whole story is sent once; pages turn in the browser without reruns
+    book_reader(story, key=f"public_reader_{story_id}")
     
+    col1, col2 = st.columns(2)
     with col1:
         if st.button("🔙 Library", use_container_width=True):
             del st.session_state.public_selected_story
-            if 'public_current_page' in st.session_state:
-                del st.session_state.public_current_page
             st.rerun()
     
     with col2:
-        if current_page > 0:
-            if st.button("◀ Previous", use_container_width=True):
-                st.session_state.public_current_page = current_page - 1
-                st.rerun()
-    
-    with col3:
-        st.markdown(f"<p style='text-align: center; margin: 0; padding: 0.5rem;'>Page {current_page + 1} of {total_pages}</p>", unsafe_allow_html=True)
-        progress = (current_page + 1) / total_pages
-        st.progress(progress)
-    
-    with col4:
-        if current_page < total_pages - 1:
-            if st.button("Next ▶", use_container_width=True):
-                st.session_state.public_current_page = current_page + 1
-                st.rerun()
-    
-    with col5:
         if st.button("🎧 Audio Books", use_container_width=True):
             st.switch_page("pages/7_AudioBooks.py")
-    
-    st.markdown('</div>', unsafe_allow_html=True)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
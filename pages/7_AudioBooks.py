@@ -1,7 +1,9 @@
 import streamlit as st
 from utils.auth import check_authentication, get_current_user
 from utils.db import get_all_stories, load_story
-import base64
+from utils.media import get_image_src
+from utils.components import audio_player, get_narration_sources, story_grid
+from utils.avatars import get_avatar_urls
 import json
 
 # Page configuration
@@ -277,36 +279,12 @@ def show_audio_book_library():
         st.warning("No audio stories found matching your search criteria.")
     else:
         st.markdown(f"**🎧 Showing {len(filtered_stories)} audio books**")
-        for story in filtered_stories:
-            display_audio_story_card(story)
-
-def display_audio_story_card(story):
-    """Display an audio story card"""
-    col1, col2 = st.columns([3, 1])
-    
-    author_info = f"by {story.get('user_name', 'Anonymous')}"
-    if story.get('user_state', 'Unknown') != 'Unknown':
-        author_info += f" from {story.get('user_state')}"
-    
-    created_date = story.get('created_at', '').split('T')[0] if story.get('created_at') else 'Unknown'
-    
-    with col1:
-        st.markdown(f"""
-        <div class="audio-story-card">
-            <h3>🎧 {story.get('title', 'Untitled Audio Story')}</h3>
-            <p><em>{author_info}</em></p>
-            <p><strong>🎊 Festival:</strong> {story.get('festival', 'Unknown')}</p>
-            <p><strong>🗣️ Language:</strong> {story.get('language', 'Unknown')}</p>
-            <p><strong>📚 Type:</strong> {story.get('story_type', 'Unknown')}</p>
-            <p><strong>🎙️ Audio Sections:</strong> {len(story.get('sections', []))}</p>
-            <p><strong>📅 Created:</strong> {created_date}</p>
-            <p><small>{story.get('description', 'No description available')[:150]}{'...' if len(story.get('description', '')) > 150 else ''}</small></p>
-        </div>
-        """, unsafe_allow_html=True)
-    
-    with col2:
-        if st.button(f"🎧 Listen Now", key=f"listen_{story.get('story_id')}", type="primary"):
-            st.session_state.selected_audio_story_id = story.get('story_id')
+        selection = story_grid(
+            filtered_stories, "🎧", "🎧 Listen Now",
+            sections_label="🎙️ Audio Sections:", theme="audio", key="audio_story_grid"
+        )
+        if selection:
+            st.session_state.selected_audio_story_id = selection['story_id']
             st.rerun()
 
 def show_audio_book_reader():
@@ -363,9 +341,6 @@ def show_audio_book_page(story, section, page_number):
     """Display an audio book page with images and realistic animated narrator"""
     narrator_gender = section.get('narrator_gender', 'Female')
     
-    # Get playing state
-    is_playing = st.session_state.get(f'audio_playing_page_{page_number}', False)
-    
     # Section title
     st.markdown(f"""
     <h2 style="text-align: center; color: #2C3E50; margin-bottom: 2rem; font-size: 2.5rem;">
@@ -373,8 +348,8 @@ def show_audio_book_page(story, section, page_number):
     </h2>
     """, unsafe_allow_html=True)
     
-    # Main layout with images and narrator
-    images = section.get('images', [])
+    # Main layout with images and narrator (cached thumbnail URLs)
+    images = get_section_image_srcs(story, section, page_number)
     
     # Create the main layout
     main_col1, main_col2, main_col3 = st.columns([1, 2, 1])
@@ -382,67 +357,43 @@ def show_audio_book_page(story, section, page_number):
     # Top-left image
     if len(images) >= 1:
         with main_col1:
-            try:
-                image_bytes = base64.b64decode(images[0])
-                st.image(image_bytes, width=120, caption="")
-            except:
-                st.info("📷 Image 1")
+            st.markdown(f'<img src="{images[0]}" width="120" style="border-radius: 10px;" alt="Illustration 1">', unsafe_allow_html=True)
     
-    # Center section with animated narrator
+    # Center section with animated narrator and audio controls
     with main_col2:
-        # Create realistic animated avatar
         narrator_name = f"Male Narrator" if narrator_gender == "Male" else "Female Narrator"
         
-        # Realistic avatar SVG based on gender
-        if narrator_gender == "Male":
-            avatar_svg = create_male_avatar_svg(is_playing)
-        else:
-            avatar_svg = create_female_avatar_svg(is_playing)
+        # Avatar sprites are built once per process and fetched by URL;
+        # the player switches between idle and speaking client-side
+        avatar_urls = get_avatar_urls(narrator_gender)
         
-        # Display narrator info
-        st.markdown(f"""
-        <div style="text-align: center; margin-bottom: 1rem;">
-            <div style="font-size: 1.5rem; font-weight: bold; color: #2C3E50; margin-bottom: 0.5rem;">
-                {narrator_name}
-            </div>
-            <div style="font-size: 1rem; color: #7F8C8D;">
-                {'🎙️ Currently Speaking...' if is_playing else '⏸️ Ready to Narrate'}
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
+        audio_sources = []
+        if section.get('audio_data'):
+            audio_sources = get_narration_sources(story.get('story_id'), page_number, section)
+            if not audio_sources:
+                st.error("Error playing audio: the stored narration could not be read")
+        else:
+            st.info("No audio available for this section")
         
-        # Display animated avatar using HTML component
-        st.components.v1.html(f"""
-        <div style="display: flex; flex-direction: column; align-items: center; justify-content: center; 
-                    background: linear-gradient(135deg, #FFE5E5 0%, #E5F5FF 100%); 
-                    border-radius: 20px; padding: 2rem; margin: 1rem 0;
-                    box-shadow: 0 8px 20px rgba(0,0,0,0.1); position: relative;">
-            
-            <div id="narrator_page_{page_number}" style="margin-bottom: 1rem; transition: all 0.3s ease;">
-                {avatar_svg}
-            </div>
-        </div>
-        """, height=250)
-    
-    # Volume control on the right
+        # Play, pause and seek run in the browser - no reruns during playback
+        audio_player(
+            audio_sources,
+            narrator_name,
+            avatar_urls['idle'],
+            avatar_urls['speaking'],
+            duration=section.get('audio_duration'),
+            envelope=section.get('audio_envelope'),
+            envelope_rate=section.get('audio_envelope_rate'),
+            key=f"audio_player_{story.get('story_id')}"
+        )
+    
+    # Bottom-right image (smaller size for audio books)
     with main_col3:
-        st.markdown("**🔊 Volume**")
-        volume = st.slider("Volume", min_value=0, max_value=100, value=70, key=f"volume_page_{page_number}", help="Adjust audio volume", label_visibility="hidden")
-        
-        # Bottom-right image (smaller size for audio books)
         if len(images) >= 2:
-            try:
-                image_bytes = base64.b64decode(images[1])
-                st.image(image_bytes, width=120, caption="")
-            except:
-                st.info("📷 Image 2")
-        elif len(images) == 1 and len(images) < 2:
+            st.markdown(f'<img src="{images[1]}" width="120" style="border-radius: 10px;" alt="Illustration 2">', unsafe_allow_html=True)
+        elif len(images) == 1:
             # Use first image again if only one available
-            try:
-                image_bytes = base64.b64decode(images[0])
-                st.image(image_bytes, width=120, caption="")
-            except:
-                st.info("📷 Image")
+            st.markdown(f'<img src="{images[0]}" width="120" style="border-radius: 10px;" alt="Illustration">', unsafe_allow_html=True)
     
     # Story content section
     st.markdown(f"""
@@ -453,248 +404,24 @@ def show_audio_book_page(story, section, page_number):
         {section.get('content', 'No content available')}
     </div>
     """, unsafe_allow_html=True)
+
+def get_section_image_srcs(story, section, page_number):
+    """Get cached thumbnail URLs for a section's illustrations"""
+    story_id = story.get('story_id')
+    section_images = section.get('images', [])
     
-    # Advanced Audio Controls
-    st.markdown("---")
-    st.markdown(f"<h3 style='text-align: center; color: #2C3E50;'>🎵 Audio Controls</h3>", unsafe_allow_html=True)
-    
-    # Audio controls in a centered layout
-    control_col1, control_col2, control_col3 = st.columns([1, 2, 1])
+    if section_images:
+        keyed_images = [(f"section_{page_number}_image_{i + 1}", image) for i, image in enumerate(section_images)]
+    else:
+        # Voice uploads keep illustrations at story level, like virtual books
+        story_images = story.get('images', {})
+        image_keys = [f"section_{page_number}_image_1", f"section_{page_number}_image_2"]
+        keyed_images = [(key, story_images[key]) for key in image_keys if key in story_images]
     
-    with control_col2:
-        # Create 4 columns for audio controls
-        ctrl1, ctrl2, ctrl3, ctrl4 = st.columns(4)
-        
-        with ctrl1:
-            if st.button("⏪ -10s", key=f"backward_10s_page_{page_number}", use_container_width=True, help="Skip backward 10 seconds"):
-                st.info("⏪ Skipped backward 10 seconds")
-        
-        with ctrl2:
-            if section.get('audio_data'):
-                if st.button("▶️ Play", key=f"play_audio_page_{page_number}", use_container_width=True, type="primary"):
-                    try:
-                        st.session_state[f'audio_playing_page_{page_number}'] = True
-                        
-                        # Create temporary audio file for better playback
-                        import tempfile
-                        import os
-                        
-                        audio_bytes = base64.b64decode(section['audio_data'])
-                        
-                        # Create temporary file
-                        with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as temp_file:
-                            temp_file.write(audio_bytes)
-                            temp_file_path = temp_file.name
-                        
-                        # Display audio player with custom controls
-                        st.audio(audio_bytes, format='audio/wav', start_time=0)
-                        
-                        # Clean up temporary file
-                        try:
-                            os.unlink(temp_file_path)
-                        except:
-                            pass
-                        
-                        st.success("🎙️ Audio is playing! Watch the narrator speak!")
-                        st.rerun()
-                        
-                    except Exception as e:
-                        st.error(f"Error playing audio: {str(e)}")
-            else:
-                st.button("▶️ Play", disabled=True, use_container_width=True, help="No audio available")
-        
-        with ctrl3:
-            if st.button("⏸️ Pause", key=f"pause_audio_page_{page_number}", use_container_width=True):
-                st.session_state[f'audio_playing_page_{page_number}'] = False
-                st.info("⏸️ Audio paused")
-                st.rerun()
-        
-        with ctrl4:
-            if st.button("⏩ +10s", key=f"forward_10s_page_{page_number}", use_container_width=True, help="Skip forward 10 seconds"):
-                st.info("⏩ Skipped forward 10 seconds")
+    image_srcs = [get_image_src(story_id, key, image, rendition="thumb") for key, image in keyed_images]
+    return [src for src in image_srcs if src]
 
 
-def create_male_avatar_svg(is_speaking=False):
-    """Create realistic male avatar with enhanced lip-sync animation like Talking Tom"""
-    mouth_path = "M60,85 Q75,100 90,85 Q80,95 75,97 Q70,95 60,85 Z" if is_speaking else "M68,90 Q75,93 82,90"
-    blink_class = "eyes-blink" if is_speaking else ""
-    speaking_class = "mouth-speaking" if is_speaking else ""
-    
-    return f"""
-    <svg width="150" height="150" viewBox="0 0 150 150" xmlns="http://www.w3.org/2000/svg">
-        <defs>
-            <radialGradient id="faceGradient" cx="50%" cy="30%" r="70%">
-                <stop offset="0%" style="stop-color:#FFDBAC;stop-opacity:1" />
-                <stop offset="100%" style="stop-color:#F4A460;stop-opacity:1" />
-            </radialGradient>
-            <style>
-                .mouth-speaking {{
-                    animation: talkingMouth 0.3s ease-in-out infinite;
-                    transform-origin: 75px 90px;
-                }}
-                .eyes-blink {{
-                    animation: naturalBlink 3s ease-in-out infinite;
-                }}
-                .speaking-glow {{
-                    animation: speakingGlow 1s ease-in-out infinite alternate;
-                }}
-                @keyframes talkingMouth {{
-                    0% {{ 
-                        d: path("M68,90 Q75,93 82,90"); 
-                        fill: none;
-                    }}
-                    25% {{ 
-                        d: path("M65,88 Q75,95 85,88 Q78,92 75,94 Q72,92 65,88 Z"); 
-                        fill: #FF6B6B;
-                    }}
-                    50% {{ 
-                        d: path("M60,85 Q75,100 90,85 Q80,95 75,97 Q70,95 60,85 Z"); 
-                        fill: #FF4444;
-                    }}
-                    75% {{ 
-                        d: path("M65,88 Q75,95 85,88 Q78,92 75,94 Q72,92 65,88 Z"); 
-                        fill: #FF6B6B;
-                    }}
-                    100% {{ 
-                        d: path("M68,90 Q75,93 82,90"); 
-                        fill: none;
-                    }}
-                }}
-                @keyframes naturalBlink {{
-                    0%, 85%, 100% {{ transform: scaleY(1); }}
-                    90% {{ transform: scaleY(0.2); }}
-                    95% {{ transform: scaleY(1); }}
-                }}
-                @keyframes speakingGlow {{
-                    0% {{ 
-                        stroke: #FF6B6B; 
-                        stroke-width: 2; 
-                        opacity: 0.4; 
-                        r: 60;
-                    }}
-                    100% {{ 
-                        stroke: #FF3333; 
-                        stroke-width: 4; 
-                        opacity: 0.8; 
-                        r: 65;
-                    }}
-                }}
-            </style>
-        </defs>
-        
-        <!-- Speaking glow effect -->
-        {'<circle cx="75" cy="75" r="60" fill="none" class="speaking-glow"/>' if is_speaking else ''}
-        
-        <!-- Face -->
-        <circle cx="75" cy="75" r="60" fill="url(#faceGradient)" stroke="#D2691E" stroke-width="2"/>
-        
-        <!-- Hair -->
-        <path d="M20,45 Q40,20 75,25 Q110,20 130,45 Q120,35 75,15 Q30,35 20,45 Z" fill="#8B4513"/>
-        
-        <!-- Eyes -->
-        <g class="{blink_class}">
-            <ellipse cx="55" cy="65" rx="8" ry="6" fill="white"/>
-            <ellipse cx="95" cy="65" rx="8" ry="6" fill="white"/>
-            <circle cx="55" cy="65" r="4" fill="#4169E1"/>
-            <circle cx="95" cy="65" r="4" fill="#4169E1"/>
-            <circle cx="57" cy="63" r="1.5" fill="white"/>
-            <circle cx="97" cy="63" r="1.5" fill="white"/>
-        </g>
-        
-        <!-- Eyebrows -->
-        <path d="M45,55 Q55,50 65,55" stroke="#654321" stroke-width="3" fill="none"/>
-        <path d="M85,55 Q95,50 105,55" stroke="#654321" stroke-width="3" fill="none"/>
-        
-        <!-- Nose -->
-        <path d="M75,70 L75,85 M70,82 Q75,85 80,82" stroke="#CD853F" stroke-width="2" fill="none"/>
-        
-        <!-- Mouth with enhanced animation -->
-        <path d="{mouth_path}" stroke="#8B4513" stroke-width="3" fill="{'#FF6B6B' if is_speaking else 'none'}" 
-              class="{speaking_class}"/>
-        
-        <!-- Tongue for speaking effect -->
-        {'<ellipse cx="75" cy="92" rx="8" ry="3" fill="#FF9999" opacity="0.7" class="mouth-speaking"/>' if is_speaking else ''}
-    </svg>
-    """
-
-
-def create_female_avatar_svg(is_speaking=False):
-    """Create realistic female avatar with lip-sync animation"""
-    mouth_shape = "M65,90 Q80,100 95,90" if is_speaking else "M70,95 Q80,98 90,95"
-    blink_class = "blink" if is_speaking else ""
-    
-    return f"""
-    <svg width="150" height="150" viewBox="0 0 150 150" xmlns="http://www.w3.org/2000/svg">
-        <defs>
-            <radialGradient id="femaleGradient" cx="50%" cy="30%" r="70%">
-                <stop offset="0%" style="stop-color:#FFEAA7;stop-opacity:1" />
-                <stop offset="100%" style="stop-color:#FAB1A0;stop-opacity:1" />
-            </radialGradient>
-            <style>
-                .mouth-speaking {{
-                    animation: speak 0.5s ease-in-out infinite alternate;
-                }}
-                .eyes-blink {{
-                    animation: blink 2s ease-in-out infinite;
-                }}
-                @keyframes speak {{
-                    0% {{ d: path("M70,95 Q80,98 90,95"); }}
-                    100% {{ d: path("M65,90 Q80,105 95,90"); }}
-                }}
-                @keyframes blink {{
-                    0%, 90%, 100% {{ transform: scaleY(1); }}
-                    5% {{ transform: scaleY(0.1); }}
-                }}
-                .pulse {{
-                    animation: pulse-glow 1s ease-in-out infinite alternate;
-                }}
-                @keyframes pulse-glow {{
-                    0% {{ opacity: 0.3; }}
-                    100% {{ opacity: 0.7; }}
-                }}
-            </style>
-        </defs>
-        
-        <!-- Face -->
-        <circle cx="75" cy="75" r="58" fill="url(#femaleGradient)" stroke="#E17055" stroke-width="2"/>
-        
-        <!-- Hair (longer, more feminine) -->
-        <path d="M15,50 Q30,15 75,20 Q120,15 135,50 Q140,70 130,90 Q120,70 110,85 Q100,75 95,90 Q85,80 80,95 Q75,85 70,95 Q65,80 55,90 Q45,75 40,85 Q30,70 20,90 Q10,70 15,50 Z" fill="#D63031"/>
-        
-        <!-- Eyes (larger, more feminine) -->
-        <g class="{blink_class}">
-            <ellipse cx="55" cy="65" rx="10" ry="7" fill="white"/>
-            <ellipse cx="95" cy="65" rx="10" ry="7" fill="white"/>
-            <circle cx="55" cy="65" r="5" fill="#00B894"/>
-            <circle cx="95" cy="65" r="5" fill="#00B894"/>
-            <circle cx="57" cy="63" r="2" fill="white"/>
-            <circle cx="97" cy="63" r="2" fill="white"/>
-        </g>
-        
-        <!-- Eyelashes -->
-        <path d="M45,60 L50,58 M47,63 L52,60 M48,66 L53,64" stroke="#2D3436" stroke-width="1"/>
-        <path d="M105,60 L100,58 M103,63 L98,60 M102,66 L97,64" stroke="#2D3436" stroke-width="1"/>
-        
-        <!-- Eyebrows (more arched) -->
-        <path d="M43,52 Q55,47 67,52" stroke="#A29BFE" stroke-width="2" fill="none"/>
-        <path d="M83,52 Q95,47 107,52" stroke="#A29BFE" stroke-width="2" fill="none"/>
-        
-        <!-- Nose (smaller, more delicate) -->
-        <path d="M75,70 L75,83 M72,80 Q75,83 78,80" stroke="#FDCB6E" stroke-width="1.5" fill="none"/>
-        
-        <!-- Mouth (with lipstick) -->
-        <path d="{mouth_shape}" stroke="#E84393" stroke-width="2" fill="{'#FD79A8' if is_speaking else '#FDCB6E'}" 
-              class="{'mouth-speaking' if is_speaking else ''}"/>
-        
-        <!-- Blush -->
-        <circle cx="50" cy="80" r="6" fill="#FD79A8" opacity="0.3"/>
-        <circle cx="100" cy="80" r="6" fill="#FD79A8" opacity="0.3"/>
-        
-        <!-- Speaking animation glow -->
-        {'<circle cx="75" cy="75" r="65" fill="none" stroke="#FD79A8" stroke-width="3" opacity="0.6" class="pulse"/>' if is_speaking else ''}
-    </svg>
-    """
-
 def show_audio_navigation(total_pages):
     """Display audio book navigation controls"""
     current_page = st.session_state.current_audio_page
@@ -734,43 +461,9 @@ def show_audio_navigation(total_pages):
         if st.button("📖 View Virtual Books", key="switch_to_virtual"):
             st.switch_page("pages/6_PublicBooks.py")
     
-    # Dynamic progress bar
-    if 'audio_start_time' not in st.session_state:
-        st.session_state.audio_start_time = {}
-    if 'audio_duration' not in st.session_state:
-        st.session_state.audio_duration = {}
-    
-    # Calculate progress based on current page and audio playback
+    # Chapter progress (playback position is shown by the player itself)
     page_progress = (current_page + 1) / total_pages
-    
-    # Add audio progress within current page if playing
-    current_page_key = f'audio_playing_page_{current_page}'
-    if st.session_state.get(current_page_key, False):
-        # Simulate audio progress for demonstration
-        import time
-        current_time = time.time()
-        if current_page not in st.session_state.audio_start_time:
-            st.session_state.audio_start_time[current_page] = current_time
-        
-        # Estimate audio duration (5 seconds for demo)
-        estimated_duration = 5.0
-        elapsed_time = current_time - st.session_state.audio_start_time[current_page]
-        audio_progress = min(elapsed_time / estimated_duration, 1.0)
-        
-        # Combine page progress with current audio progress
-        total_progress = ((current_page - 1) + audio_progress) / total_pages if current_page > 0 else audio_progress / total_pages
-        progress_text = f"🎵 Playing Chapter {current_page} - {int(audio_progress * 100)}% complete"
-        
-        # Auto-advance to next page when audio finishes
-        if audio_progress >= 1.0:
-            st.session_state[current_page_key] = False
-            if current_page in st.session_state.audio_start_time:
-                del st.session_state.audio_start_time[current_page]
-    else:
-        total_progress = page_progress
-        progress_text = f"Listening Progress: {int(page_progress * 100)}%"
-    
-    st.progress(total_progress, text=progress_text)
+    st.progress(page_progress, text=f"Listening Progress: {int(page_progress * 100)}%")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
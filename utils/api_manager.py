@@ -1,161 +1,118 @@
 import os
 import streamlit as st
-from datetime import datetime, timedelta
-import json
+from .response_cache import response_cache
+from .usage_store import usage_store, key_fingerprint, is_rate_limit_variable, read_rate_limits
+
+# Assumed latency of a key before any request to it has been timed
+DEFAULT_KEY_LATENCY_SECONDS = 2.0
+
+# Named keys in display order; every other OPENAI_API_KEY_* variable is added after them
+NAMED_KEY_VARIABLES = [
+    ("OPENAI_API_KEY", "Primary"),
+    ("OPENAI_API_KEY2", "Secondary"),
+    ("OPENAI_API_KEY_BACKUP1", "Backup 1"),
+    ("OPENAI_API_KEY_BACKUP2", "Backup 2"),
+]
 
 class APIKeyManager:
     def __init__(self):
         self.api_keys = self._load_api_keys()
-        self.current_key_index = 0
-        self.usage_counts = self._load_usage_counts()
         self.rate_limit_warning_threshold = 45  # Warn when approaching 50 requests
-        
+    
     def _load_api_keys(self):
-        """Load API keys from environment variables"""
-        keys = []
+        """
+        Load API keys from environment variables
+        
+        Besides the named variables, any OPENAI_API_KEY_<SUFFIX> variable is
+        picked up as a key called after its suffix. The same key set twice
+        is only used once. Each key's rate limit is read from the
+        environment as well, see read_rate_limits.
+        """
+        variables = list(NAMED_KEY_VARIABLES)
+        named = {variable for variable, _ in NAMED_KEY_VARIABLES}
+        for variable in sorted(os.environ):
+            if variable.startswith("OPENAI_API_KEY_") and variable not in named and not is_rate_limit_variable(variable):
+                variables.append((variable, variable[len("OPENAI_API_KEY_"):].replace("_", " ").title()))
         
-        # Primary key
-        primary_key = os.environ.get("OPENAI_API_KEY")
-        if primary_key:
-            keys.append({"key": primary_key, "name": "Primary"})
-        
-        # Secondary key (OPENAI_API_KEY2)
-        secondary_key = os.environ.get("OPENAI_API_KEY2")
-        if secondary_key:
-            keys.append({"key": secondary_key, "name": "Secondary"})
-        
-        # Additional backup keys (if available)
-        backup_key_1 = os.environ.get("OPENAI_API_KEY_BACKUP1")
-        if backup_key_1:
-            keys.append({"key": backup_key_1, "name": "Backup 1"})
-            
-        backup_key_2 = os.environ.get("OPENAI_API_KEY_BACKUP2")
-        if backup_key_2:
-            keys.append({"key": backup_key_2, "name": "Backup 2"})
+        keys = []
+        seen = set()
+        for variable, name in variables:
+            key = os.environ.get(variable)
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            if any(key_info["name"] == name for key_info in keys):
+                name = variable
+            # Usage is stored per key fingerprint, shared by every process using the key
+            key_id = key_fingerprint(key)
+            usage_store.set_limits(key_id, *read_rate_limits(variable))
+            keys.append({"key": key, "name": name, "id": key_id})
         
         return keys
     
-    def _load_usage_counts(self):
-        """Load usage counts from session state"""
-        if 'api_usage_counts' not in st.session_state:
-            st.session_state.api_usage_counts = {}
-        return st.session_state.api_usage_counts
-    
-    def _save_usage_counts(self):
-        """Save usage counts to session state"""
-        st.session_state.api_usage_counts = self.usage_counts
+    def _score(self, key_info, budget):
+        """
+        Expected throughput of a key for the next request
+        
+        Remaining rate-limit capacity, less this process's requests in flight,
+        scaled by how fast and how reliably the key has been answering.
+        """
+        headroom = max(budget['available'] - usage_store.in_flight(key_info["id"]), 0.0)
+        latency = budget['latency'] or DEFAULT_KEY_LATENCY_SECONDS
+        # A small floor keeps saturated keys ordered by speed and reliability
+        return (headroom + 0.1) * (1.0 - budget['error_rate']) / latency
     
-    def get_current_key(self):
-        """Get the current active API key"""
-        if not self.api_keys:
+    def get_current_key(self, exclude=()):
+        """
+        Get the API key the next request should use
+        
+        Every call schedules afresh: the key with the most remaining capacity,
+        weighted by observed latency and error rate, wins. Requests spread
+        over all configured keys, so throughput grows with the number of keys.
+        
+        Args:
+            exclude: Key IDs to avoid, e.g. keys that just failed; ignored
+                     when it would leave no key at all
+        """
+        candidates = [key_info for key_info in self.api_keys if key_info["id"] not in exclude] or self.api_keys
+        if not candidates:
             return None
+        if len(candidates) == 1:
+            return candidates[0]
         
-        if self.current_key_index >= len(self.api_keys):
-            self.current_key_index = 0
-        
-        return self.api_keys[self.current_key_index]
+        budgets = usage_store.budgets()
+        return max(candidates, key=lambda key_info: self._score(
+            key_info, budgets.get(key_info["id"]) or usage_store.empty_budget(key_info["id"])
+        ))
     
-    def record_usage(self, success=True):
-        """Record API usage for the current key"""
-        current_key = self.get_current_key()
-        if not current_key:
-            return
-        
-        key_name = current_key["name"]
-        today = datetime.now().strftime("%Y-%m-%d")
-        
-        if key_name not in self.usage_counts:
-            self.usage_counts[key_name] = {}
-        
-        if today not in self.usage_counts[key_name]:
-            self.usage_counts[key_name][today] = {"requests": 0, "errors": 0}
-        
-        self.usage_counts[key_name][today]["requests"] += 1
-        
-        if not success:
-            self.usage_counts[key_name][today]["errors"] += 1
-        
-        self._save_usage_counts()
-        
-        # Check if we should proactively switch keys
-        if success and self.should_warn_about_limit():
-            self._proactive_key_switch()
+    def get_budgets(self):
+        """
+        Get today's usage and rate-limit headroom of every configured key
+        
+        One read of the shared usage store, cheap enough for every rerun.
+        
+        Returns:
+            dict: key name -> {'requests', 'errors', 'available', 'capacity',
+                  'latency', 'error_rate'}
+        """
+        budgets = usage_store.budgets()
+        return {
+            key_info["name"]: budgets.get(key_info["id"]) or usage_store.empty_budget(key_info["id"])
+            for key_info in self.api_keys
+        }
     
     def get_daily_usage(self, key_name=None):
-        """Get daily usage for a specific key or current key"""
+        """Get daily usage for a specific key or the next scheduled key"""
         if key_name is None:
             current_key = self.get_current_key()
             if not current_key:
                 return 0, 0
             key_name = current_key["name"]
         
-        today = datetime.now().strftime("%Y-%m-%d")
-        
-        if key_name in self.usage_counts and today in self.usage_counts[key_name]:
-            return (
-                self.usage_counts[key_name][today]["requests"],
-                self.usage_counts[key_name][today]["errors"]
-            )
-        
-        return 0, 0
-    
-    def should_warn_about_limit(self):
-        """Check if we should warn about approaching rate limit"""
-        requests, _ = self.get_daily_usage()
-        return requests >= self.rate_limit_warning_threshold
-    
-    def _proactive_key_switch(self):
-        """Proactively switch keys when approaching limit"""
-        if len(self.api_keys) <= 1:
-            return False
-        
-        # Check if next key has lower usage
-        next_index = (self.current_key_index + 1) % len(self.api_keys)
-        next_key = self.api_keys[next_index]
-        next_requests, _ = self.get_daily_usage(next_key['name'])
-        
-        current_requests, _ = self.get_daily_usage()
-        
-        # Switch if next key has significantly lower usage
-        if next_requests < current_requests - 10:
-            old_key = self.get_current_key()
-            self.current_key_index = next_index
-            new_key = self.get_current_key()
-            st.info(f"🔄 Proactively switched from {old_key['name']} ({current_requests} requests) to {new_key['name']} ({next_requests} requests) to avoid rate limits.")
-            return True
-        
-        return False
-    
-    def switch_to_next_key(self):
-        """Switch to the next available API key"""
-        if len(self.api_keys) <= 1:
-            return False
-        
-        old_key = self.get_current_key()
-        self.current_key_index = (self.current_key_index + 1) % len(self.api_keys)
-        new_key = self.get_current_key()
-        
-        if old_key and new_key:
-            st.warning(f"⚠️ Switched from {old_key['name']} API key to {new_key['name']} API key due to rate limiting.")
-            return True
-        
-        return False
-    
-    def handle_rate_limit_error(self):
-        """Handle rate limit error by switching keys if available"""
-        current_key = self.get_current_key()
-        if current_key:
-            requests, errors = self.get_daily_usage()
-            st.error(f"🚫 Rate limit reached for {current_key['name']} API key (Used: {requests} requests today)")
-        
-        if self.switch_to_next_key():
-            new_key = self.get_current_key()
-            new_requests, _ = self.get_daily_usage(new_key['name'])
-            st.success(f"✅ Automatically switched to {new_key['name']} API key (Used: {new_requests} requests today)")
-            return True
-        else:
-            st.error("❌ All API keys have reached their rate limits. Please wait or add more API keys.")
-            return False
+        budget = self.get_budgets().get(key_name)
+        if budget is None:
+            return 0, 0
+        return budget['requests'], budget['errors']
     
     def show_usage_status(self):
         """Display current API usage status"""
@@ -163,29 +120,35 @@ class APIKeyManager:
             st.error("❌ No API keys configured")
             return
         
-        current_key = self.get_current_key()
-        if not current_key:
-            return
-        
-        requests, errors = self.get_daily_usage()
+        budgets = self.get_budgets()
+        requests = sum(budget['requests'] for budget in budgets.values())
+        errors = sum(budget['errors'] for budget in budgets.values())
+        daily_limit = 50 * len(self.api_keys)
         
         # Show warning if approaching limit
-        if self.should_warn_about_limit():
-            st.warning(f"⚠️ API Usage Warning: {requests}/50 requests used today with {current_key['name']} key. Will auto-switch if limit reached.")
+        if requests >= self.rate_limit_warning_threshold * len(self.api_keys):
+            st.warning(f"⚠️ API Usage Warning: {requests}/{daily_limit} requests used today across {len(self.api_keys)} keys.")
         
         # Show info about current usage
         with st.expander("📊 API Usage Status", expanded=False):
-            st.write(f"**Current Key:** {current_key['name']}")
             st.write(f"**Today's Usage:** {requests} requests, {errors} errors")
-            st.write(f"**Available Keys:** {len(self.api_keys)} total")
+            available = sum(budget['available'] for budget in budgets.values())
+            capacity = sum(budget['capacity'] for budget in budgets.values())
+            st.write(f"**Rate Budget:** {available:.0f}/{capacity:.0f} requests available right now")
+            st.write(f"**Available Keys:** {len(self.api_keys)} total, requests go to the least loaded key")
+            
+            cache_stats = response_cache.stats()
+            st.write(f"**Response Cache:** {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+                     f"({cache_stats['hit_rate'] * 100:.0f}% hit rate, {cache_stats['entries']} cached responses)")
             
             if len(self.api_keys) > 1:
                 st.write("**All Keys Status:**")
-                for i, key_info in enumerate(self.api_keys):
-                    key_requests, key_errors = self.get_daily_usage(key_info['name'])
-                    status = "🟢 Active" if i == self.current_key_index else "⚪ Standby"
-                    limit_status = "⚠️ Near Limit" if key_requests >= 45 else "✅ Available"
-                    st.write(f"  - {key_info['name']}: {key_requests}/50 requests, {key_errors} errors - {limit_status} {status}")
+                for key_info in self.api_keys:
+                    budget = budgets[key_info['name']]
+                    limit_status = "⚠️ Near Limit" if budget['requests'] >= self.rate_limit_warning_threshold else "✅ Available"
+                    latency = f"{budget['latency']:.1f}s" if budget['latency'] else "n/a"
+                    st.write(f"  - {key_info['name']}: {budget['requests']}/50 requests, {budget['errors']} errors, "
+                             f"{latency} avg latency, {budget['error_rate'] * 100:.0f}% recent errors - {limit_status}")
 
 # Global API manager instance
-api_manager = APIKeyManager()
\ No newline at end of file
+api_manager = APIKeyManager()
@@ -0,0 +1,232 @@
+import base64
+import io
+import wave
+import numpy as np
+from .media import sniff_audio_mime
+
+# Opus settings for narrated speech - 32 kbps mono is transparent for voice
+OPUS_SAMPLE_RATE = 48000
+OPUS_BITRATE = 32000
+
+# AAC fallback for browsers without Ogg Opus support (older Safari), made
+# from every upload at a voice bitrate comparable to the Opus copy
+AAC_SAMPLE_RATE = 24000
+AAC_BITRATE = 32000
+
+# File extensions of the renditions the pipeline produces
+TRANSCODED_AUDIO_EXTENSIONS = {'audio/ogg': 'ogg', 'audio/mp4': 'm4a'}
+
+# Opus and its fallback are only both kept while together they stay below
+# this share of the upload; otherwise one rendition is stored
+MAX_STORED_AUDIO_RATIO = 0.75
+
+# Amplitude envelope frames per second used for the narrator lip-sync
+ENVELOPE_FRAME_RATE = 25
+
+class EnvelopeBuilder:
+    """Incrementally compute a normalized RMS envelope from mono PCM chunks"""
+
+    def __init__(self, sample_rate, frame_rate=ENVELOPE_FRAME_RATE):
+        self.hop = max(1, sample_rate // frame_rate)
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._frames = []
+
+    def add(self, samples):
+        """Add float32 samples in [-1, 1]"""
+        samples = np.concatenate((self._pending, samples.astype(np.float32, copy=False)))
+        usable = len(samples) - len(samples) % self.hop
+        if usable:
+            windows = samples[:usable].reshape(-1, self.hop)
+            self._frames.append(np.sqrt(np.mean(windows * windows, axis=1)))
+        self._pending = samples[usable:]
+
+    def finish(self):
+        """
+        Returns:
+            np.ndarray: float16 envelope in [0, 1], one value per frame
+        """
+        if self._pending.size:
+            self._frames.append(np.sqrt(np.mean(self._pending * self._pending, keepdims=True)))
+            self._pending = np.zeros(0, dtype=np.float32)
+
+        if not self._frames:
+            return np.zeros(0, dtype=np.float16)
+
+        envelope = np.concatenate(self._frames)
+        # Normalize against a high percentile so a single pop doesn't flatten the rest
+        reference = np.percentile(envelope, 98)
+        if reference > 0:
+            envelope = np.clip(envelope / reference, 0.0, 1.0)
+        return envelope.astype(np.float16)
+
+def encode_envelope(envelope):
+    """Pack a float16 envelope as base64 little-endian bytes for storage"""
+    return base64.b64encode(envelope.astype("<f2").tobytes()).decode()
+
+def _probe_wav(audio_bytes):
+    """Read duration, sample rate and a mono float PCM copy from a WAV file"""
+    with wave.open(io.BytesIO(audio_bytes), "rb") as wav_file:
+        sample_rate = wav_file.getframerate()
+        channels = wav_file.getnchannels()
+        sample_width = wav_file.getsampwidth()
+        frames = wav_file.readframes(wav_file.getnframes())
+
+    duration = len(frames) / float(sample_rate * channels * sample_width)
+    if sample_width != 2:
+        return duration, sample_rate, None
+
+    samples = np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768.0
+    samples = samples.reshape(-1, channels).mean(axis=1)
+    return duration, sample_rate, samples
+
+def _transcode(audio_bytes, container_format, codec, sample_rate, bit_rate, sample_format, on_samples=None):
+    """
+    Decode any supported container and re-encode it as mono `codec` audio
+
+    Args:
+        on_samples: Optional callback receiving each resampled chunk as a
+                    float32 array in [-1, 1]
+
+    Returns:
+        tuple: (encoded_bytes: bytes, samples: int, source_sample_rate: int)
+    """
+    import av
+
+    output_buffer = io.BytesIO()
+    with av.open(io.BytesIO(audio_bytes)) as input_container:
+        input_stream = input_container.streams.audio[0]
+        source_sample_rate = input_stream.codec_context.sample_rate
+
+        with av.open(output_buffer, mode="w", format=container_format) as output_container:
+            output_stream = output_container.add_stream(codec, rate=sample_rate)
+            output_stream.bit_rate = bit_rate
+            resampler = av.AudioResampler(format=sample_format, layout="mono", rate=sample_rate)
+
+            def encode(resampled):
+                if on_samples is not None:
+                    samples = resampled.to_ndarray().reshape(-1)
+                    on_samples(samples / 32768.0 if sample_format == "s16" else samples)
+                for packet in output_stream.encode(resampled):
+                    output_container.mux(packet)
+                return resampled.samples
+
+            total_samples = 0
+            for frame in input_container.decode(input_stream):
+                frame.pts = None
+                for resampled in resampler.resample(frame):
+                    total_samples += encode(resampled)
+
+            for resampled in resampler.resample(None):
+                total_samples += encode(resampled)
+
+            for packet in output_stream.encode(None):
+                output_container.mux(packet)
+
+    return output_buffer.getvalue(), total_samples, source_sample_rate
+
+def _transcode_to_opus(audio_bytes):
+    """
+    Re-encode any supported container as mono Opus in Ogg
+
+    Returns:
+        tuple: (opus_bytes: bytes, duration: float, source_sample_rate: int,
+                envelope: np.ndarray)
+    """
+    envelope = EnvelopeBuilder(OPUS_SAMPLE_RATE)
+    opus_bytes, total_samples, source_sample_rate = _transcode(
+        audio_bytes, "ogg", "libopus", OPUS_SAMPLE_RATE, OPUS_BITRATE, "s16", envelope.add
+    )
+    duration = total_samples / float(OPUS_SAMPLE_RATE)
+    return opus_bytes, duration, source_sample_rate, envelope.finish()
+
+def _transcode_to_aac(audio_bytes):
+    """Re-encode any supported container as mono AAC in an M4A file"""
+    return _transcode(audio_bytes, "mp4", "aac", AAC_SAMPLE_RATE, AAC_BITRATE, "fltp")[0]
+
+def _choose_renditions(audio_bytes, opus_bytes):
+    """
+    Pick what to store next to an Opus transcode
+
+    Returns:
+        tuple: (data, mime_type, fallback_data, fallback_mime). Opus with an
+               AAC fallback while both fit MAX_STORED_AUDIO_RATIO of the
+               upload, else the AAC copy alone when it is smaller than the
+               upload, since every browser plays it, else Opus alone
+    """
+    try:
+        aac_bytes = _transcode_to_aac(audio_bytes)
+    except Exception:
+        aac_bytes = None
+
+    if aac_bytes and len(opus_bytes) + len(aac_bytes) < MAX_STORED_AUDIO_RATIO * len(audio_bytes):
+        return opus_bytes, 'audio/ogg', aac_bytes, 'audio/mp4'
+    if aac_bytes and len(aac_bytes) < len(audio_bytes):
+        return aac_bytes, 'audio/mp4', None, None
+    return opus_bytes, 'audio/ogg', None, None
+
+def process_uploaded_audio(audio_bytes):
+    """
+    Upload-time audio pipeline: transcode narration to Opus and probe metadata
+
+    Falls back to storing the original clip when the transcoder is not
+    available, so uploads never fail because of the pipeline. An AAC
+    fallback for browsers without Ogg Opus support is returned alongside
+    the Opus copy when both together stay well below the upload's size
+    (see _choose_renditions), so stored narration never outgrows the
+    upload.
+
+    Args:
+        audio_bytes: Raw bytes of the uploaded WAV/MP3/M4A file
+
+    Returns:
+        dict: data, mime_type, duration, sample_rate, original_mime,
+              original_size, size of the stored rendition, the base64
+              lip-sync envelope with its frame rate, and fallback_data
+              with fallback_mime (None without a fallback)
+    """
+    original_mime = sniff_audio_mime(audio_bytes)
+    result = {
+        'data': audio_bytes,
+        'mime_type': original_mime,
+        'duration': None,
+        'sample_rate': None,
+        'original_mime': original_mime,
+        'original_size': len(audio_bytes),
+        'size': len(audio_bytes),
+        'envelope': None,
+        'envelope_rate': ENVELOPE_FRAME_RATE,
+        'fallback_data': None,
+        'fallback_mime': None
+    }
+
+    try:
+        opus_bytes, duration, sample_rate, envelope = _transcode_to_opus(audio_bytes)
+        if opus_bytes and len(opus_bytes) < len(audio_bytes):
+            data, mime_type, fallback_data, fallback_mime = _choose_renditions(audio_bytes, opus_bytes)
+            result.update({
+                'data': data,
+                'mime_type': mime_type,
+                'size': len(data),
+                'fallback_data': fallback_data,
+                'fallback_mime': fallback_mime
+            })
+        result.update({
+            'duration': duration,
+            'sample_rate': sample_rate,
+            'envelope': encode_envelope(envelope)
+        })
+        return result
+    except Exception:
+        pass
+
+    if original_mime == 'audio/wav':
+        try:
+            result['duration'], result['sample_rate'], samples = _probe_wav(audio_bytes)
+            if samples is not None:
+                envelope = EnvelopeBuilder(result['sample_rate'])
+                envelope.add(samples)
+                result['envelope'] = encode_envelope(envelope.finish())
+        except Exception:
+            pass
+
+    return result
@@ -0,0 +1,228 @@
+import base64
+import threading
+from .media import write_static_media
+
+_avatar_urls = {}
+_avatar_urls_lock = threading.Lock()
+
+def create_male_avatar_svg(is_speaking=False):
+    """Create realistic male avatar with enhanced lip-sync animation like Talking Tom"""
+    mouth_path = "M60,85 Q75,100 90,85 Q80,95 75,97 Q70,95 60,85 Z" if is_speaking else "M68,90 Q75,93 82,90"
+    blink_class = "eyes-blink" if is_speaking else ""
+    speaking_class = "mouth-speaking" if is_speaking else ""
+    
+    return f"""
+    <svg width="150" height="150" viewBox="0 0 150 150" xmlns="http://www.w3.org/2000/svg">
+        <defs>
+            <radialGradient id="faceGradient" cx="50%" cy="30%" r="70%">
+                <stop offset="0%" style="stop-color:#FFDBAC;stop-opacity:1" />
+                <stop offset="100%" style="stop-color:#F4A460;stop-opacity:1" />
+            </radialGradient>
+            <style>
+                .mouth-speaking {{
+                    animation: talkingMouth 0.3s ease-in-out infinite;
+                    transform-origin: 75px 90px;
+                }}
+                .eyes-blink {{
+                    animation: naturalBlink 3s ease-in-out infinite;
+                }}
+                .speaking-glow {{
+                    animation: speakingGlow 1s ease-in-out infinite alternate;
+                }}
+                @keyframes talkingMouth {{
+                    0% {{ 
+                        d: path("M68,90 Q75,93 82,90"); 
+                        fill: none;
+                    }}
+                    25% {{ 
+                        d: path("M65,88 Q75,95 85,88 Q78,92 75,94 Q72,92 65,88 Z"); 
+                        fill: #FF6B6B;
+                    }}
+                    50% {{ 
+                        d: path("M60,85 Q75,100 90,85 Q80,95 75,97 Q70,95 60,85 Z"); 
+                        fill: #FF4444;
+                    }}
+                    75% {{ 
+                        d: path("M65,88 Q75,95 85,88 Q78,92 75,94 Q72,92 65,88 Z"); 
+                        fill: #FF6B6B;
+                    }}
+                    100% {{ 
+                        d: path("M68,90 Q75,93 82,90"); 
+                        fill: none;
+                    }}
+                }}
+                @keyframes naturalBlink {{
+                    0%, 85%, 100% {{ transform: scaleY(1); }}
+                    90% {{ transform: scaleY(0.2); }}
+                    95% {{ transform: scaleY(1); }}
+                }}
+                @keyframes speakingGlow {{
+                    0% {{ 
+                        stroke: #FF6B6B; 
+                        stroke-width: 2; 
+                        opacity: 0.4; 
+                        r: 60;
+                    }}
+                    100% {{ 
+                        stroke: #FF3333; 
+                        stroke-width: 4; 
+                        opacity: 0.8; 
+                        r: 65;
+                    }}
+                }}
+            </style>
+        </defs>
+        
+        <!-- Speaking glow effect -->
+        {'<circle cx="75" cy="75" r="60" fill="none" class="speaking-glow"/>' if is_speaking else ''}
+        
+        <!-- Face -->
+        <circle cx="75" cy="75" r="60" fill="url(#faceGradient)" stroke="#D2691E" stroke-width="2"/>
+        
+        <!-- Hair -->
+        <path d="M20,45 Q40,20 75,25 Q110,20 130,45 Q120,35 75,15 Q30,35 20,45 Z" fill="#8B4513"/>
+        
+        <!-- Eyes -->
+        <g class="{blink_class}">
+            <ellipse cx="55" cy="65" rx="8" ry="6" fill="white"/>
+            <ellipse cx="95" cy="65" rx="8" ry="6" fill="white"/>
+            <circle cx="55" cy="65" r="4" fill="#4169E1"/>
+            <circle cx="95" cy="65" r="4" fill="#4169E1"/>
+            <circle cx="57" cy="63" r="1.5" fill="white"/>
+            <circle cx="97" cy="63" r="1.5" fill="white"/>
+        </g>
+        
+        <!-- Eyebrows -->
+        <path d="M45,55 Q55,50 65,55" stroke="#654321" stroke-width="3" fill="none"/>
+        <path d="M85,55 Q95,50 105,55" stroke="#654321" stroke-width="3" fill="none"/>
+        
+        <!-- Nose -->
+        <path d="M75,70 L75,85 M70,82 Q75,85 80,82" stroke="#CD853F" stroke-width="2" fill="none"/>
+        
+        <!-- Mouth with enhanced animation -->
+        <path d="{mouth_path}" stroke="#8B4513" stroke-width="3" fill="{'#FF6B6B' if is_speaking else 'none'}" 
+              class="{speaking_class}"/>
+        
+        <!-- Tongue for speaking effect -->
+        {'<ellipse cx="75" cy="92" rx="8" ry="3" fill="#FF9999" opacity="0.7" class="mouth-speaking"/>' if is_speaking else ''}
+    </svg>
+    """
+
+def create_female_avatar_svg(is_speaking=False):
+    """Create realistic female avatar with lip-sync animation"""
+    mouth_shape = "M65,90 Q80,100 95,90" if is_speaking else "M70,95 Q80,98 90,95"
+    blink_class = "blink" if is_speaking else ""
+    
+    return f"""
+    <svg width="150" height="150" viewBox="0 0 150 150" xmlns="http://www.w3.org/2000/svg">
+        <defs>
+            <radialGradient id="femaleGradient" cx="50%" cy="30%" r="70%">
+                <stop offset="0%" style="stop-color:#FFEAA7;stop-opacity:1" />
+                <stop offset="100%" style="stop-color:#FAB1A0;stop-opacity:1" />
+            </radialGradient>
+            <style>
+                .mouth-speaking {{
+                    animation: speak 0.5s ease-in-out infinite alternate;
+                }}
+                .eyes-blink {{
+                    animation: blink 2s ease-in-out infinite;
+                }}
+                @keyframes speak {{
+                    0% {{ d: path("M70,95 Q80,98 90,95"); }}
+                    100% {{ d: path("M65,90 Q80,105 95,90"); }}
+                }}
+                @keyframes blink {{
+                    0%, 90%, 100% {{ transform: scaleY(1); }}
+                    5% {{ transform: scaleY(0.1); }}
+                }}
+                .pulse {{
+                    animation: pulse-glow 1s ease-in-out infinite alternate;
+                }}
+                @keyframes pulse-glow {{
+                    0% {{ opacity: 0.3; }}
+                    100% {{ opacity: 0.7; }}
+                }}
+            </style>
+        </defs>
+        
+        <!-- Face -->
+        <circle cx="75" cy="75" r="58" fill="url(#femaleGradient)" stroke="#E17055" stroke-width="2"/>
+        
+        <!-- Hair (longer, more feminine) -->
+        <path d="M15,50 Q30,15 75,20 Q120,15 135,50 Q140,70 130,90 Q120,70 110,85 Q100,75 95,90 Q85,80 80,95 Q75,85 70,95 Q65,80 55,90 Q45,75 40,85 Q30,70 20,90 Q10,70 15,50 Z" fill="#D63031"/>
+        
+        <!-- Eyes (larger, more feminine) -->
+        <g class="{blink_class}">
+            <ellipse cx="55" cy="65" rx="10" ry="7" fill="white"/>
+            <ellipse cx="95" cy="65" rx="10" ry="7" fill="white"/>
+            <circle cx="55" cy="65" r="5" fill="#00B894"/>
+            <circle cx="95" cy="65" r="5" fill="#00B894"/>
+            <circle cx="57" cy="63" r="2" fill="white"/>
+            <circle cx="97" cy="63" r="2" fill="white"/>
+        </g>
+        
+        <!-- Eyelashes -->
+        <path d="M45,60 L50,58 M47,63 L52,60 M48,66 L53,64" stroke="#2D3436" stroke-width="1"/>
+        <path d="M105,60 L100,58 M103,63 L98,60 M102,66 L97,64" stroke="#2D3436" stroke-width="1"/>
+        
+        <!-- Eyebrows (more arched) -->
+        <path d="M43,52 Q55,47 67,52" stroke="#A29BFE" stroke-width="2" fill="none"/>
+        <path d="M83,52 Q95,47 107,52" stroke="#A29BFE" stroke-width="2" fill="none"/>
+        
+        <!-- Nose (smaller, more delicate) -->
+        <path d="M75,70 L75,83 M72,80 Q75,83 78,80" stroke="#FDCB6E" stroke-width="1.5" fill="none"/>
+        
+        <!-- Mouth (with lipstick) -->
+        <path d="{mouth_shape}" stroke="#E84393" stroke-width="2" fill="{'#FD79A8' if is_speaking else '#FDCB6E'}" 
+              class="{'mouth-speaking' if is_speaking else ''}"/>
+        
+        <!-- Blush -->
+        <circle cx="50" cy="80" r="6" fill="#FD79A8" opacity="0.3"/>
+        <circle cx="100" cy="80" r="6" fill="#FD79A8" opacity="0.3"/>
+        
+        <!-- Speaking animation glow -->
+        {'<circle cx="75" cy="75" r="65" fill="none" stroke="#FD79A8" stroke-width="3" opacity="0.6" class="pulse"/>' if is_speaking else ''}
+    </svg>
+    """
+
+def get_avatar_urls(narrator_gender):
+    """
+    Get the static URLs of a narrator's idle and speaking avatar sprites
+
+    The SVG variants are rendered once per process and written to the static
+    media directory under immutable names, so reruns and page turns only
+    pass two short URLs to the player instead of the markup itself. The
+    URLs are only meant for fetch() (see _write_sprite), not for <img src>.
+
+    Args:
+        narrator_gender: "Male" or "Female"
+
+    Returns:
+        dict: {'idle': url, 'speaking': url}
+    """
+    create_avatar_svg = create_male_avatar_svg if narrator_gender == "Male" else create_female_avatar_svg
+
+    with _avatar_urls_lock:
+        if create_avatar_svg not in _avatar_urls:
+            _avatar_urls[create_avatar_svg] = {
+                'idle': _write_sprite(create_avatar_svg(False)),
+                'speaking': _write_sprite(create_avatar_svg(True))
+            }
+        return _avatar_urls[create_avatar_svg]
+
+def _write_sprite(svg_markup):
+    """
+    Write one avatar variant as a static asset and return its URL
+
+    Streamlit's static file handler only sends a real Content-Type for an
+    allowlist of extensions and serves everything else, .svg included, as
+    text/plain with X-Content-Type-Options: nosniff. The sprites work
+    because frontend/audio_player.js fetch()es the markup and inlines it,
+    which it must do anyway for the lip-sync to reach the mouth elements;
+    an <img src> or CSS url() pointing at these URLs would not render.
+    """
+    svg_bytes = svg_markup.strip().encode()
+    try:
+        return write_static_media(svg_bytes, "svg")
+    except OSError:
+        return f"data:image/svg+xml;base64,{base64.b64encode(svg_bytes).decode()}"
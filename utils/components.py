@@ -0,0 +1,264 @@
+import os
+import threading
+from collections import OrderedDict
+import streamlit as st
+import streamlit.components.v1 as components
+from .avatars import get_avatar_urls
+from .media import get_image_src, get_audio_src
+
+# Plain HTML/JS components, served straight from the frontend folder
+FRONTEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "frontend")
+
+_utsav_component = components.declare_component("utsav_kathalu", path=FRONTEND_DIR)
+
+# Page models of recently opened books per process, keyed by story ID and
+# update time so an edited story is rebuilt
+BOOK_PAGES_CACHE_SIZE = 32
+
+_book_pages_cache = OrderedDict()
+_book_pages_lock = threading.Lock()
+
+def get_narration_sources(story_id, page_number, section):
+    """
+    Get the playable sources of a section's narration: the stored rendition,
+    then the fallback copy for browsers that cannot play Ogg Opus
+
+    Args:
+        story_id: ID of the story the section belongs to
+        page_number: 1-based number of the section
+        section: Section dictionary
+
+    Returns:
+        list: {'src', 'type'} dicts in order of preference, empty without
+              usable audio
+    """
+    audio_key = f"section_{page_number}_audio"
+    renditions = [
+        (audio_key, section.get('audio_data'), section.get('audio_mime')),
+        (f"{audio_key}_fallback", section.get('audio_fallback_data'), section.get('audio_fallback_mime'))
+    ]
+
+    sources = []
+    for key, audio_b64, mime_type in renditions:
+        src = get_audio_src(story_id, key, audio_b64, mime_type)
+        if src:
+            # The codecs parameter lets browsers without Opus skip to the fallback
+            sources.append({'src': src, 'type': 'audio/ogg; codecs=opus' if mime_type == 'audio/ogg' else mime_type})
+    return sources
+
+def audio_player(audio_sources, narrator_name, avatar_idle_url, avatar_speaking_url, duration=None,
+                 envelope=None, envelope_rate=None, key=None):
+    """
+    Render the client-side narration player with the animated narrator
+
+    Play, pause and seeking run entirely in the browser; the narration is
+    streamed from Streamlit's media endpoint with HTTP range requests, so
+    playback starts before the whole clip has been transferred.
+
+    Args:
+        audio_sources: Narration sources from get_narration_sources (empty
+                       disables the controls)
+        narrator_name: Label shown above the avatar
+        avatar_idle_url: URL of the SVG sprite shown while paused
+        avatar_speaking_url: URL of the SVG sprite shown while the narration plays
+        duration: Recorded duration in seconds, used until metadata loads
+        envelope: Base64 float16 amplitude envelope that drives the mouth
+                  from audio.currentTime (falls back to the CSS loop)
+        envelope_rate: Envelope frames per second
+        key: Stable widget key so the player survives page turns
+    """
+    return _utsav_component(
+        view="audio_player",
+        audio_sources=audio_sources,
+        narrator_name=narrator_name,
+        avatar_idle_url=avatar_idle_url,
+        avatar_speaking_url=avatar_speaking_url,
+        duration=duration,
+        envelope=envelope,
+        envelope_rate=envelope_rate,
+        key=key,
+        default=None
+    )
+
+def build_book_pages(story):
+    """
+    Build the reader's page model for a story: the cover followed by one
+    page per section, with illustrations referenced by cached static URLs
+    and narration by its narrator's avatars, recorded duration and
+    lip-sync envelope (see get_book_pages for the audio sources)
+
+    Args:
+        story: Story dictionary
+
+    Returns:
+        list: Page dicts in reading order
+    """
+    story_id = story.get('story_id')
+    images = story.get('images', {})
+    sections = story.get('sections', [])
+
+    author_info = f"By: {story.get('user_name', 'Anonymous')}"
+    if story.get('user_state', 'Unknown') != 'Unknown':
+        author_info += f" from {story.get('user_state')}"
+
+    pages = [{
+        'kind': 'cover',
+        'title': story.get('title', 'Untitled Story'),
+        'subtitle': f"🎊 {story.get('festival', 'Festival')} Story",
+        'details': [
+            author_info,
+            f"Language: {story.get('language', 'Unknown')}",
+            f"Story Type: {story.get('story_type', 'Unknown')}",
+            f"{len(sections)} Sections",
+            f"Created: {story.get('created_at', '')[:10] or 'Unknown'}"
+        ],
+        'content': story.get('description') or 'No description available'
+    }]
+
+    for page_number, section in enumerate(sections, start=1):
+        image_keys = [f"section_{page_number}_image_1", f"section_{page_number}_image_2"]
+        page = {
+            'kind': 'page',
+            'number': page_number,
+            'title': section.get('title') or f'Chapter {page_number}',
+            'content': section.get('content') or 'No content available',
+            'images': [get_image_src(story_id, key, images.get(key)) for key in image_keys],
+            'narrator': None
+        }
+        if section.get('audio_data'):
+            narrator_gender = section.get('narrator_gender', 'Female')
+            avatar_urls = get_avatar_urls(narrator_gender)
+            page['narrator'] = {
+                'name': "Male Narrator" if narrator_gender == "Male" else "Female Narrator",
+                'avatar_idle_url': avatar_urls['idle'],
+                'avatar_speaking_url': avatar_urls['speaking'],
+                'duration': section.get('audio_duration'),
+                'envelope': section.get('audio_envelope'),
+                'envelope_rate': section.get('audio_envelope_rate')
+            }
+        pages.append(page)
+
+    return pages
+
+def get_book_pages(story):
+    """
+    Get the reader's page model for a story
+
+    The model is built once per process for each (story ID, updated_at),
+    which save_story and update_story keep current, and kept in a bounded
+    LRU; stories without both are rebuilt on every call. Narration sources
+    are added on every call because the media file manager only keeps the
+    clips that the current run referenced.
+
+    Args:
+        story: Story dictionary
+
+    Returns:
+        list: Page dicts in reading order
+    """
+    story_id = story.get('story_id')
+    cache_key = (story_id, story.get('updated_at')) if story_id and story.get('updated_at') else None
+
+    pages = None
+    if cache_key is not None:
+        with _book_pages_lock:
+            pages = _book_pages_cache.get(cache_key)
+            if pages is not None:
+                _book_pages_cache.move_to_end(cache_key)
+
+    if pages is None:
+        pages = build_book_pages(story)
+        if cache_key is not None:
+            with _book_pages_lock:
+                _book_pages_cache[cache_key] = pages
+                while len(_book_pages_cache) > BOOK_PAGES_CACHE_SIZE:
+                    _book_pages_cache.popitem(last=False)
+
+    sections = story.get('sections', [])
+    return [
+        dict(page, narrator=dict(page['narrator'], audio_sources=get_narration_sources(
+            story_id, page['number'], sections[page['number'] - 1]
+        ))) if page.get('narrator') else page
+        for page in pages
+    ]
+
+def book_reader(story, key=None):
+    """
+    Render a story as a virtual book that turns pages in the browser
+
+    The whole page model is sent once; page turns, the pageTurn animation,
+    prefetching of the neighbouring pages' illustrations and the narrator
+    player happen client-side, so turning a page does not rerun the script.
+
+    Args:
+        story: Story dictionary
+        key: Stable widget key for the reader
+    """
+    return _utsav_component(
+        view="book_reader",
+        story_id=story.get('story_id'),
+        pages=get_book_pages(story),
+        key=key,
+        default=None
+    )
+
+def build_story_card(story):
+    """Reduce a story to the small record shown on a library card"""
+    author_info = f"by {story.get('user_name', 'Anonymous')}"
+    if story.get('user_state', 'Unknown') != 'Unknown':
+        author_info += f" from {story.get('user_state')}"
+
+    description = story.get('description') or 'No description available'
+    return {
+        'story_id': story.get('story_id'),
+        'title': story.get('title', 'Untitled Story'),
+        'author': author_info,
+        'festival': story.get('festival', 'Unknown'),
+        'language': story.get('language', 'Unknown'),
+        'sections': len(story.get('sections', [])),
+        'created': story.get('created_at', '').split('T')[0] or 'Unknown',
+        'preview': description[:150] + ('...' if len(description) > 150 else '')
+    }
+
+def story_grid(stories, icon, action_label, sections_label="📚 Sections:", theme="book",
+               max_columns=2, secondary_label=None, key=None):
+    """
+    Render a library of story cards as one virtualized grid
+
+    All card records are sent in a single payload and the browser only
+    builds the rows that are scrolled into view, so a rerun costs the same
+    for ten stories or a thousand.
+
+    Args:
+        stories: Stories to list, in display order
+        icon: Emoji shown before each title
+        action_label: Label of the primary card button
+        sections_label: Label of the section count line
+        theme: "book" or "audio" card colours
+        max_columns: Maximum cards per row on wide screens
+        secondary_label: Label of an optional details button
+        key: Stable widget key for the grid
+
+    Returns:
+        dict: {'story_id', 'action'} for a new click ('open' or 'details'),
+              otherwise None
+    """
+    value = _utsav_component(
+        view="story_grid",
+        cards=[build_story_card(story) for story in stories],
+        icon=icon,
+        action_label=action_label,
+        sections_label=sections_label,
+        theme=theme,
+        max_columns=max_columns,
+        secondary_label=secondary_label,
+        key=key,
+        default=None
+    )
+
+    # The component keeps its last value across reruns, so only report each click once
+    handled_key = f"{key}_handled_click"
+    if not value or value.get('clicked_at') == st.session_state.get(handled_key):
+        return None
+    st.session_state[handled_key] = value.get('clicked_at')
+    return {'story_id': value.get('story_id'), 'action': value.get('action')}
@@ -3,6 +3,7 @@ import os
 import streamlit as st
 from datetime import datetime
 import uuid
+from .media import invalidate_story_media
 
 # Data directory paths
 DATA_DIR = "data"
@@ -135,6 +136,9 @@ def update_story(story_id, updated_data):
         with open(story_file, 'w', encoding='utf-8') as f:
             json.dump(story, f, indent=2, ensure_ascii=False)
         
+        # Cached image sources may be stale now
+        invalidate_story_media(story_id)
+        
         return True
     except Exception as e:
         st.error(f"Failed to update story: {str(e)}")
@@ -155,6 +159,8 @@ def delete_story(story_id, user_email):
                 users[user_email]['stories'].remove(story_id)
                 save_users(users)
         
+        invalidate_story_media(story_id)
+        
         return True
     except Exception as e:
         st.error(f"Failed to delete story: {str(e)}")
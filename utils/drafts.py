@@ -0,0 +1,167 @@
+import base64
+import hashlib
+import os
+import shutil
+import threading
+import time
+import uuid
+import streamlit as st
+from .media import is_stored_image_ref
+
+# In-progress uploads live on disk until the story is saved; session state
+# only keeps references to the files below
+DRAFTS_DIR = os.path.join("data", "drafts")
+
+# Maximum bytes a single upload session may park in its draft
+DRAFT_QUOTA_BYTES = 100 * 1024 * 1024
+
+# Drafts untouched for this long are treated as abandoned
+DRAFT_TTL_SECONDS = 24 * 60 * 60
+
+# How often a running app or worker process sweeps abandoned drafts
+DRAFT_SWEEP_INTERVAL_SECONDS = 60 * 60
+
+def _draft_dir(draft_id):
+    return os.path.join(DRAFTS_DIR, draft_id)
+
+def get_draft_usage(draft_id):
+    """Total bytes currently stored in a draft"""
+    draft_dir = _draft_dir(draft_id)
+    if not os.path.isdir(draft_dir):
+        return 0
+    return sum(entry.stat().st_size for entry in os.scandir(draft_dir) if entry.is_file())
+
+def start_draft():
+    """
+    Start a fresh draft for the current session, discarding any previous one
+
+    Returns:
+        str: ID of the new draft
+    """
+    discard_draft(st.session_state.get('draft_id'))
+    cleanup_stale_drafts()
+
+    draft_id = uuid.uuid4().hex
+    os.makedirs(_draft_dir(draft_id), exist_ok=True)
+    st.session_state.draft_id = draft_id
+    return draft_id
+
+def get_session_draft_id():
+    """Return the current session's draft, starting one if needed"""
+    draft_id = st.session_state.get('draft_id')
+    if not draft_id or not os.path.isdir(_draft_dir(draft_id)):
+        draft_id = start_draft()
+    return draft_id
+
+def put_draft_media(draft_id, data, extension):
+    """
+    Park uploaded media bytes in a draft
+
+    Files are content-addressed, so reruns that upload the same bytes again
+    do not count against the quota twice.
+
+    Args:
+        draft_id: ID of the session's draft
+        data: Raw media bytes
+        extension: File extension without the dot
+
+    Returns:
+        tuple: (success: bool, ref_or_message: str)
+    """
+    try:
+        draft_dir = _draft_dir(draft_id)
+        ref = f"{hashlib.sha256(data).hexdigest()[:24]}.{extension}"
+        path = os.path.join(draft_dir, ref)
+
+        if os.path.exists(path):
+            os.utime(draft_dir)
+            return True, ref
+
+        if get_draft_usage(draft_id) + len(data) > DRAFT_QUOTA_BYTES:
+            quota_mb = DRAFT_QUOTA_BYTES // (1024 * 1024)
+            return False, f"Upload limit of {quota_mb} MB per story reached. Please use smaller files."
+
+        os.makedirs(draft_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        os.utime(draft_dir)
+        return True, ref
+
+    except OSError as e:
+        return False, f"Could not store upload: {str(e)}"
+
+def read_draft_media(draft_id, ref):
+    """Read the bytes behind a draft reference"""
+    with open(os.path.join(_draft_dir(draft_id), ref), "rb") as f:
+        return f.read()
+
+def resolve_draft_story(draft_id, sections, images):
+    """
+    Replace draft references with the base64 payloads stored in a story
+
+    Args:
+        draft_id: ID of the session's draft
+        sections: Section dicts, voice sections carry an 'audio_ref' and
+                  optionally an 'audio_fallback_ref'
+        images: Dict of image key -> draft reference (shared-store
+                references are kept as they are)
+
+    Returns:
+        tuple: (sections: list, images: dict) ready to be saved
+    """
+    resolved_sections = []
+    for section in sections:
+        section = dict(section)
+        audio_ref = section.pop('audio_ref', None)
+        if audio_ref:
+            section['audio_data'] = base64.b64encode(read_draft_media(draft_id, audio_ref)).decode()
+        fallback_ref = section.pop('audio_fallback_ref', None)
+        if fallback_ref:
+            section['audio_fallback_data'] = base64.b64encode(read_draft_media(draft_id, fallback_ref)).decode()
+        resolved_sections.append(section)
+
+    resolved_images = {
+        key: ref if is_stored_image_ref(ref) else base64.b64encode(read_draft_media(draft_id, ref)).decode()
+        for key, ref in images.items()
+    }
+    return resolved_sections, resolved_images
+
+def discard_draft(draft_id):
+    """Delete a draft and everything stored in it"""
+    if draft_id:
+        shutil.rmtree(_draft_dir(draft_id), ignore_errors=True)
+
+def cleanup_stale_drafts(max_age=DRAFT_TTL_SECONDS):
+    """Delete drafts of abandoned upload sessions"""
+    if not os.path.isdir(DRAFTS_DIR):
+        return
+    cutoff = time.time() - max_age
+    for entry in os.scandir(DRAFTS_DIR):
+        try:
+            if entry.is_dir() and entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+        except OSError:
+            continue
+
+@st.cache_resource(show_spinner=False)
+def start_draft_sweeper():
+    """
+    Sweep abandoned drafts now and every DRAFT_SWEEP_INTERVAL_SECONDS after,
+    once per process, so they expire even when nobody starts a new draft
+
+    Returns:
+        threading.Thread: The daemon thread running the sweeps
+    """
+    def sweep():
+        while True:
+            try:
+                cleanup_stale_drafts()
+            except OSError:
+                pass
+            time.sleep(DRAFT_SWEEP_INTERVAL_SECONDS)
+
+    thread = threading.Thread(target=sweep, name="draft-sweeper", daemon=True)
+    thread.start()
+    return thread
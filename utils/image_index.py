@@ -0,0 +1,181 @@
+import hashlib
+import io
+import json
+import os
+import threading
+import numpy as np
+from .media import IMAGE_STORE_DIR, STORED_IMAGE_PREFIX
+
+# Append-only log of (perceptual hash, stored file) pairs shared by every
+# process; each one replays lines the others appended before a lookup
+INDEX_FILE = os.path.join("data", "image_hashes.jsonl")
+
+# Hashes this close (in differing bits out of 64) are the same illustration
+DUPLICATE_DISTANCE = 3
+
+# The 64-bit hash is split into this many exact-match keys. By the pigeonhole
+# principle two hashes within DUPLICATE_DISTANCE bits share at least one key
+# unchanged, so a lookup only compares against those buckets.
+HASH_CHUNKS = DUPLICATE_DISTANCE + 1
+
+def compute_dhash(image):
+    """
+    Compute the 64-bit difference hash of an image
+
+    The image is shrunk to 9x8 grayscale and each bit records whether a
+    pixel is brighter than its right neighbour, so re-encoding, resizing
+    and small colour shifts leave the hash (nearly) unchanged.
+
+    Args:
+        image: PIL image
+
+    Returns:
+        int: 64-bit perceptual hash
+    """
+    from PIL import Image
+
+    pixels = np.asarray(image.convert("L").resize((9, 8), Image.Resampling.LANCZOS), dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+class ImageHashIndex:
+    """Multi-index hash table for Hamming-distance lookups of 64-bit hashes"""
+
+    def __init__(self, chunks=HASH_CHUNKS):
+        self.chunks = chunks
+        self._bounds = [(64 * i // chunks, 64 * (i + 1) // chunks) for i in range(chunks)]
+        self._tables = [{} for _ in range(chunks)]
+        self._entries = []
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _keys(self, image_hash):
+        for start, end in self._bounds:
+            yield (image_hash >> start) & ((1 << (end - start)) - 1)
+
+    def add(self, image_hash, ref, size):
+        entry_id = len(self._entries)
+        self._entries.append((image_hash, ref, size))
+        for table, key in zip(self._tables, self._keys(image_hash)):
+            table.setdefault(key, []).append(entry_id)
+
+    def find(self, image_hash, max_distance=DUPLICATE_DISTANCE):
+        """
+        Find the closest indexed image within max_distance bits
+
+        Returns:
+            tuple: (ref: str, size: int, distance: int), or None
+        """
+        best = None
+        seen = set()
+        for table, key in zip(self._tables, self._keys(image_hash)):
+            for entry_id in table.get(key, ()):
+                if entry_id in seen:
+                    continue
+                seen.add(entry_id)
+                candidate_hash, ref, size = self._entries[entry_id]
+                distance = (candidate_hash ^ image_hash).bit_count()
+                if distance <= max_distance and (best is None or distance < best[2]):
+                    best = (ref, size, distance)
+        return best
+
+_index = None
+_index_offset = 0
+_index_lock = threading.Lock()
+
+def _is_stored(ref):
+    return os.path.exists(os.path.join(IMAGE_STORE_DIR, ref[len(STORED_IMAGE_PREFIX):]))
+
+def _get_index():
+    """
+    Get the process-wide index, caught up with its log
+
+    Only the lines appended since the last call are read, so hashes stored
+    by workers and other server processes are found too. A log that shrank
+    was replaced and is replayed from the start. Call with _index_lock held.
+    """
+    global _index, _index_offset
+    try:
+        size = os.path.getsize(INDEX_FILE)
+    except OSError:
+        size = 0
+
+    if _index is None or size < _index_offset:
+        _index, _index_offset = ImageHashIndex(), 0
+    if size == _index_offset:
+        return _index
+
+    with open(INDEX_FILE, 'rb') as f:
+        f.seek(_index_offset)
+        data = f.read(size - _index_offset)
+    # A line still being written by another process is picked up next time
+    complete = data.rfind(b"\n") + 1
+    for line in data[:complete].splitlines():
+        try:
+            record = json.loads(line)
+            _index.add(int(record['hash'], 16), record['ref'], record['size'])
+        except (ValueError, KeyError):
+            continue
+    _index_offset += complete
+    return _index
+
+def find_duplicate_image(image):
+    """
+    Look up an already stored near-duplicate of an uploaded illustration
+
+    Args:
+        image: PIL image of the upload
+
+    Returns:
+        tuple: (ref: str, stored_size: int, distance: int), or None
+    """
+    image_hash = compute_dhash(image)
+    with _index_lock:
+        match = _get_index().find(image_hash)
+
+    if match and _is_stored(match[0]):
+        return match
+    return None
+
+def store_image(image_bytes, extension="jpg"):
+    """
+    Move an illustration into the shared image store and index it
+
+    A near-duplicate that is already stored is reused instead of writing
+    another copy.
+
+    Args:
+        image_bytes: Encoded image bytes
+        extension: File extension without the dot
+
+    Returns:
+        str: Stored image reference to keep in the story's images dict
+    """
+    from PIL import Image
+
+    image_hash = compute_dhash(Image.open(io.BytesIO(image_bytes)))
+
+    with _index_lock:
+        index = _get_index()
+        match = index.find(image_hash)
+        if match and _is_stored(match[0]):
+            return match[0]
+
+        filename = f"{hashlib.sha256(image_bytes).hexdigest()[:24]}.{extension}"
+        path = os.path.join(IMAGE_STORE_DIR, filename)
+        if not os.path.exists(path):
+            os.makedirs(IMAGE_STORE_DIR, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(image_bytes)
+            os.replace(tmp_path, path)
+
+        ref = f"{STORED_IMAGE_PREFIX}{filename}"
+        os.makedirs(os.path.dirname(INDEX_FILE), exist_ok=True)
+        with open(INDEX_FILE, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'hash': f"{image_hash:016x}", 'ref': ref, 'size': len(image_bytes)}) + "\n")
+        # Index the new line through the log, with anything appended meanwhile
+        _get_index()
+
+    return ref
@@ -0,0 +1,296 @@
+import io
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# Persistent queue shared by the web processes and the job workers
+JOBS_FILE = os.path.join("data", "jobs.sqlite3")
+
+# A running job whose worker has not reported for this long is handed out again
+JOB_LEASE_SECONDS = 120
+
+# Failed or abandoned jobs are retried this many times before giving up
+MAX_JOB_ATTEMPTS = 3
+
+# Workers that have not sent a heartbeat for this long are considered gone
+WORKER_TIMEOUT_SECONDS = 30
+
+# Finished jobs are deleted after this long
+JOB_RETENTION_SECONDS = 7 * 24 * 60 * 60
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+@contextmanager
+def _connect(write=True):
+    """
+    Open a connection for one transaction and always close it
+
+    Reads with write=False run without a transaction, on WAL's snapshot,
+    so polling never waits for or blocks the writers.
+    """
+    global _schema_ready
+    os.makedirs(os.path.dirname(JOBS_FILE), exist_ok=True)
+    connection = sqlite3.connect(JOBS_FILE, timeout=30, isolation_level=None)
+    try:
+        with _schema_lock:
+            if not _schema_ready:
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.executescript("""
+                    CREATE TABLE IF NOT EXISTS jobs (
+                        job_id TEXT PRIMARY KEY,
+                        kind TEXT NOT NULL,
+                        payload TEXT NOT NULL,
+                        status TEXT NOT NULL,
+                        progress TEXT,
+                        result TEXT,
+                        error TEXT,
+                        attempts INTEGER NOT NULL DEFAULT 0,
+                        worker TEXT,
+                        created_at REAL NOT NULL,
+                        updated_at REAL NOT NULL
+                    );
+                    CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+                    CREATE TABLE IF NOT EXISTS workers (
+                        worker TEXT PRIMARY KEY,
+                        heartbeat_at REAL NOT NULL
+                    );
+                """)
+                _schema_ready = True
+        if not write:
+            yield connection
+            return
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers can
+        # never claim the same job
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+    finally:
+        connection.close()
+
+def _row_to_job(row):
+    job_id, kind, payload, status, progress, result, error, attempts, created_at, updated_at = row
+    return {
+        'job_id': job_id,
+        'kind': kind,
+        'payload': json.loads(payload),
+        'status': status,
+        'progress': json.loads(progress) if progress else None,
+        'result': json.loads(result) if result else None,
+        'error': error,
+        'attempts': attempts,
+        'created_at': created_at,
+        'updated_at': updated_at
+    }
+
+def submit_job(kind, payload):
+    """
+    Queue a job for the background workers
+
+    Args:
+        kind: Name of a handler in JOB_HANDLERS
+        payload: JSON-serializable job arguments
+
+    Returns:
+        str: ID of the queued job
+    """
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    with _connect() as connection:
+        connection.execute(
+            "INSERT INTO jobs (job_id, kind, payload, status, created_at, updated_at) "
+            "VALUES (?, ?, ?, 'queued', ?, ?)",
+            (job_id, kind, json.dumps(payload, ensure_ascii=False), now, now)
+        )
+    return job_id
+
+def get_job(job_id):
+    """
+    Get the current state of a job
+
+    Returns:
+        dict: job_id, kind, payload, status ('queued', 'running', 'done' or
+              'failed'), progress, result, error, attempts and timestamps,
+              or None for an unknown job
+    """
+    with _connect(write=False) as connection:
+        row = connection.execute(
+            "SELECT job_id, kind, payload, status, progress, result, error, attempts, created_at, updated_at "
+            "FROM jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+    return _row_to_job(row) if row else None
+
+def claim_next_job(worker, job_id=None):
+    """
+    Atomically hand the oldest runnable job to a worker
+
+    Queued jobs and running jobs whose lease has expired are both runnable.
+    An idle queue is detected with a plain read; the write lock is only
+    taken when there is a job to claim.
+
+    Args:
+        worker: Name of the claiming worker
+        job_id: Claim only this job, used when a web process runs it inline
+
+    Returns:
+        dict: The claimed job, or None when nothing is runnable
+    """
+    now = time.time()
+    runnable = (
+        "FROM jobs WHERE (status = 'queued' OR (status = 'running' AND updated_at < ?)) "
+        "AND (? IS NULL OR job_id = ?)"
+    )
+    parameters = (now - JOB_LEASE_SECONDS, job_id, job_id)
+
+    with _connect(write=False) as connection:
+        if connection.execute(f"SELECT 1 {runnable} LIMIT 1", parameters).fetchone() is None:
+            return None
+
+    # Select again under the write lock, another worker may have won the job
+    with _connect() as connection:
+        row = connection.execute(
+            "SELECT job_id, kind, payload, status, progress, result, error, attempts, created_at, updated_at "
+            f"{runnable} ORDER BY created_at LIMIT 1",
+            parameters
+        ).fetchone()
+        if row is None:
+            return None
+
+        job = _row_to_job(row)
+        if job['attempts'] >= MAX_JOB_ATTEMPTS:
+            connection.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, updated_at = ? WHERE job_id = ?",
+                (job['error'] or "Job was abandoned too many times", now, job['job_id'])
+            )
+            return None
+
+        connection.execute(
+            "UPDATE jobs SET status = 'running', attempts = attempts + 1, worker = ?, updated_at = ? "
+            "WHERE job_id = ?",
+            (worker, now, job['job_id'])
+        )
+    job.update({'status': 'running', 'attempts': job['attempts'] + 1})
+    return job
+
+def update_job_progress(job_id, progress):
+    """Store handler progress and renew the job's lease"""
+    with _connect() as connection:
+        connection.execute(
+            "UPDATE jobs SET progress = ?, updated_at = ? WHERE job_id = ? AND status = 'running'",
+            (json.dumps(progress, ensure_ascii=False), time.time(), job_id)
+        )
+
+def complete_job(job_id, result):
+    """Mark a job as done and store its result"""
+    with _connect() as connection:
+        connection.execute(
+            "UPDATE jobs SET status = 'done', result = ?, error = NULL, updated_at = ? WHERE job_id = ?",
+            (json.dumps(result, ensure_ascii=False), time.time(), job_id)
+        )
+
+def fail_job(job_id, error, retry=False):
+    """Mark a job as failed, or queue it again when retry is allowed"""
+    with _connect() as connection:
+        attempts = connection.execute("SELECT attempts FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        status = 'queued' if retry and attempts and attempts[0] < MAX_JOB_ATTEMPTS else 'failed'
+        connection.execute(
+            "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE job_id = ?",
+            (status, error, time.time(), job_id)
+        )
+
+def record_heartbeat(worker, job_id=None):
+    """Tell the web processes that a worker is alive and renew its running job's lease"""
+    now = time.time()
+    with _connect() as connection:
+        connection.execute(
+            "INSERT OR REPLACE INTO workers (worker, heartbeat_at) VALUES (?, ?)", (worker, now)
+        )
+        if job_id:
+            connection.execute(
+                "UPDATE jobs SET updated_at = ? WHERE job_id = ? AND status = 'running' AND worker = ?",
+                (now, job_id, worker)
+            )
+        connection.execute("DELETE FROM workers WHERE heartbeat_at < ?", (now - WORKER_TIMEOUT_SECONDS * 10,))
+        connection.execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?",
+            (now - JOB_RETENTION_SECONDS,)
+        )
+
+def workers_available():
+    """Whether at least one worker has sent a recent heartbeat"""
+    try:
+        with _connect(write=False) as connection:
+            row = connection.execute(
+                "SELECT COUNT(*) FROM workers WHERE heartbeat_at >= ?", (time.time() - WORKER_TIMEOUT_SECONDS,)
+            ).fetchone()
+        return row[0] > 0
+    except sqlite3.Error:
+        return False
+
+def make_worker_name():
+    """Unique, human-readable name of the current worker process"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def _transcribe(payload, report_progress):
+    """Transcribe an audio upload parked in a draft"""
+    from .drafts import read_draft_media
+    from .speech_to_text import transcribe_audio_file
+
+    audio_file = io.BytesIO(read_draft_media(payload['draft_id'], payload['ref']))
+    audio_file.name = payload['ref']
+    return {'text': transcribe_audio_file(audio_file, payload.get('language'))}
+
+def _enhance_sections(payload, report_progress):
+    """Clean story sections, reporting each finished section"""
+    from .text_cleaner import clean_texts_batched
+
+    finished = {}
+
+    def on_result(index, success, result):
+        finished[str(index)] = success
+        report_progress({'finished': finished, 'total': len(payload['items'])})
+
+    results = clean_texts_batched(
+        [tuple(item) for item in payload['items']], payload['language'], on_result=on_result
+    )
+    return {'results': [[success, result] for success, result in results]}
+
+# Job kind -> handler(payload, report_progress) returning a JSON-serializable result
+JOB_HANDLERS = {
+    'transcribe': _transcribe,
+    'enhance_sections': _enhance_sections
+}
+
+def run_job(job):
+    """
+    Run a claimed job and store its outcome
+
+    Handler errors queue the job again until MAX_JOB_ATTEMPTS is reached.
+    """
+    handler = JOB_HANDLERS.get(job['kind'])
+    if handler is None:
+        fail_job(job['job_id'], f"Unknown job kind: {job['kind']}")
+        return
+
+    try:
+        result = handler(job['payload'], lambda progress: update_job_progress(job['job_id'], progress))
+    except Exception as e:
+        fail_job(job['job_id'], str(e), retry=True)
+        return
+    complete_job(job['job_id'], result)
+
+def run_job_inline(job_id):
+    """Run a queued job in the calling process, for when no worker is running"""
+    job = claim_next_job(make_worker_name(), job_id=job_id)
+    if job is not None:
+        run_job(job)
+    return get_job(job_id)
@@ -0,0 +1,229 @@
+import base64
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from streamlit import runtime
+
+# Streamlit serves ./static at app/static when server.enableStaticServing is on
+STATIC_DIR = "static"
+MEDIA_DIR = os.path.join(STATIC_DIR, "media")
+MEDIA_URL_PREFIX = "app/static/media"
+
+# Shared store of uploaded illustrations. Stories reference a stored file
+# as "media:<filename>" instead of embedding its base64 payload, which lets
+# near-duplicate uploads reuse one copy.
+IMAGE_STORE_DIR = os.path.join("data", "images")
+STORED_IMAGE_PREFIX = "media:"
+
+# Maximum number of embeddable media sources kept in memory per process
+MEDIA_CACHE_SIZE = 256
+
+# Decoded narration clips kept in memory per process. Audio is served by
+# Streamlit's media endpoint, the one st.audio uses, which sends the stored
+# MIME type and answers range requests; the app static handler serves
+# audio extensions as text/plain, which strict browsers refuse to play.
+AUDIO_CACHE_SIZE = 32
+
+# Renditions served to the readers. None keeps the stored image untouched,
+# a (width, height) tuple bounds a downscaled JPEG copy.
+RENDITIONS = {
+    "page": None,
+    "thumb": (240, 240),
+}
+
+IMAGE_EXTENSIONS = {
+    "image/jpeg": "jpg",
+    "image/png": "png",
+    "image/gif": "gif",
+    "image/webp": "webp",
+}
+
+_media_cache = OrderedDict()
+_media_cache_lock = threading.Lock()
+
+_audio_cache = OrderedDict()
+
+def _sniff_image_mime(image_b64):
+    """Guess the image MIME type from the first base64 characters"""
+    if image_b64.startswith("iVBORw0KGgo"):
+        return "image/png"
+    if image_b64.startswith("R0lGOD"):
+        return "image/gif"
+    if image_b64.startswith("UklGR"):
+        return "image/webp"
+    return "image/jpeg"
+
+def sniff_audio_mime(audio_bytes):
+    """Guess the audio MIME type from the container signature"""
+    header = bytes(audio_bytes[:12])
+    if header.startswith(b"RIFF") and header[8:12] == b"WAVE":
+        return "audio/wav"
+    if header.startswith(b"OggS"):
+        return "audio/ogg"
+    if header[4:8] == b"ftyp":
+        return "audio/mp4"
+    if header.startswith(b"ID3") or header[:2] in (b"\xff\xfb", b"\xff\xf3", b"\xff\xf2"):
+        return "audio/mpeg"
+    return "audio/wav"
+
+def write_static_media(data, extension):
+    """
+    Write media bytes to the static directory under a content-hashed name
+
+    Args:
+        data: Raw media bytes
+        extension: File extension without the dot
+
+    Returns:
+        str: Immutable URL for the media file
+    """
+    digest = hashlib.sha256(data).hexdigest()[:24]
+    filename = f"{digest}.{extension}"
+    path = os.path.join(MEDIA_DIR, filename)
+
+    if not os.path.exists(path):
+        os.makedirs(MEDIA_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    # The version argument makes Tornado send far-future cache headers,
+    # which is safe because the name changes whenever the content does
+    return f"{MEDIA_URL_PREFIX}/{filename}?v={digest}"
+
+def is_stored_image_ref(image_value):
+    """Whether a story image value references the shared image store"""
+    return image_value.startswith(STORED_IMAGE_PREFIX)
+
+def _load_image(image_value):
+    """Return (bytes, mime_type) for a base64 payload or a stored image ref"""
+    if is_stored_image_ref(image_value):
+        filename = os.path.basename(image_value[len(STORED_IMAGE_PREFIX):])
+        with open(os.path.join(IMAGE_STORE_DIR, filename), "rb") as f:
+            image_bytes = f.read()
+        extension = filename.rsplit(".", 1)[-1]
+        mime_type = next((mime for mime, ext in IMAGE_EXTENSIONS.items() if ext == extension), "image/jpeg")
+        return image_bytes, mime_type
+
+    return base64.b64decode(image_value), _sniff_image_mime(image_value)
+
+def _build_image_src(image_b64, rendition):
+    """Materialize a rendition of a stored image and return its URL"""
+    size = RENDITIONS[rendition]
+    image_bytes, mime_type = _load_image(image_b64)
+
+    if size is not None:
+        from PIL import Image
+
+        image = Image.open(io.BytesIO(image_bytes))
+        image.thumbnail(size, Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        image.convert("RGB").save(buffer, format="JPEG", quality=80)
+        image_bytes = buffer.getvalue()
+        mime_type = "image/jpeg"
+
+    try:
+        return write_static_media(image_bytes, IMAGE_EXTENSIONS[mime_type])
+    except OSError:
+        # Read-only deployments still get an inline source
+        return f"data:{mime_type};base64,{base64.b64encode(image_bytes).decode()}"
+
+def _load_audio(audio_b64, mime_type):
+    """Decode stored audio and return (bytes, mime_type)"""
+    audio_bytes = base64.b64decode(audio_b64)
+    return audio_bytes, mime_type or sniff_audio_mime(audio_bytes)
+
+def _get_cached_src(cache_key, build, cache=_media_cache, max_size=MEDIA_CACHE_SIZE):
+    """Return a cached media source, building it on a miss"""
+    with _media_cache_lock:
+        if cache_key in cache:
+            cache.move_to_end(cache_key)
+            return cache[cache_key]
+
+    try:
+        src = build()
+    except Exception:
+        return None
+
+    with _media_cache_lock:
+        cache[cache_key] = src
+        cache.move_to_end(cache_key)
+        while len(cache) > max_size:
+            cache.popitem(last=False)
+
+    return src
+
+def get_image_src(story_id, image_key, image_b64, rendition="page"):
+    """
+    Get a ready-to-embed image source for a story illustration
+
+    The image is written once to the static media directory and referenced
+    by an immutable URL, so browsers cache it across page turns and reruns.
+    Sources are cached per (story_id, image_key, rendition) in a bounded LRU.
+
+    Args:
+        story_id: ID of the story the image belongs to
+        image_key: Key of the image in the story's images dict
+        image_b64: Stored base64 image payload or shared-store reference
+                   (used on cache miss only)
+        rendition: One of RENDITIONS
+
+    Returns:
+        str: Value usable as an <img> src, or None if the image is unusable
+    """
+    if not image_b64:
+        return None
+
+    return _get_cached_src(
+        (story_id, image_key, rendition),
+        lambda: _build_image_src(image_b64, rendition)
+    )
+
+def get_audio_src(story_id, audio_key, audio_b64, mime_type=None):
+    """
+    Get a playable URL for a section's stored narration
+
+    The decoded clip is cached per (story_id, audio_key) and registered with
+    Streamlit's media file manager on every call. The manager keeps a file
+    only while a session's latest run referenced it, so call this on every
+    rerun that renders the player.
+
+    Args:
+        story_id: ID of the story the audio belongs to
+        audio_key: Stable key of the audio within the story
+        audio_b64: Stored base64 audio payload (used on cache miss only)
+        mime_type: Stored MIME type, sniffed from the bytes if missing
+
+    Returns:
+        str: Value usable as an <audio> src, or None if the audio is unusable
+    """
+    if not audio_b64:
+        return None
+
+    audio = _get_cached_src(
+        (story_id, audio_key, "audio"),
+        lambda: _load_audio(audio_b64, mime_type),
+        _audio_cache,
+        AUDIO_CACHE_SIZE
+    )
+    if audio is None:
+        return None
+
+    audio_bytes, mime_type = audio
+    if not runtime.exists():
+        return f"data:{mime_type};base64,{audio_b64}"
+
+    url = runtime.get_instance().media_file_mgr.add(audio_bytes, mime_type, f"utsav_audio.{story_id}.{audio_key}")
+    # Relative to the app, so it also resolves under server.baseUrlPath
+    return url.lstrip("/")
+
+def invalidate_story_media(story_id):
+    """Drop every cached media source belonging to a story"""
+    with _media_cache_lock:
+        for cache_key in [key for key in _media_cache if key[0] == story_id]:
+            del _media_cache[cache_key]
+        for cache_key in [key for key in _audio_cache if key[0] == story_id]:
+            del _audio_cache[cache_key]
@@ -0,0 +1,73 @@
+import time
+import httpx
+import streamlit as st
+from openai import OpenAI, DefaultHttpxClient
+from .usage_store import usage_store, key_fingerprint
+
+# Connections each API key's pool may open at once, shared by every session
+# in the process. Sized for a few stories enhancing or transcribing in
+# parallel, MAX_CONCURRENT_REQUESTS at a time each.
+MAX_CONNECTIONS = 20
+
+# Idle connections kept open for reuse, so back-to-back calls skip the TCP
+# and TLS handshakes
+MAX_KEEPALIVE_CONNECTIONS = 20
+KEEPALIVE_EXPIRY_SECONDS = 60
+
+# Whisper on a long chunk and large JSON-mode answers can take a while;
+# connecting should not
+REQUEST_TIMEOUT = httpx.Timeout(120.0, connect=10.0)
+
+class MeteredTransport(httpx.HTTPTransport):
+    """
+    Connection pool that accounts every request to its API key
+
+    Each request first takes a token from the key's shared rate-limit
+    bucket; its outcome and latency feed the key scheduler in APIKeyManager.
+    """
+
+    def __init__(self, key_id, **kwargs):
+        super().__init__(**kwargs)
+        self.key_id = key_id
+
+    def handle_request(self, request):
+        usage_store.request_started(self.key_id)
+        started = time.perf_counter()
+        success = False
+        try:
+            response = super().handle_request(request)
+            success = response.status_code < 400
+            return response
+        finally:
+            usage_store.request_finished(self.key_id, success, time.perf_counter() - started)
+
+@st.cache_resource(show_spinner=False)
+def get_pooled_client(api_key, base_url=None):
+    """
+    Get the process-wide OpenAI client for an API key
+
+    Clients are created once per key and reused across calls and Streamlit
+    sessions, so their keep-alive connection pool is reused too. Every
+    request goes through a MeteredTransport. The SDK's own retries are
+    off: call_openai in text_cleaner retries and fails over between keys.
+
+    Args:
+        api_key: OpenAI API key
+        base_url: Optional API base URL; None uses OPENAI_BASE_URL or the default
+
+    Returns:
+        OpenAI: Thread-safe client with a tuned connection pool
+    """
+    http_client = DefaultHttpxClient(
+        transport=MeteredTransport(
+            key_fingerprint(api_key),
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS
+            )
+        ),
+        timeout=REQUEST_TIMEOUT
+    )
+    return OpenAI(api_key=api_key, base_url=base_url, http_client=http_client,
+                  timeout=REQUEST_TIMEOUT, max_retries=0)
@@ -0,0 +1,271 @@
+import io
+import os
+import threading
+import streamlit as st
+
+# Backend for all AI work unless TEXT_BACKEND or SPEECH_BACKEND says otherwise:
+# "openai" for GPT-4o and Whisper, "local" for CPU-only models in this process
+DEFAULT_BACKEND = "openai"
+
+# Local text model: a GGUF file path, or a Hugging Face repo to download
+# LOCAL_LLM_FILE from once. A small instruct model that follows JSON mode
+# and handles Indian languages reasonably well.
+LOCAL_LLM_MODEL = "Qwen/Qwen2.5-1.5B-Instruct-GGUF"
+LOCAL_LLM_FILE = "*q4_k_m.gguf"
+
+# Room for a CLEAN_CHUNK_TOKENS chunk, the prompt and the cleaned answer
+LOCAL_LLM_CONTEXT_TOKENS = 4096
+
+# Chat template tokens around each message (role markers and separators)
+LOCAL_LLM_MESSAGE_OVERHEAD_TOKENS = 8
+
+# Local speech model, run by faster-whisper with int8 weights on the CPU
+LOCAL_WHISPER_MODEL = "small"
+
+# Greedy decoding is several times faster than beam search on a CPU, at a
+# small cost in accuracy
+LOCAL_WHISPER_BEAM_SIZE = 1
+
+class OpenAITextProvider:
+    """GPT-4o through the pooled clients, with retries and key failover"""
+
+    name = "openai"
+
+    @property
+    def model(self):
+        from .text_cleaner import CHAT_MODEL
+        return CHAT_MODEL
+
+    def preflight(self):
+        """Fail fast when no API key is configured"""
+        from .text_cleaner import get_openai_client
+        get_openai_client()
+
+    def count_tokens(self, text):
+        """Token count with gpt-4o's tokenizer"""
+        from .text_cleaner import count_gpt_tokens
+        return count_gpt_tokens(text)
+
+    def chat(self, messages, max_tokens, json_mode=False):
+        """
+        Run one chat completion
+
+        Returns:
+            tuple: (content: str, finish_reason: str)
+        """
+        from .text_cleaner import call_openai
+        response = call_openai(lambda client: client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            max_tokens=max_tokens,
+            **({"response_format": {"type": "json_object"}} if json_mode else {})
+        ))
+        choice = response.choices[0]
+        return choice.message.content, choice.finish_reason
+
+    def stream_chat(self, messages, max_tokens, json_mode=False):
+        """Run one chat completion, yielding the content as it is generated"""
+        from .text_cleaner import call_openai
+        stream = call_openai(lambda client: client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            max_tokens=max_tokens,
+            stream=True,
+            **({"response_format": {"type": "json_object"}} if json_mode else {})
+        ))
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+class LocalTextProvider:
+    """
+    Small instruct model run on the CPU with llama-cpp-python
+
+    One model per process, generating one answer at a time; parallel
+    callers queue on a lock, since llama.cpp already uses every core.
+    """
+
+    name = "local"
+
+    def __init__(self, model=None, threads=None):
+        try:
+            from llama_cpp import Llama
+        except ImportError:
+            raise Exception('The local text backend needs llama-cpp-python: pip install ".[local]"')
+
+        model = model or os.environ.get("LOCAL_LLM_MODEL", LOCAL_LLM_MODEL)
+        options = {"n_ctx": LOCAL_LLM_CONTEXT_TOKENS, "n_threads": threads, "verbose": False}
+        if os.path.exists(model):
+            self.llm = Llama(model_path=model, **options)
+        else:
+            self.llm = Llama.from_pretrained(repo_id=model, filename=os.environ.get("LOCAL_LLM_FILE", LOCAL_LLM_FILE), **options)
+        self.model = os.path.basename(self.llm.model_path)
+        self._lock = threading.Lock()
+
+    def preflight(self):
+        """The model is loaded in the constructor, so there is nothing left to check"""
+
+    def count_tokens(self, text):
+        """Token count with the model's own tokenizer"""
+        return len(self.llm.tokenize(text.encode("utf-8"), add_bos=False))
+
+    def fit_max_tokens(self, messages, max_tokens):
+        """
+        Clamp max_tokens to the context window left after the prompt, which
+        llama.cpp would otherwise reject or cut off mid-answer
+        """
+        context_tokens = self.llm.n_ctx()
+        prompt_tokens = sum(self.count_tokens(message["content"]) + LOCAL_LLM_MESSAGE_OVERHEAD_TOKENS for message in messages)
+        if prompt_tokens >= context_tokens:
+            raise Exception(f"Prompt of {prompt_tokens} tokens does not fit the local model's {context_tokens}-token context")
+        return min(max_tokens, context_tokens - prompt_tokens)
+
+    def _create(self, messages, max_tokens, json_mode, stream):
+        return self.llm.create_chat_completion(
+            messages=messages,
+            max_tokens=self.fit_max_tokens(messages, max_tokens),
+            temperature=0.2,
+            stream=stream,
+            **({"response_format": {"type": "json_object"}} if json_mode else {})
+        )
+
+    def chat(self, messages, max_tokens, json_mode=False):
+        """
+        Run one chat completion
+
+        Returns:
+            tuple: (content: str, finish_reason: str)
+        """
+        with self._lock:
+            response = self._create(messages, max_tokens, json_mode, stream=False)
+        choice = response["choices"][0]
+        return choice["message"]["content"], choice["finish_reason"]
+
+    def stream_chat(self, messages, max_tokens, json_mode=False):
+        """Run one chat completion, yielding the content as it is generated"""
+        with self._lock:
+            for chunk in self._create(messages, max_tokens, json_mode, stream=True):
+                content = chunk["choices"][0]["delta"].get("content") if chunk["choices"] else None
+                if content:
+                    yield content
+
+class OpenAISpeechProvider:
+    """Whisper through the pooled clients, long recordings in parallel chunks"""
+
+    name = "openai"
+    model = "whisper-1"
+
+    def transcribe(self, samples, language=None):
+        """
+        Transcribe decoded audio
+
+        Args:
+            samples: Mono float32 PCM at TRANSCRIBE_SAMPLE_RATE
+            language: ISO-639-1 code, None to auto-detect
+
+        Returns:
+            dict: text, segments (list of {'start', 'end', 'text'}) and chunks
+        """
+        from .speech_to_text import transcribe_audio_chunked
+        return transcribe_audio_chunked(samples, language)
+
+    def transcribe_file(self, audio_bytes, filename, language=None):
+        """Transcribe an audio file that could not be decoded locally; returns the text"""
+        from .speech_to_text import _language_options
+        from .text_cleaner import call_openai
+
+        def request(client):
+            # The API infers the format from the file name, so keep the extension
+            upload = io.BytesIO(audio_bytes)
+            upload.name = filename
+            return client.audio.transcriptions.create(
+                model=self.model,
+                file=upload,
+                **_language_options(language)
+            )
+        return call_openai(request).text
+
+class LocalSpeechProvider:
+    """
+    Whisper run on the CPU with faster-whisper and int8 weights
+
+    faster-whisper skips silence with its own VAD and works through long
+    recordings sequentially, which is the fastest order on a CPU.
+    """
+
+    name = "local"
+
+    def __init__(self, model=None, threads=0):
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError:
+            raise Exception('The local speech backend needs faster-whisper: pip install ".[local]"')
+
+        self.model = model or os.environ.get("LOCAL_WHISPER_MODEL", LOCAL_WHISPER_MODEL)
+        self.whisper = WhisperModel(self.model, device="cpu", compute_type="int8", cpu_threads=threads)
+        self._lock = threading.Lock()
+
+    def _transcribe(self, audio, language):
+        with self._lock:
+            segments, _ = self.whisper.transcribe(
+                audio, language=language, beam_size=LOCAL_WHISPER_BEAM_SIZE, vad_filter=True
+            )
+            # Segments are generated lazily; decode them while holding the model
+            return [(segment.start, segment.end, segment.text.strip()) for segment in segments]
+
+    def transcribe(self, samples, language=None):
+        """
+        Transcribe decoded audio
+
+        Args:
+            samples: Mono float32 PCM at TRANSCRIBE_SAMPLE_RATE
+            language: ISO-639-1 code, None to auto-detect
+
+        Returns:
+            dict: text, segments (list of {'start', 'end', 'text'}) and chunks
+        """
+        segments = [segment for segment in self._transcribe(samples, language) if segment[2]]
+        return {
+            'text': " ".join(text for _, _, text in segments),
+            'segments': [{'start': round(float(start), 2), 'end': round(float(end), 2), 'text': text} for start, end, text in segments],
+            'chunks': 1
+        }
+
+    def transcribe_file(self, audio_bytes, filename, language=None):
+        """Transcribe an audio file that could not be decoded as samples; returns the text"""
+        return " ".join(text for _, _, text in self._transcribe(io.BytesIO(audio_bytes), language) if text)
+
+TEXT_PROVIDERS = {"openai": OpenAITextProvider, "local": LocalTextProvider}
+SPEECH_PROVIDERS = {"openai": OpenAISpeechProvider, "local": LocalSpeechProvider}
+
+def _backend_name(variable, providers):
+    name = os.environ.get(variable) or os.environ.get("AI_BACKEND") or DEFAULT_BACKEND
+    if name not in providers:
+        raise Exception(f"Unknown {variable} '{name}', expected one of: {', '.join(providers)}")
+    return name
+
+@st.cache_resource(show_spinner="Loading AI model...")
+def get_text_provider(name=None):
+    """
+    Get the process-wide backend for text cleaning and story organisation
+
+    Args:
+        name: 'openai' or 'local'; None reads TEXT_BACKEND, then AI_BACKEND
+
+    Returns:
+        Provider with chat(), stream_chat(), count_tokens() and preflight()
+    """
+    return TEXT_PROVIDERS[name or _backend_name("TEXT_BACKEND", TEXT_PROVIDERS)]()
+
+@st.cache_resource(show_spinner="Loading speech model...")
+def get_speech_provider(name=None):
+    """
+    Get the process-wide backend for transcription
+
+    Args:
+        name: 'openai' or 'local'; None reads SPEECH_BACKEND, then AI_BACKEND
+
+    Returns:
+        Provider with transcribe() and transcribe_file()
+    """
+    return SPEECH_PROVIDERS[name or _backend_name("SPEECH_BACKEND", SPEECH_PROVIDERS)]()
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# Persistent cache of AI responses shared by every session and worker
+CACHE_FILE = os.path.join("data", "response_cache.sqlite3")
+
+# Cached responses older than this are ignored and eventually evicted
+CACHE_TTL_SECONDS = 30 * 24 * 60 * 60
+
+# Least recently used responses are evicted beyond this total payload size
+CACHE_MAX_BYTES = 50 * 1024 * 1024
+
+class ResponseCache:
+    """
+    SQLite-backed cache of model responses keyed by a content hash
+
+    Keys hash every input that can change the answer (model, prompt
+    template version, task, language, context and text), so a resend of
+    identical input is answered from disk instead of a new API call.
+    """
+
+    def __init__(self, path=CACHE_FILE, ttl=CACHE_TTL_SECONDS, max_bytes=CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    @contextmanager
+    def _connect(self):
+        """Open a connection for one transaction and always close it"""
+        with self._lock:
+            if not self._initialized:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=10)
+            try:
+                if not self._initialized:
+                    self._create_schema(connection)
+                with connection:
+                    yield connection
+            finally:
+                connection.close()
+
+    def _create_schema(self, connection):
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                namespace TEXT NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at);
+            CREATE TABLE IF NOT EXISTS metrics (
+                namespace TEXT PRIMARY KEY,
+                hits INTEGER NOT NULL DEFAULT 0,
+                misses INTEGER NOT NULL DEFAULT 0
+            );
+        """)
+        self._initialized = True
+
+    @staticmethod
+    def make_key(**parts):
+        """Hash the inputs of a request into a cache key"""
+        payload = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _count(self, connection, namespace, column):
+        connection.execute("INSERT OR IGNORE INTO metrics (namespace) VALUES (?)", (namespace,))
+        connection.execute(f"UPDATE metrics SET {column} = {column} + 1 WHERE namespace = ?", (namespace,))
+
+    def get(self, namespace, key):
+        """
+        Look up a cached response
+
+        Returns:
+            The cached JSON value, or None on a miss or expired entry
+        """
+        try:
+            with self._connect() as connection:
+                row = connection.execute(
+                    "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                now = time.time()
+                if row is None or now - row[1] > self.ttl:
+                    self._count(connection, namespace, "misses")
+                    return None
+
+                connection.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                self._count(connection, namespace, "hits")
+                return json.loads(row[0])
+        except (sqlite3.Error, OSError, ValueError):
+            return None
+
+    def set(self, namespace, key, value):
+        """Store a response and evict expired or least recently used entries"""
+        payload = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        try:
+            with self._connect() as connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO responses (key, namespace, value, size, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, namespace, payload, len(payload.encode("utf-8")), now, now)
+                )
+                connection.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+                self._evict(connection)
+        except (sqlite3.Error, OSError):
+            pass
+
+    def _evict(self, connection):
+        total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        evicted = 0
+        stale_keys = []
+        for key, size in connection.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            if total - evicted <= self.max_bytes:
+                break
+            stale_keys.append((key,))
+            evicted += size
+        connection.executemany("DELETE FROM responses WHERE key = ?", stale_keys)
+
+    def stats(self):
+        """
+        Get cache metrics
+
+        Returns:
+            dict: hits, misses, hit_rate, entries and bytes, plus a
+                  per-namespace breakdown of hits and misses
+        """
+        try:
+            with self._connect() as connection:
+                namespaces = {
+                    namespace: {"hits": hits, "misses": misses}
+                    for namespace, hits, misses in connection.execute("SELECT namespace, hits, misses FROM metrics")
+                }
+                entries, size = connection.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+                ).fetchone()
+        except (sqlite3.Error, OSError):
+            namespaces, entries, size = {}, 0, 0
+
+        hits = sum(counts["hits"] for counts in namespaces.values())
+        misses = sum(counts["misses"] for counts in namespaces.values())
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "entries": entries,
+            "bytes": size,
+            "namespaces": namespaces
+        }
+
+# Global response cache instance
+response_cache = ResponseCache()
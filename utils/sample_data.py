@@ -50,9 +50,9 @@ def create_sample_users():
     
     return sample_users
 
-def create_sample_stories():
-    """Create sample festival stories"""
-    sample_stories = [
+def get_sample_stories():
+    """Sample festival stories, without saving them"""
+    return [
         {
             "title": "Diwali ki Roshni - The Light of Hope",
             "festival": "Diwali",
@@ -212,6 +212,10 @@ def create_sample_stories():
             }
         }
     ]
+
+def create_sample_stories():
+    """Create sample festival stories"""
+    sample_stories = get_sample_stories()
     
     # Save each story
     for story_data in sample_stories:
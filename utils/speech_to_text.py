@@ -1,50 +1,319 @@
 import streamlit as st
-import tempfile
+import io
 import os
-from openai import OpenAI
+import re
+import wave
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from .api_manager import api_manager
+from .openai_clients import get_pooled_client
+from .providers import get_speech_provider
+from .text_cleaner import call_openai
 
-def transcribe_audio_file(audio_file):
+# Audio is decoded to 16 kHz mono before chunking, which is what Whisper
+# works at internally anyway
+TRANSCRIBE_SAMPLE_RATE = 16000
+
+# Energy-based voice activity detection works on frames of this length
+VAD_FRAME_SECONDS = 0.03
+
+# Frames this far below the speech level count as silence
+SILENCE_THRESHOLD_DB = 30
+
+# A pause must last this long to be used as a chunk boundary
+MIN_SILENCE_SECONDS = 0.3
+
+# Chunks are cut at the longest pause between these two lengths. At 16 kHz
+# 16-bit mono a 60 s chunk is about 2 MB, far below the API's upload limit.
+MIN_CHUNK_SECONDS = 20
+MAX_CHUNK_SECONDS = 60
+
+# Chunks that have to be cut mid-speech overlap by this much, and the
+# duplicated words are removed when the transcripts are stitched
+CHUNK_OVERLAP_SECONDS = 2.0
+
+# Parallel Whisper requests per recording
+MAX_CONCURRENT_TRANSCRIPTIONS = 4
+
+# ISO-639-1 codes Whisper accepts for the languages in INDIAN_LANGUAGES.
+# Languages Whisper has no code for are left to its auto-detection, since a
+# wrong hint is worse than none.
+WHISPER_LANGUAGE_CODES = {
+    "Hindi": "hi", "English": "en", "Bengali": "bn", "Telugu": "te", "Marathi": "mr",
+    "Tamil": "ta", "Gujarati": "gu", "Urdu": "ur", "Kannada": "kn", "Malayalam": "ml",
+    "Punjabi": "pa", "Assamese": "as", "Sanskrit": "sa", "Nepali": "ne", "Sindhi": "sd"
+}
+
+def get_language_code(story_language, preferred_language=None):
+    """
+    Pick the Whisper language hint for a recording
+
+    The storyteller's preferred language only stands in when the story has
+    no language. A story language Whisper has no code for gets no hint, so
+    a Maithili story is not transcribed as the storyteller's Hindi.
+
+    Args:
+        story_language: Language chosen for the story, if any
+        preferred_language: The user's preferred language
+
+    Returns:
+        str: ISO-639-1 code, or None to let Whisper detect the language
+    """
+    return WHISPER_LANGUAGE_CODES.get(story_language or preferred_language)
+
+def _language_options(language):
+    """Request arguments for an optional language hint"""
+    return {'language': language} if language else {}
+
+def get_whisper_client():
+    """Get the pooled OpenAI client for the API key the scheduler picks"""
+    current_key = api_manager.get_current_key()
+    if not current_key:
+        raise Exception("OpenAI API key not configured. Please add your API key to continue.")
+    return get_pooled_client(current_key["key"])
+
+def decode_audio(audio_bytes, sample_rate=TRANSCRIBE_SAMPLE_RATE):
+    """
+    Decode any supported container to mono float32 PCM
+
+    Returns:
+        np.ndarray: Samples in [-1, 1] at the given sample rate
+    """
+    import av
+
+    chunks = []
+    with av.open(io.BytesIO(audio_bytes)) as container:
+        stream = container.streams.audio[0]
+        resampler = av.AudioResampler(format="s16", layout="mono", rate=sample_rate)
+        for frame in container.decode(stream):
+            frame.pts = None
+            chunks.extend(resampled.to_ndarray().reshape(-1) for resampled in resampler.resample(frame))
+        chunks.extend(resampled.to_ndarray().reshape(-1) for resampled in resampler.resample(None))
+
+    if not chunks:
+        return np.zeros(0, dtype=np.float32)
+    return np.concatenate(chunks).astype(np.float32) / 32768.0
+
+def find_silences(samples, sample_rate, min_silence=MIN_SILENCE_SECONDS):
+    """
+    Find pauses with an energy-based voice activity detector
+
+    A frame is silent when its RMS energy is below a threshold derived from
+    the recording's own noise floor, so quiet and loud recordings are
+    handled alike.
+
+    Returns:
+        list: (start, end) sample indexes of every pause at least
+              min_silence seconds long
+    """
+    hop = max(1, int(sample_rate * VAD_FRAME_SECONDS))
+    frame_count = len(samples) // hop
+    if frame_count == 0:
+        return []
+
+    frames = samples[:frame_count * hop].reshape(frame_count, hop)
+    energy = np.sqrt(np.mean(frames * frames, axis=1))
+    noise_floor = np.percentile(energy, 5)
+    speech_level = np.percentile(energy, 95)
+    threshold = max(noise_floor * 2.0, speech_level * 10 ** (-SILENCE_THRESHOLD_DB / 20), 1e-4)
+    # With few pauses the low percentile is speech too; never call speech silent
+    threshold = min(threshold, speech_level * 0.5)
+
+    # Run boundaries of the silent mask
+    silent = np.concatenate(([False], energy < threshold, [False]))
+    edges = np.flatnonzero(np.diff(silent.astype(np.int8)))
+    min_frames = max(1, int(min_silence / VAD_FRAME_SECONDS))
+    return [
+        (start * hop, end * hop)
+        for start, end in zip(edges[::2], edges[1::2])
+        if end - start >= min_frames
+    ]
+
+def plan_chunks(samples, sample_rate, silences):
+    """
+    Split a recording into chunks, preferring to cut in the middle of pauses
+
+    Returns:
+        list: (start, end, overlap) sample ranges, where overlap is the
+              number of samples shared with the previous chunk
     """
-    Transcribe audio file using OpenAI Whisper
-    
+    total = len(samples)
+    min_length = int(MIN_CHUNK_SECONDS * sample_rate)
+    max_length = int(MAX_CHUNK_SECONDS * sample_rate)
+    overlap_length = int(CHUNK_OVERLAP_SECONDS * sample_rate)
+
+    chunks = []
+    start, overlap = 0, 0
+    while total - start > max_length:
+        window_start, window_end = start + min_length, start + max_length
+        pauses = [
+            (min(end, window_end) - max(begin, window_start), begin, end)
+            for begin, end in silences
+            if end > window_start and begin < window_end
+        ]
+        if pauses:
+            _, begin, end = max(pauses)
+            cut = min(max((begin + end) // 2, window_start), window_end)
+            chunks.append((start, cut, overlap))
+            start, overlap = cut, 0
+        else:
+            # No pause in reach: cut mid-speech and let the next chunk repeat the seam
+            chunks.append((start, window_end, overlap))
+            start, overlap = window_end - overlap_length, overlap_length
+    chunks.append((start, total, overlap))
+    return chunks
+
+def _is_silent(start, end, silences):
+    """Whether a sample range lies entirely inside one detected pause"""
+    return any(begin <= start and end <= finish for begin, finish in silences)
+
+def _encode_wav(samples, sample_rate):
+    """Encode float PCM as an in-memory 16-bit mono WAV upload"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes((np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes())
+    buffer.seek(0)
+    buffer.name = "chunk.wav"
+    return buffer
+
+def _transcribe_chunk(samples, sample_rate, offset, language):
+    """
+    Transcribe one chunk on the least loaded API key, retrying transient failures
+
+    Returns:
+        list: (start, end, text) segments with timestamps in seconds from
+              the start of the whole recording
+    """
+    # A fresh upload per attempt, since a failed one may have consumed the buffer
+    transcript = call_openai(lambda client: client.audio.transcriptions.create(
+        model="whisper-1",
+        file=_encode_wav(samples, sample_rate),
+        **_language_options(language),
+        response_format="verbose_json",
+        timestamp_granularities=["segment"]
+    ))
+    segments = getattr(transcript, "segments", None)
+    if not segments:
+        text = (transcript.text or "").strip()
+        return [(offset, offset + len(samples) / sample_rate, text)] if text else []
+    return [(offset + segment.start, offset + segment.end, segment.text.strip()) for segment in segments]
+
+def _normalize_word(word):
+    return re.sub(r"[^\w]", "", word.lower())
+
+def _drop_repeated_words(previous_text, text, max_words=12):
+    """Remove the words at the start of text that repeat the end of previous_text"""
+    previous_words = [_normalize_word(word) for word in previous_text.split()]
+    words = text.split()
+    normalized = [_normalize_word(word) for word in words]
+    for count in range(min(max_words, len(previous_words), len(words)), 0, -1):
+        if previous_words[-count:] == normalized[:count]:
+            return " ".join(words[count:])
+    return text
+
+def stitch_segments(chunk_segments, chunks, sample_rate):
+    """
+    Merge per-chunk segments into one timeline
+
+    Where two chunks overlap, segments are assigned to the chunk whose
+    midpoint side of the overlap they fall on, and any words still repeated
+    across the seam are dropped.
+
+    Args:
+        chunk_segments: List of (start, end, text) segment lists, one per chunk
+        chunks: The (start, end, overlap) sample ranges from plan_chunks
+        sample_rate: Sample rate of the chunk ranges
+
+    Returns:
+        list: (start, end, text) segments in order
+    """
+    merged = []
+    for segments, (start, _, overlap) in zip(chunk_segments, chunks):
+        if overlap and merged:
+            seam = (start + overlap / 2) / sample_rate
+            merged = [segment for segment in merged if (segment[0] + segment[1]) / 2 < seam]
+            segments = [segment for segment in segments if (segment[0] + segment[1]) / 2 >= seam]
+            if merged and segments:
+                first_start, first_end, first_text = segments[0]
+                segments = [(first_start, first_end, _drop_repeated_words(merged[-1][2], first_text))] + segments[1:]
+        merged.extend(segment for segment in segments if segment[2])
+    return merged
+
+def transcribe_audio_chunked(samples, language=None, max_workers=MAX_CONCURRENT_TRANSCRIPTIONS):
+    """
+    Transcribe a recording of any length in parallel chunks
+
+    The audio is split at pauses found by an energy-based VAD, chunks that
+    contain no speech are skipped, the rest are transcribed concurrently and
+    the segments are stitched back together.
+
+    Args:
+        samples: Mono float32 PCM at TRANSCRIBE_SAMPLE_RATE, see decode_audio
+        language: ISO-639-1 code of the spoken language, None to auto-detect
+        max_workers: Maximum concurrent Whisper requests
+
+    Returns:
+        dict: text, segments (list of {'start', 'end', 'text'}) and the
+              number of chunks sent
+    """
+    silences = find_silences(samples, TRANSCRIBE_SAMPLE_RATE)
+    chunks = plan_chunks(samples, TRANSCRIBE_SAMPLE_RATE, silences)
+    spoken = [index for index, (start, end, _) in enumerate(chunks) if not _is_silent(start, end, silences)]
+
+    # Fail fast when no key is configured
+    get_whisper_client()
+    chunk_segments = [[] for _ in chunks]
+    if spoken:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(spoken)))) as pool:
+            futures = {
+                index: pool.submit(
+                    _transcribe_chunk, samples[chunks[index][0]:chunks[index][1]],
+                    TRANSCRIBE_SAMPLE_RATE, chunks[index][0] / TRANSCRIBE_SAMPLE_RATE, language
+                )
+                for index in spoken
+            }
+            for index, future in futures.items():
+                chunk_segments[index] = future.result()
+
+    segments = stitch_segments(chunk_segments, chunks, TRANSCRIBE_SAMPLE_RATE)
+    return {
+        'text': " ".join(text for _, _, text in segments),
+        'segments': [{'start': round(float(start), 2), 'end': round(float(end), 2), 'text': text} for start, end, text in segments],
+        'chunks': len(spoken)
+    }
+
+def transcribe_audio_file(audio_file, language=None):
+    """
+    Transcribe audio file with the configured speech backend, Whisper by default
+
+    With OpenAI, recordings are chunked and transcribed in parallel; files
+    PyAV cannot decode are sent whole. Audio never touches the disk.
+
     Args:
-        audio_file: Streamlit uploaded file object
-    
+        audio_file: Streamlit uploaded file object, or a BytesIO with a name
+        language: ISO-639-1 code from get_language_code, None to auto-detect
+
     Returns:
         str: Transcribed text
     """
     try:
-        # Check if API key is available
-        api_key = os.environ.get("OPENAI_API_KEY")
-        if not api_key:
-            raise Exception("OpenAI API key not configured. Please add your API key to continue.")
-        
-        client = OpenAI(api_key=api_key)
-        
-        # Save uploaded file to temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f".{audio_file.name.split('.')[-1]}") as tmp_file:
-            tmp_file.write(audio_file.getvalue())
-            tmp_file_path = tmp_file.name
-        
+        provider = get_speech_provider()
+        audio_bytes = audio_file.getvalue()
         try:
-            # Transcribe audio using OpenAI Whisper
-            with open(tmp_file_path, "rb") as audio:
-                transcript = client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio,
-                    language="hi"  # Hindi, can be made dynamic based on user preference
-                )
-            
-            return transcript.text
-            
-        finally:
-            # Clean up temporary file
-            if os.path.exists(tmp_file_path):
-                os.unlink(tmp_file_path)
-                
+            samples = decode_audio(audio_bytes)
+        except Exception:
+            # PyAV is missing or cannot read this container
+            samples = None
+        if samples is not None:
+            return provider.transcribe(samples, language)['text']
+        return provider.transcribe_file(audio_bytes, os.path.basename(audio_file.name), language)
+
     except Exception as e:
         raise Exception(f"Transcription failed: {str(e)}")
 
 def display_transcription_ui():
     """Display UI for audio transcription - kept for backward compatibility"""
-    st.info("🎤 Use the voice input option in the upload flow for audio transcription.")
\ No newline at end of file
+    st.info("🎤 Use the voice input option in the upload flow for audio transcription.")
@@ -1,20 +1,395 @@
 import streamlit as st
 import json
 import os
-from openai import OpenAI
+import random
+import re
+import time
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from email.utils import parsedate_to_datetime
+import openai
 from .api_manager import api_manager
+from .openai_clients import get_pooled_client
+from .providers import get_text_provider
+from .usage_store import key_fingerprint, RateLimitWaitError
+from .response_cache import response_cache
+
+# the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
+# do not change this unless explicitly requested by the user
+CHAT_MODEL = "gpt-4o"
+
+# Bump whenever a prompt template below changes, so responses cached for
+# the old wording are not served for the new one
+PROMPT_VERSION = 1
+
+# Upper bound on parallel requests per batch of sections, kept low so a
+# single story cannot exhaust a key's rate limit on its own
+MAX_CONCURRENT_REQUESTS = 4
+
+# Estimated input tokens packed into one batched cleaning request. Short
+# sections are dominated by per-request overhead, long ones by output size.
+BATCH_TOKEN_BUDGET = 1500
+
+# Most output tokens gpt-4o can produce in one response
+MODEL_MAX_OUTPUT_TOKENS = 16384
+
+# Texts longer than this are cleaned in chunks of at most this many tokens,
+# in parallel, so every answer fits its max_tokens instead of being cut off
+CLEAN_CHUNK_TOKENS = 1200
+
+# Each chunk is sent with up to this much of the text before it, as context
+# only, so sentences at the seams are cleaned consistently
+CLEAN_CHUNK_OVERLAP_TOKENS = 150
+
+# Retries of transient API failures: capped exponential backoff with full
+# jitter, within an overall deadline per call
+MAX_REQUEST_ATTEMPTS = 5
+RETRY_BASE_DELAY_SECONDS = 1.0
+RETRY_MAX_DELAY_SECONDS = 20.0
+REQUEST_DEADLINE_SECONDS = 90.0
 
 # Initialize OpenAI client with managed API key
-def get_openai_client():
-    """Get OpenAI client with current API key"""
-    current_key = api_manager.get_current_key()
+def get_openai_client(exclude=()):
+    """Get the pooled OpenAI client for the least loaded API key, avoiding excluded key IDs if possible"""
+    current_key = api_manager.get_current_key(exclude)
     if not current_key:
         raise Exception("No API key available")
-    return OpenAI(api_key=current_key["key"])
+    return get_pooled_client(current_key["key"])
+
+def classify_api_error(error):
+    """
+    Decide how to react to a failed API call
+    
+    Returns:
+        str: 'key' when the key itself is unusable (revoked, no permission,
+             quota exhausted) and another key should be tried, 'transient'
+             when the same call may succeed later, 'fatal' otherwise
+    """
+    if isinstance(error, (openai.AuthenticationError, openai.PermissionDeniedError)):
+        return 'key'
+    if isinstance(error, RateLimitWaitError):
+        return 'transient'
+    if isinstance(error, openai.RateLimitError):
+        return 'key' if getattr(error, 'code', None) == 'insufficient_quota' else 'transient'
+    if isinstance(error, (openai.APIConnectionError, openai.InternalServerError)):
+        return 'transient'
+    if isinstance(error, openai.APIStatusError) and error.status_code in (408, 409):
+        return 'transient'
+    return 'fatal'
+
+def _retry_after(error):
+    """Seconds the server asked us to wait, from Retry-After headers, or None"""
+    response = getattr(error, 'response', None)
+    if response is None:
+        return None
+    
+    headers = response.headers
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000
+        if headers.get('retry-after'):
+            value = headers['retry-after']
+            try:
+                return float(value)
+            except ValueError:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        pass
+    return None
+
+def retry_delay(error, attempt):
+    """Backoff before the next attempt: Retry-After if given, else full-jitter exponential"""
+    retry_after = _retry_after(error)
+    if retry_after is not None:
+        return retry_after + random.uniform(0, RETRY_BASE_DELAY_SECONDS / 2)
+    return random.uniform(0, min(RETRY_MAX_DELAY_SECONDS, RETRY_BASE_DELAY_SECONDS * 2 ** attempt))
+
+def call_openai(request, max_attempts=MAX_REQUEST_ATTEMPTS, deadline=REQUEST_DEADLINE_SECONDS):
+    """
+    Run one API call with retries, backoff and key failover
+    
+    Each attempt runs on the key the scheduler picks. A key that fails with
+    a key error or a rate limit is skipped on the next attempt while other
+    keys remain, so failover to a healthy key needs no backoff. Transient
+    failures on the last healthy key back off, honoring Retry-After. A key
+    whose shared rate-limit bucket stays empty (RateLimitWaitError) is
+    treated like a rate-limited key. No attempt starts after the deadline.
+    
+    Args:
+        request: Callable taking an OpenAI client and making the call
+        max_attempts: Maximum attempts including the first
+        deadline: Seconds after which no further attempt is started
+    
+    Returns:
+        Whatever request returns
+    
+    Raises:
+        The last API error when it is fatal, attempts run out or the deadline passes
+    """
+    started = time.monotonic()
+    failed_keys = set()
+    for attempt in range(max_attempts):
+        client = get_openai_client(exclude=failed_keys)
+        try:
+            return request(client)
+        except Exception as error:
+            # The SDK reports errors raised in the transport as connection errors
+            if isinstance(error.__cause__, RateLimitWaitError):
+                error = error.__cause__
+            
+            kind = classify_api_error(error)
+            if kind == 'fatal' or attempt == max_attempts - 1:
+                raise error
+            
+            api_key = getattr(client, 'api_key', None)
+            failed_before = len(failed_keys)
+            if api_key and (kind == 'key' or isinstance(error, (openai.RateLimitError, RateLimitWaitError))):
+                failed_keys.add(key_fingerprint(api_key))
+            
+            # Another key is still untried: fail over at once
+            switched = len(failed_keys) > failed_before and len(failed_keys) < len(api_manager.api_keys)
+            if kind == 'key' and not switched:
+                raise error
+            
+            delay = 0.0 if switched else retry_delay(error, attempt)
+            if time.monotonic() - started + delay > deadline:
+                raise error
+            time.sleep(delay)
+
+@lru_cache(maxsize=1)
+def _token_encoding():
+    """gpt-4o's tokenizer, or None when tiktoken is not installed"""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(CHAT_MODEL)
+    except Exception:
+        # Unknown model name or the encoding cannot be downloaded
+        return None
+
+def count_gpt_tokens(text):
+    """Token count with gpt-4o's tokenizer if tiktoken is installed, else a rough estimate"""
+    encoding = _token_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    # Indic scripts average close to 3 characters per token
+    return len(text) // 3 + 1
+
+def estimate_tokens(text):
+    """Token count with the text backend's tokenizer, so chunks and budgets fit its model"""
+    return get_text_provider().count_tokens(text)
+
+def output_token_budget(input_tokens, overhead=300):
+    """max_tokens for a JSON answer that rewrites input_tokens of text"""
+    return min(MODEL_MAX_OUTPUT_TOKENS, int(input_tokens * 1.5) + overhead)
+
+# Sentence ends (Latin and Devanagari danda) and paragraph breaks
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?।॥])\s+|\n\s*\n")
+
+def _sentence_spans(text, max_tokens):
+    """(start, end, tokens) of each sentence; sentences over max_tokens are cut between words"""
+    count_tokens = get_text_provider().count_tokens
+    spans = []
+    start = 0
+    boundaries = [(match.start(), match.end()) for match in _SENTENCE_BOUNDARY.finditer(text)]
+    for end, next_start in boundaries + [(len(text), len(text))]:
+        if end > start:
+            tokens = count_tokens(text[start:end])
+            if tokens <= max_tokens:
+                spans.append((start, end, tokens))
+            else:
+                piece_start, piece_tokens = None, 0
+                for word in re.finditer(r"\S+", text[start:end]):
+                    word_tokens = count_tokens(word.group())
+                    if piece_start is not None and piece_tokens + word_tokens > max_tokens:
+                        spans.append((piece_start, piece_end, piece_tokens))
+                        piece_start, piece_tokens = None, 0
+                    if piece_start is None:
+                        piece_start = start + word.start()
+                    piece_end = start + word.end()
+                    piece_tokens += word_tokens
+                if piece_start is not None:
+                    spans.append((piece_start, piece_end, piece_tokens))
+        start = next_start
+    return spans
+
+def split_text_into_chunks(text, max_tokens=CLEAN_CHUNK_TOKENS, overlap_tokens=CLEAN_CHUNK_OVERLAP_TOKENS):
+    """
+    Split a long text at sentence or paragraph boundaries
+    
+    Args:
+        text: Text to split
+        max_tokens: Maximum tokens per chunk
+        overlap_tokens: Maximum tokens of preceding text to pass along with each chunk
+    
+    Returns:
+        list: (chunk, preceding, separator) tuples, where preceding is the
+              end of the previous chunk, sent as read-only context, and
+              separator the whitespace that stood before the chunk
+    """
+    chunks = []
+    current = []
+    for span in _sentence_spans(text, max_tokens) + [None]:
+        if current and (span is None or sum(tokens for _, _, tokens in current) + span[2] > max_tokens):
+            previous = chunks[-1][3] if chunks else []
+            # Whole sentences from the end of the previous chunk, within the overlap
+            overlap = []
+            for sentence in reversed(previous):
+                if sum(tokens for _, _, tokens in overlap) + sentence[2] > overlap_tokens:
+                    break
+                overlap.insert(0, sentence)
+            preceding = text[overlap[0][0]:overlap[-1][1]] if overlap else ""
+            separator = text[chunks[-1][3][-1][1]:current[0][0]] if chunks else ""
+            chunks.append((text[current[0][0]:current[-1][1]], preceding, separator, current))
+            current = []
+        if span is not None:
+            current.append(span)
+    return [(chunk, preceding, separator) for chunk, preceding, separator, _ in chunks]
+
+def _join_separator(separator):
+    """Whitespace to put between two cleaned chunks, keeping paragraph and line breaks"""
+    if separator.count("\n") >= 2:
+        return "\n\n"
+    return "\n" if "\n" in separator else " "
+
+def merge_cleaned_chunks(chunks, results):
+    """
+    Reassemble the cleaning results of split_text_into_chunks into one result
+    
+    Cleaned texts are joined with the original paragraph breaks,
+    improvements and cultural notes are merged without duplicates and the
+    confidence is averaged, weighted by chunk length.
+    """
+    cleaned_text = ""
+    improvements = []
+    notes = []
+    weighted_confidence, total_tokens = 0.0, 0
+    for (chunk, _, separator), result in zip(chunks, results):
+        if cleaned_text:
+            cleaned_text += _join_separator(separator)
+        cleaned_text += result["cleaned_text"].strip()
+        for improvement in result.get("improvements_made") or []:
+            if improvement not in improvements:
+                improvements.append(improvement)
+        note = result.get("cultural_notes")
+        if isinstance(note, str) and note.strip() and note.strip() not in notes:
+            notes.append(note.strip())
+        confidence = result.get("confidence_score")
+        if isinstance(confidence, (int, float)):
+            tokens = estimate_tokens(chunk)
+            weighted_confidence += confidence * tokens
+            total_tokens += tokens
+    
+    return {
+        "cleaned_text": cleaned_text,
+        "improvements_made": improvements,
+        "confidence_score": round(weighted_confidence / total_tokens, 2) if total_tokens else None,
+        "cultural_notes": " ".join(notes)
+    }
+
+def _clean_text_cache_key(text, language, context, preceding=None):
+    # Only chunks of long texts carry preceding context; other keys stay as they were
+    parts = {"preceding": preceding} if preceding else {}
+    return response_cache.make_key(
+        model=get_text_provider().model, prompt_version=PROMPT_VERSION, task="clean_and_correct_text",
+        language=language, context=context, text=text, **parts
+    )
+
+def _cleaning_messages(text, language, context, preceding=None):
+    """Chat messages asking for one text to be cleaned, shared by the blocking and streaming requests"""
+    system_prompt = f"""You are an expert in {language} language and Indian cultural stories. 
+    Your task is to clean and correct the following {context} text while:
+    1. Preserving the original meaning and cultural authenticity
+    2. Correcting grammar, spelling, and sentence structure
+    3. Maintaining the storytelling tone and emotional essence
+    4. Adding appropriate punctuation and formatting
+    5. Ensuring cultural sensitivity and accuracy
+    
+    Please respond with JSON in this exact format:
+    {{
+        "cleaned_text": "the corrected and cleaned text",
+        "improvements_made": ["list of improvements made"],
+        "confidence_score": 0.95,
+        "cultural_notes": "any important cultural context preserved"
+    }}"""
+    
+    user_prompt = f"Please clean and correct this {language} {context} text:\n\n{text}"
+    if preceding:
+        user_prompt = (f"Please clean and correct this {language} {context} text. It continues the passage "
+                       f"below, which is given for context only and must not be repeated in cleaned_text.\n\n"
+                       f"Preceding passage:\n\n{preceding}\n\nText to clean:\n\n{text}")
+    
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
+
+def _request_cleaned_text(text, language, context, preceding=None):
+    """Send one JSON-mode cleaning request with retries; API errors that remain propagate to the caller"""
+    content, finish_reason = get_text_provider().chat(
+        _cleaning_messages(text, language, context, preceding),
+        max_tokens=output_token_budget(estimate_tokens(text)),
+        json_mode=True
+    )
+    
+    if finish_reason == "length":
+        raise ValueError("The response was cut off before it was complete")
+    if not content:
+        return None
+    result = json.loads(content)
+    response_cache.set("clean_and_correct_text", _clean_text_cache_key(text, language, context, preceding), result)
+    return result
+
+def _clean_chunks(chunks, language, context, max_workers=MAX_CONCURRENT_REQUESTS):
+    """
+    Clean the chunks of a long text in parallel
+    
+    Yields each chunk's result in order, as soon as it and every chunk
+    before it are done. Chunks cached from an earlier attempt are reused.
+    """
+    def clean_chunk(chunk, preceding):
+        cached = response_cache.get("clean_and_correct_text", _clean_text_cache_key(chunk, language, context, preceding))
+        return cached if cached is not None else _request_cleaned_text(chunk, language, context, preceding)
+    
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as pool:
+        futures = [pool.submit(clean_chunk, chunk, preceding) for chunk, preceding, _ in chunks]
+        try:
+            for future in futures:
+                result = future.result()
+                if result is None or not isinstance(result.get("cleaned_text"), str):
+                    raise ValueError("No content in response for part of the text")
+                yield result
+        finally:
+            for future in futures:
+                future.cancel()
+
+def _clean_text(text, language, context):
+    """
+    Clean a text of any length
+    
+    Short texts take one request. Longer ones are split at sentence and
+    paragraph boundaries, the chunks cleaned in parallel and the results
+    merged, so the time grows with the number of chunks per worker rather
+    than the answer being cut off at max_tokens.
+    
+    Returns:
+        dict: Cleaning result, or None if the response had no content
+    """
+    if estimate_tokens(text) <= CLEAN_CHUNK_TOKENS:
+        return _request_cleaned_text(text, language, context)
+    
+    chunks = split_text_into_chunks(text)
+    result = merge_cleaned_chunks(chunks, list(_clean_chunks(chunks, language, context)))
+    response_cache.set("clean_and_correct_text", _clean_text_cache_key(text, language, context), result)
+    return result
 
 def clean_and_correct_text(text, language="Hindi", context="festival story"):
     """
-    Clean and correct text using OpenAI GPT-4o
+    Clean and correct text with the configured text backend, GPT-4o by default
+    
+    Texts over CLEAN_CHUNK_TOKENS are cleaned in parallel chunks and merged.
     
     Args:
         text: Raw text to be cleaned
@@ -25,50 +400,376 @@ def clean_and_correct_text(text, language="Hindi", context="festival story"):
         tuple: (success: bool, result: dict)
     """
     try:
-        system_prompt = f"""You are an expert in {language} language and Indian cultural stories. 
-        Your task is to clean and correct the following {context} text while:
-        1. Preserving the original meaning and cultural authenticity
-        2. Correcting grammar, spelling, and sentence structure
-        3. Maintaining the storytelling tone and emotional essence
-        4. Adding appropriate punctuation and formatting
-        5. Ensuring cultural sensitivity and accuracy
-        
-        Please respond with JSON in this exact format:
-        {{
-            "cleaned_text": "the corrected and cleaned text",
-            "improvements_made": ["list of improvements made"],
-            "confidence_score": 0.95,
-            "cultural_notes": "any important cultural context preserved"
-        }}"""
-        
-        user_prompt = f"Please clean and correct this {language} {context} text:\n\n{text}"
+        cached = response_cache.get("clean_and_correct_text", _clean_text_cache_key(text, language, context))
+        if cached is not None:
+            return True, cached
         
         # Show API usage status before making request
         api_manager.show_usage_status()
         
-        # the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
-        # do not change this unless explicitly requested by the user
-        client = get_openai_client()
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            response_format={"type": "json_object"},
-            max_tokens=2000
-        )
-        
-        content = response.choices[0].message.content
-        if content:
-            result = json.loads(content)
-            return True, result
-        else:
+        result = _clean_text(text, language, context)
+        if result is None:
             return False, {"error": "No content in response"}
+        return True, result
     
     except Exception as e:
         return False, {"error": f"Text cleaning failed: {str(e)}"}
 
+class JsonStringFieldParser:
+    """
+    Pull one top-level string field out of JSON as it streams in
+    
+    Feed the response text chunk by chunk; each call returns the part of
+    the field's value decoded since the previous call. Escapes split across
+    chunks are held back until complete. The full text stays in `buffer`
+    for a final json.loads.
+    """
+    
+    _ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+    
+    def __init__(self, field):
+        self._key = re.compile(r'[{,]\s*"%s"\s*:\s*"' % re.escape(field))
+        self.buffer = ""
+        self.done = False
+        self._position = None
+    
+    def feed(self, chunk):
+        """
+        Add streamed text
+        
+        Returns:
+            str: Newly decoded characters of the field value, possibly empty
+        """
+        self.buffer += chunk
+        if self.done:
+            return ""
+        if self._position is None:
+            match = self._key.search(self.buffer)
+            if not match:
+                return ""
+            self._position = match.end()
+        
+        buffer, position = self.buffer, self._position
+        decoded = []
+        while position < len(buffer):
+            char = buffer[position]
+            if char == '"':
+                self.done = True
+                position += 1
+                break
+            if char != '\\':
+                decoded.append(char)
+                position += 1
+                continue
+            
+            # Escape sequence; wait for the rest of it if the chunk ended inside
+            if position + 1 >= len(buffer):
+                break
+            escape = buffer[position + 1]
+            if escape != 'u':
+                decoded.append(self._ESCAPES.get(escape, escape))
+                position += 2
+                continue
+            if position + 6 > len(buffer):
+                break
+            code = int(buffer[position + 2:position + 6], 16)
+            if 0xD800 <= code < 0xDC00:
+                # High surrogate: combine with the low one that follows
+                if position + 12 > len(buffer):
+                    break
+                if buffer[position + 6:position + 8] == '\\u':
+                    low = int(buffer[position + 8:position + 12], 16)
+                    decoded.append(chr(0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00)))
+                    position += 12
+                    continue
+            decoded.append(chr(code))
+            position += 6
+        
+        self._position = position
+        return "".join(decoded)
+
+class CleanedTextStream:
+    """
+    Clean one text with a streaming request, yielding the cleaned text as it arrives
+    
+    Iterate it, e.g. with st.write_stream, to show the text token by token;
+    afterwards `success` and `result` hold the same (success, result) that
+    clean_and_correct_text returns. A cached result is yielded in one piece,
+    a long text chunk by chunk as the parallel requests finish. Retries
+    cover opening the stream, not a stream that breaks midway.
+    """
+    
+    def __init__(self, text, language="Hindi", context="festival story"):
+        self.text = text
+        self.language = language
+        self.context = context
+        self.success = False
+        self.result = None
+    
+    def __iter__(self):
+        cache_key = _clean_text_cache_key(self.text, self.language, self.context)
+        cached = response_cache.get("clean_and_correct_text", cache_key)
+        if cached is not None:
+            self.success, self.result = True, cached
+            yield cached.get("cleaned_text", "")
+            return
+        
+        if estimate_tokens(self.text) > CLEAN_CHUNK_TOKENS:
+            yield from self._iter_chunked(cache_key)
+            return
+        
+        parser = JsonStringFieldParser("cleaned_text")
+        try:
+            stream = get_text_provider().stream_chat(
+                _cleaning_messages(self.text, self.language, self.context),
+                max_tokens=output_token_budget(estimate_tokens(self.text)),
+                json_mode=True
+            )
+            for content in stream:
+                decoded = parser.feed(content)
+                if decoded:
+                    yield decoded
+            
+            if not parser.buffer:
+                self.result = {"error": "No content in response"}
+                return
+            result = json.loads(parser.buffer)
+            response_cache.set("clean_and_correct_text", cache_key, result)
+            self.success, self.result = True, result
+        
+        except Exception as e:
+            self.result = {"error": f"Text cleaning failed: {str(e)}"}
+    
+    def _iter_chunked(self, cache_key):
+        """Clean a long text in parallel chunks, yielding each one in order as it is ready"""
+        try:
+            chunks = split_text_into_chunks(self.text)
+            results = []
+            for (_, _, separator), result in zip(chunks, _clean_chunks(chunks, self.language, self.context)):
+                yield (_join_separator(separator) if results else "") + result["cleaned_text"].strip()
+                results.append(result)
+            
+            result = merge_cleaned_chunks(chunks, results)
+            response_cache.set("clean_and_correct_text", cache_key, result)
+            self.success, self.result = True, result
+        
+        except Exception as e:
+            self.result = {"error": f"Text cleaning failed: {str(e)}"}
+
+def clean_texts_concurrently(items, language="Hindi", max_workers=MAX_CONCURRENT_REQUESTS, on_result=None):
+    """
+    Clean several texts in parallel with a bounded number of requests in flight
+    
+    Cached texts are answered immediately. The rest run on a small thread
+    pool, each request on the API key the scheduler picks at that moment and
+    retried through call_openai. on_result runs on the calling thread. No
+    Streamlit calls are made here, since background jobs run this without a
+    script run context; pages show the usage status themselves.
+    
+    Args:
+        items: List of (text, context) tuples
+        language: Language of the texts
+        max_workers: Maximum concurrent requests
+        on_result: Optional callback(index, success, result) run as each text finishes
+    
+    Returns:
+        list: (success: bool, result: dict) per item, in input order
+    """
+    results = [None] * len(items)
+    
+    def finish(index, outcome):
+        results[index] = outcome
+        if on_result:
+            on_result(index, *outcome)
+    
+    pending = []
+    for index, (text, context) in enumerate(items):
+        cached = response_cache.get("clean_and_correct_text", _clean_text_cache_key(text, language, context))
+        if cached is not None:
+            finish(index, (True, cached))
+        else:
+            pending.append(index)
+    
+    if not pending:
+        return results
+    
+    try:
+        # Fail fast when no key is configured or the local model cannot load
+        get_text_provider().preflight()
+    except Exception as e:
+        for index in pending:
+            finish(index, (False, {"error": f"Text cleaning failed: {str(e)}"}))
+        return results
+    
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(pending))) as pool:
+        futures = {
+            pool.submit(_clean_text, items[index][0], language, items[index][1]): index
+            for index in pending
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                result = future.result()
+                outcome = (True, result) if result is not None else (False, {"error": "No content in response"})
+            except Exception as e:
+                outcome = (False, {"error": f"Text cleaning failed: {str(e)}"})
+            finish(index, outcome)
+    
+    return results
+
+def _pack_batches(indexes, items, token_budget):
+    """Group consecutive items into batches whose text fits the token budget"""
+    batches = []
+    current, current_tokens = [], 0
+    for index in indexes:
+        tokens = estimate_tokens(items[index][0])
+        if current and current_tokens + tokens > token_budget:
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(index)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+def _request_cleaned_batch(batch, language):
+    """
+    Clean several texts with one JSON-mode request
+    
+    Args:
+        batch: List of (id, text, context) tuples
+        language: Language of the texts
+    
+    Returns:
+        dict: id -> result for every text, or None if the response does not
+              match the sections schema
+    """
+    system_prompt = f"""You are an expert in {language} language and Indian cultural stories. 
+    Your task is to clean and correct each of the following story sections while:
+    1. Preserving the original meaning and cultural authenticity
+    2. Correcting grammar, spelling, and sentence structure
+    3. Maintaining the storytelling tone and emotional essence
+    4. Adding appropriate punctuation and formatting
+    5. Ensuring cultural sensitivity and accuracy
+    
+    Clean every section independently and return one entry per section id.
+    Please respond with JSON in this exact format:
+    {{
+        "sections": [
+            {{
+                "id": 0,
+                "cleaned_text": "the corrected and cleaned text",
+                "improvements_made": ["list of improvements made"],
+                "confidence_score": 0.95,
+                "cultural_notes": "any important cultural context preserved"
+            }}
+        ]
+    }}"""
+    
+    sections = [{"id": section_id, "context": context, "text": text} for section_id, text, context in batch]
+    user_prompt = (f"Please clean and correct these {language} story sections:\n\n"
+                   f"{json.dumps({'sections': sections}, ensure_ascii=False)}")
+    
+    content, _ = get_text_provider().chat(
+        [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ],
+        max_tokens=min(4000, 500 + 2 * sum(estimate_tokens(text) for _, text, _ in batch)),
+        json_mode=True
+    )
+    
+    try:
+        returned = json.loads(content or "")["sections"]
+        results = {entry["id"]: entry for entry in returned if isinstance(entry.get("cleaned_text"), str) and entry["cleaned_text"].strip()}
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return None
+    
+    if set(results) != {section_id for section_id, _, _ in batch}:
+        return None
+    return {section_id: {key: value for key, value in entry.items() if key != "id"} for section_id, entry in results.items()}
+
+def clean_texts_batched(items, language="Hindi", token_budget=BATCH_TOKEN_BUDGET,
+                        max_workers=MAX_CONCURRENT_REQUESTS, on_result=None):
+    """
+    Clean several texts by packing them into as few requests as the token budget allows
+    
+    Each batch is one JSON-mode request with a `sections` schema. Sections
+    longer than half the token budget are cleaned one per request. A batch
+    whose response is missing a section, or fails altogether, falls back to
+    per-section requests through clean_texts_concurrently. Results are
+    cached per section, so the two modes share cache entries.
+    
+    Args:
+        items: List of (text, context) tuples
+        language: Language of the texts
+        token_budget: Maximum estimated input tokens per batch
+        max_workers: Maximum concurrent requests
+        on_result: Optional callback(index, success, result) run as each text finishes
+    
+    Returns:
+        list: (success: bool, result: dict) per item, in input order
+    """
+    results = [None] * len(items)
+    
+    def finish(index, outcome):
+        results[index] = outcome
+        if on_result:
+            on_result(index, *outcome)
+    
+    pending = []
+    for index, (text, context) in enumerate(items):
+        cached = response_cache.get("clean_and_correct_text", _clean_text_cache_key(text, language, context))
+        if cached is not None:
+            finish(index, (True, cached))
+        else:
+            pending.append(index)
+    
+    # Sections over half the budget gain little from sharing a request and
+    # go one per request, as do long texts that are cleaned in chunks
+    packable_tokens = min(CLEAN_CHUNK_TOKENS, token_budget // 2)
+    packable = [index for index in pending if estimate_tokens(items[index][0]) <= packable_tokens]
+    batches = [batch for batch in _pack_batches(packable, items, token_budget) if len(batch) > 1]
+    fallback = [index for index in pending if not any(index in batch for batch in batches)]
+    
+    if batches:
+        try:
+            # Fail fast when no key is configured or the local model cannot load
+            get_text_provider().preflight()
+        except Exception:
+            batches, fallback = [], pending
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(batches)))) as pool:
+            futures = {
+                pool.submit(_request_cleaned_batch, [(index, *items[index]) for index in batch], language): batch
+                for batch in batches
+            }
+            for future in as_completed(futures):
+                batch = futures[future]
+                try:
+                    batch_results = future.result()
+                except Exception:
+                    batch_results = None
+                
+                if batch_results is None:
+                    fallback.extend(batch)
+                    continue
+                for index in batch:
+                    text, context = items[index]
+                    response_cache.set("clean_and_correct_text", _clean_text_cache_key(text, language, context), batch_results[index])
+                    finish(index, (True, batch_results[index]))
+    
+    if fallback:
+        fallback.sort()
+        single_results = clean_texts_concurrently(
+            [items[index] for index in fallback], language, max_workers,
+            on_result=(lambda position, success, result: on_result(fallback[position], success, result)) if on_result else None
+        )
+        for index, outcome in zip(fallback, single_results):
+            results[index] = outcome
+    
+    return results
+
 def organize_story_sections(text, num_sections=3, language="Hindi"):
     """
     Organize story into sections/pages for virtual book
@@ -82,6 +783,14 @@ def organize_story_sections(text, num_sections=3, language="Hindi"):
         tuple: (success: bool, result: dict)
     """
     try:
+        cache_key = response_cache.make_key(
+            model=get_text_provider().model, prompt_version=PROMPT_VERSION, task="organize_story_sections",
+            language=language, num_sections=num_sections, text=text
+        )
+        cached = response_cache.get("organize_story_sections", cache_key)
+        if cached is not None:
+            return True, cached
+        
         system_prompt = f"""You are an expert storyteller and editor. 
         Your task is to organize the following {language} story into {num_sections} meaningful sections/pages for a virtual book.
         
@@ -108,43 +817,39 @@ def organize_story_sections(text, num_sections=3, language="Hindi"):
         
         user_prompt = f"Please organize this {language} story into {num_sections} sections:\n\n{text}"
         
+        # The answer repeats the whole story, plus a title and image description per section
+        input_tokens = estimate_tokens(text)
+        overhead = 300 + 150 * num_sections
+        if int(input_tokens * 1.5) + overhead > MODEL_MAX_OUTPUT_TOKENS:
+            return False, {"error": "This story is too long to organize in one request. Please split it into parts."}
+        
         # Show API usage status
         api_manager.show_usage_status()
         
-        # the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
-        # do not change this unless explicitly requested by the user
-        client = get_openai_client()
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
+        content, finish_reason = get_text_provider().chat(
+            [
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
             ],
-            response_format={"type": "json_object"},
-            max_tokens=3000
+            max_tokens=output_token_budget(input_tokens, overhead),
+            json_mode=True
         )
         
-        content = response.choices[0].message.content
+        if finish_reason == "length":
+            return False, {"error": "The organized story was cut off before it was complete. Please try again with a shorter story."}
         if content:
             result = json.loads(content)
-            # Record successful API usage
-            api_manager.record_usage(success=True)
+            response_cache.set("organize_story_sections", cache_key, result)
             return True, result
         else:
             return False, {"error": "No content in response"}
     
     except Exception as e:
-        error_msg = str(e)
-        # Record failed API usage
-        api_manager.record_usage(success=False)
-        
-        # Handle rate limit errors
-        if "429" in error_msg:
-            if api_manager.handle_rate_limit_error():
-                return False, {"error": "Rate limit reached. Switched to backup API key. Please try again."}
-            return False, {"error": "Rate limit reached. Please wait before trying again."}
+        # Retries are exhausted by now; only explain what the user can do
+        if isinstance(e, openai.RateLimitError):
+            return False, {"error": "Rate limit reached on all API keys. Please wait before trying again."}
         
-        return False, {"error": f"Story organization failed: {error_msg}"}
+        return False, {"error": f"Story organization failed: {str(e)}"}
 
 def generate_image_description(story_content, cultural_context="Indian festival"):
     """
@@ -158,6 +863,14 @@ def generate_image_description(story_content, cultural_context="Indian festival"
         tuple: (success: bool, description: str)
     """
     try:
+        cache_key = response_cache.make_key(
+            model=get_text_provider().model, prompt_version=PROMPT_VERSION, task="generate_image_description",
+            context=cultural_context, text=story_content
+        )
+        cached = response_cache.get("generate_image_description", cache_key)
+        if cached is not None:
+            return True, cached
+        
         system_prompt = f"""You are an expert in Indian art and cultural visualization. 
         Create a detailed, culturally accurate image description for illustrating this {cultural_context} story.
         
@@ -175,34 +888,24 @@ def generate_image_description(story_content, cultural_context="Indian festival"
         # Show API usage status
         api_manager.show_usage_status()
         
-        # the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
-        # do not change this unless explicitly requested by the user
-        client = get_openai_client()
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
+        description, _ = get_text_provider().chat(
+            [
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
             ],
             max_tokens=500
         )
         
-        # Record successful API usage
-        api_manager.record_usage(success=True)
-        return True, response.choices[0].message.content
+        if description:
+            response_cache.set("generate_image_description", cache_key, description)
+        return True, description
     
     except Exception as e:
-        error_msg = str(e)
-        # Record failed API usage
-        api_manager.record_usage(success=False)
-        
-        # Handle rate limit errors
-        if "429" in error_msg:
-            if api_manager.handle_rate_limit_error():
-                return False, "Rate limit reached. Switched to backup API key. Please try again."
-            return False, "Rate limit reached. Please wait before trying again."
+        # Retries are exhausted by now; only explain what the user can do
+        if isinstance(e, openai.RateLimitError):
+            return False, "Rate limit reached on all API keys. Please wait before trying again."
         
-        return False, f"Image description generation failed: {error_msg}"
+        return False, f"Image description generation failed: {str(e)}"
 
 def display_text_cleaning_ui(input_text, language="Hindi"):
     """
@@ -241,42 +944,56 @@ def display_text_cleaning_ui(input_text, language="Hindi"):
             index=0
         )
     
+    stream_output = st.toggle("⚡ Show text as it is written", value=True,
+                              help="Display the enhanced text while the AI writes it instead of all at once")
+    
     # Clean text button
     if st.button("✨ Clean & Enhance Text", type="primary"):
-        with st.spinner("Enhancing your story with AI... Please wait."):
-            success, result = clean_and_correct_text(input_text, selected_language, story_context)
+        if stream_output:
+            api_manager.show_usage_status()
+            # The streamed preview is replaced by the editable result once complete
+            preview = st.empty()
+            with preview.container():
+                stream = CleanedTextStream(input_text, selected_language, story_context)
+                st.write_stream(stream)
+            preview.empty()
+            success, result = stream.success, stream.result
+        else:
+            with st.spinner("Enhancing your story with AI... Please wait."):
+                success, result = clean_and_correct_text(input_text, selected_language, story_context)
+        
+        if success and "cleaned_text" in result:
+            st.success("✅ Text enhancement completed!")
             
-            if success and "cleaned_text" in result:
-                st.success("✅ Text enhancement completed!")
-                
-                # Display cleaned text
-                cleaned_text = st.text_area(
-                    "Enhanced Text:",
-                    value=result["cleaned_text"],
-                    height=200,
-                    key="cleaned_text_output",
-                    help="You can further edit this enhanced text if needed"
-                )
-                
-                # Show improvements made
-                if "improvements_made" in result and result["improvements_made"]:
-                    with st.expander("🔧 Improvements Made", expanded=False):
-                        for improvement in result["improvements_made"]:
-                            st.write(f"• {improvement}")
-                
-                # Show confidence score
-                if "confidence_score" in result:
-                    st.metric("AI Confidence", f"{result['confidence_score'] * 100:.1f}%")
-                
-                # Show cultural notes
-                if "cultural_notes" in result and result["cultural_notes"]:
-                    with st.expander("🏛️ Cultural Notes", expanded=False):
-                        st.write(result["cultural_notes"])
-                
-                return result
-            else:
-                error_msg = result.get("error", "Unknown error occurred") if isinstance(result, dict) else str(result)
-                st.error(f"❌ {error_msg}")
-                return None
+            # Display cleaned text
+            cleaned_text = st.text_area(
+                "Enhanced Text:",
+                value=result["cleaned_text"],
+                height=200,
+                key="cleaned_text_output",
+                help="You can further edit this enhanced text if needed"
+            )
+            
+            # Show improvements made
+            if "improvements_made" in result and result["improvements_made"]:
+                with st.expander("🔧 Improvements Made", expanded=False):
+                    for improvement in result["improvements_made"]:
+                        st.write(f"• {improvement}")
+            
+            # Show confidence score
+            # Merged chunks have no score when none of them reported one
+            if result.get("confidence_score") is not None:
+                st.metric("AI Confidence", f"{result['confidence_score'] * 100:.1f}%")
+            
+            # Show cultural notes
+            if "cultural_notes" in result and result["cultural_notes"]:
+                with st.expander("🏛️ Cultural Notes", expanded=False):
+                    st.write(result["cultural_notes"])
+            
+            return result
+        else:
+            error_msg = result.get("error", "Unknown error occurred") if isinstance(result, dict) else str(result)
+            st.error(f"❌ {error_msg}")
+            return None
     
     return None
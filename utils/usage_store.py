@@ -0,0 +1,283 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# API usage shared by every session and worker process
+USAGE_FILE = os.path.join("data", "api_usage.sqlite3")
+
+# Token bucket per API key: bursts of up to KEY_BURST_REQUESTS, refilled at
+# KEY_REQUESTS_PER_MINUTE, enforced across all processes. OPENAI_<SETTING>
+# overrides a default for every key and <key variable>_<SETTING> for one
+# key, e.g. OPENAI_API_KEY2_REQUESTS_PER_MINUTE=500.
+KEY_REQUESTS_PER_MINUTE = 60
+KEY_BURST_REQUESTS = 10
+RATE_LIMIT_SETTINGS = ("REQUESTS_PER_MINUTE", "BURST_REQUESTS")
+
+# Weight of the newest request in the per-key latency and error-rate averages
+STATS_SMOOTHING = 0.2
+
+# A request waits at most this long for its key's bucket before it fails
+# with RateLimitWaitError
+MAX_RATE_LIMIT_WAIT_SECONDS = 60
+
+class RateLimitWaitError(Exception):
+    """A key's rate-limit bucket did not allow a request within the wait limit"""
+
+def key_fingerprint(api_key):
+    """Stable identifier of an API key that does not reveal the key"""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+def is_rate_limit_variable(variable):
+    """Whether an environment variable configures a rate limit rather than holding a key"""
+    return variable.endswith(tuple(f"_{setting}" for setting in RATE_LIMIT_SETTINGS))
+
+def _read_limit(variables, default):
+    for variable in variables:
+        value = os.environ.get(variable)
+        if not value:
+            continue
+        try:
+            limit = float(value)
+        except ValueError:
+            limit = 0
+        if limit <= 0:
+            raise Exception(f"{variable} must be a positive number, got '{value}'")
+        return limit
+    return default
+
+def read_rate_limits(key_variable=None):
+    """
+    Rate limit of an API key from the environment
+
+    Args:
+        key_variable: Environment variable holding the key, None for the
+                      defaults of every key
+
+    Returns:
+        tuple: (requests_per_minute: float, burst: float)
+    """
+    prefixes = ([key_variable] if key_variable else []) + ["OPENAI"]
+    requests_per_minute, burst = (
+        _read_limit([f"{prefix}_{setting}" for prefix in prefixes], default)
+        for setting, default in zip(RATE_LIMIT_SETTINGS, (KEY_REQUESTS_PER_MINUTE, KEY_BURST_REQUESTS))
+    )
+    return requests_per_minute, burst
+
+class UsageStore:
+    """
+    SQLite-backed request accounting and rate limiting per API key
+
+    Daily request and error counts, the token buckets and smoothed latency
+    and error rates live in one WAL database, so every browser session and
+    worker process sees the same budget instead of a private copy in
+    session state. Requests in flight are only counted per process.
+    Keys without limits of their own (see set_limits) share the store's
+    default, read from the environment unless given.
+    """
+
+    def __init__(self, path=USAGE_FILE, requests_per_minute=None, burst=None):
+        default_requests_per_minute, default_burst = read_rate_limits()
+        self.path = path
+        self.rate = (requests_per_minute or default_requests_per_minute) / 60.0
+        self.capacity = float(burst or default_burst)
+        self._lock = threading.Lock()
+        self._initialized = False
+        self._in_flight = {}
+        self._limits = {}
+
+    def set_limits(self, key_id, requests_per_minute, burst):
+        """Give a key its own rate limit, e.g. for a higher usage tier"""
+        with self._lock:
+            self._limits[key_id] = (requests_per_minute / 60.0, float(burst))
+
+    def _limit(self, key_id):
+        """Refill rate per second and bucket capacity of a key"""
+        with self._lock:
+            return self._limits.get(key_id, (self.rate, self.capacity))
+
+    @contextmanager
+    def _connect(self):
+        """Open a connection for one write transaction and always close it"""
+        with self._lock:
+            if not self._initialized:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        try:
+            with self._lock:
+                if not self._initialized:
+                    self._create_schema(connection)
+            # Counters may lose the last writes on power loss, never consistency
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+        finally:
+            connection.close()
+
+    def _create_schema(self, connection):
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript("""
+            CREATE TABLE IF NOT EXISTS daily_usage (
+                key_id TEXT NOT NULL,
+                day TEXT NOT NULL,
+                requests INTEGER NOT NULL DEFAULT 0,
+                errors INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (key_id, day)
+            );
+            CREATE TABLE IF NOT EXISTS buckets (
+                key_id TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS key_stats (
+                key_id TEXT PRIMARY KEY,
+                latency REAL NOT NULL,
+                error_rate REAL NOT NULL
+            );
+        """)
+        self._initialized = True
+
+    def _refilled(self, key_id, tokens, updated_at, now):
+        rate, capacity = self._limit(key_id)
+        return min(capacity, tokens + (now - updated_at) * rate)
+
+    def try_acquire(self, key_id):
+        """
+        Take one request from a key's bucket if it has one
+
+        Returns:
+            float: 0 when the request may go ahead, otherwise the seconds
+                   until the bucket refills enough
+        """
+        now = time.time()
+        rate, capacity = self._limit(key_id)
+        with self._connect() as connection:
+            row = connection.execute("SELECT tokens, updated_at FROM buckets WHERE key_id = ?", (key_id,)).fetchone()
+            tokens = capacity if row is None else self._refilled(key_id, row[0], row[1], now)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+            if not wait:
+                tokens -= 1
+            connection.execute(
+                "INSERT OR REPLACE INTO buckets (key_id, tokens, updated_at) VALUES (?, ?, ?)",
+                (key_id, tokens, now)
+            )
+        return wait
+
+    def acquire(self, key_id, max_wait=MAX_RATE_LIMIT_WAIT_SECONDS):
+        """
+        Block until a key's bucket allows one more request
+
+        A broken store lets the request through, since the API enforces its
+        own limit anyway.
+
+        Returns:
+            bool: Whether a token was taken
+
+        Raises:
+            RateLimitWaitError: The bucket would not refill within max_wait
+        """
+        deadline = time.monotonic() + max_wait
+        while True:
+            try:
+                wait = self.try_acquire(key_id)
+            except sqlite3.Error:
+                return False
+            if not wait:
+                return True
+            if time.monotonic() + wait > deadline:
+                raise RateLimitWaitError(
+                    f"API key rate limit of {self._limit(key_id)[0] * 60:.0f} requests per minute reached, "
+                    f"no capacity within {max_wait:g}s"
+                )
+            time.sleep(wait)
+
+    def record(self, key_id, success=True, latency=None):
+        """Count a finished request against today's usage of a key and update its averages"""
+        today = datetime.now().strftime("%Y-%m-%d")
+        error = 0.0 if success else 1.0
+        try:
+            with self._connect() as connection:
+                connection.execute(
+                    "INSERT OR IGNORE INTO daily_usage (key_id, day) VALUES (?, ?)", (key_id, today)
+                )
+                connection.execute(
+                    "UPDATE daily_usage SET requests = requests + 1, errors = errors + ? WHERE key_id = ? AND day = ?",
+                    (int(error), key_id, today)
+                )
+                row = connection.execute("SELECT latency, error_rate FROM key_stats WHERE key_id = ?", (key_id,)).fetchone()
+                average_latency, error_rate = row if row else (0.0, error)
+                if latency is not None:
+                    average_latency = average_latency + STATS_SMOOTHING * (latency - average_latency) if average_latency else latency
+                error_rate += STATS_SMOOTHING * (error - error_rate)
+                connection.execute(
+                    "INSERT OR REPLACE INTO key_stats (key_id, latency, error_rate) VALUES (?, ?, ?)",
+                    (key_id, average_latency, error_rate)
+                )
+        except sqlite3.Error:
+            pass
+
+    def request_started(self, key_id):
+        """Wait for the key's bucket and count the request as in flight in this process"""
+        self.acquire(key_id)
+        with self._lock:
+            self._in_flight[key_id] = self._in_flight.get(key_id, 0) + 1
+
+    def request_finished(self, key_id, success, latency):
+        """Record a request sent with request_started"""
+        with self._lock:
+            self._in_flight[key_id] = max(0, self._in_flight.get(key_id, 0) - 1)
+        self.record(key_id, success, latency)
+
+    def in_flight(self, key_id):
+        """Requests this process currently has outstanding on a key"""
+        with self._lock:
+            return self._in_flight.get(key_id, 0)
+
+    def budgets(self):
+        """
+        Get today's usage, bucket level and averages of every key in one read
+
+        Returns:
+            dict: key_id -> {'requests', 'errors', 'available', 'capacity',
+                  'latency', 'error_rate'}; latency is None until measured
+        """
+        today = datetime.now().strftime("%Y-%m-%d")
+        now = time.time()
+        budgets = {}
+        try:
+            connection = sqlite3.connect(self.path, timeout=10)
+            try:
+                usage_rows = connection.execute(
+                    "SELECT key_id, requests, errors FROM daily_usage WHERE day = ?", (today,)
+                ).fetchall()
+                bucket_rows = connection.execute("SELECT key_id, tokens, updated_at FROM buckets").fetchall()
+                stats_rows = connection.execute("SELECT key_id, latency, error_rate FROM key_stats").fetchall()
+            finally:
+                connection.close()
+        except sqlite3.Error:
+            return budgets
+
+        for key_id, requests, errors in usage_rows:
+            budgets.setdefault(key_id, self.empty_budget(key_id)).update({'requests': requests, 'errors': errors})
+        for key_id, tokens, updated_at in bucket_rows:
+            budgets.setdefault(key_id, self.empty_budget(key_id))['available'] = self._refilled(key_id, tokens, updated_at, now)
+        for key_id, latency, error_rate in stats_rows:
+            budgets.setdefault(key_id, self.empty_budget(key_id)).update({'latency': latency or None, 'error_rate': error_rate})
+        return budgets
+
+    def empty_budget(self, key_id=None):
+        """Budget of a key with no recorded usage"""
+        _, capacity = self._limit(key_id)
+        return {'requests': 0, 'errors': 0, 'available': capacity, 'capacity': capacity,
+                'latency': None, 'error_rate': 0.0}
+
+# Global usage store instance
+usage_store = UsageStore()
@@ -0,0 +1,90 @@
+"""
+Background worker for transcription and AI enhancement jobs
+
+Runs independently of the Streamlit app and shares the job queue in
+data/jobs.sqlite3 with it. Start as many processes as the API keys allow:
+
+    python worker.py --processes 2
+"""
+import argparse
+import logging
+import multiprocessing
+import sqlite3
+import threading
+import time
+from utils.drafts import cleanup_stale_drafts, DRAFT_SWEEP_INTERVAL_SECONDS
+from utils.jobs import claim_next_job, run_job, record_heartbeat, make_worker_name
+
+logger = logging.getLogger(__name__)
+
+# Pause between queue polls while idle
+POLL_INTERVAL_SECONDS = 1.0
+
+# Heartbeats keep the web processes from running jobs inline and renew the
+# lease of the job in progress
+HEARTBEAT_INTERVAL_SECONDS = 5.0
+
+def work():
+    """Claim and run jobs until interrupted"""
+    worker = make_worker_name()
+    current = {'job_id': None}
+    stopped = threading.Event()
+
+    def heartbeat():
+        while not stopped.wait(HEARTBEAT_INTERVAL_SECONDS):
+            try:
+                record_heartbeat(worker, current['job_id'])
+            except sqlite3.Error:
+                logger.warning("Worker %s could not record its heartbeat", worker, exc_info=True)
+
+    record_heartbeat(worker)
+    threading.Thread(target=heartbeat, daemon=True).start()
+    logger.info("Worker %s waiting for jobs", worker)
+
+    next_sweep = 0.0
+    try:
+        while True:
+            job = claim_next_job(worker)
+            if job is None:
+                # Idle time also expires abandoned upload drafts
+                if time.monotonic() >= next_sweep:
+                    next_sweep = time.monotonic() + DRAFT_SWEEP_INTERVAL_SECONDS
+                    try:
+                        cleanup_stale_drafts()
+                    except OSError:
+                        logger.exception("Worker %s could not sweep stale drafts", worker)
+                time.sleep(POLL_INTERVAL_SECONDS)
+                continue
+
+            current['job_id'] = job['job_id']
+            started = time.perf_counter()
+            run_job(job)
+            current['job_id'] = None
+            logger.info("Worker %s ran %s job %s in %.1fs", worker, job['kind'], job['job_id'], time.perf_counter() - started)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stopped.set()
+
+def main():
+    parser = argparse.ArgumentParser(description="Run background jobs for Utsav Kathalu")
+    parser.add_argument("--processes", type=int, default=1, help="Number of worker processes")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(processName)s %(levelname)s %(message)s")
+
+    if args.processes <= 1:
+        work()
+        return
+
+    processes = [multiprocessing.Process(target=work) for _ in range(args.processes)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.join()
+
+if __name__ == "__main__":
+    main()